@@ -0,0 +1,397 @@
+"""End-to-end benchmark of the worker against a fake Saiblo server and a fake Docker daemon.
+
+The real SaibloClient, TaskScheduler, build and judge tasks, match judger and report outbox are
+wired up like in main.py, with a fake Docker client injected into AsyncDockerClient. The
+benchmark runs until all tasks have been reported and finished, and prints matches per minute,
+phase latency percentiles and the peak RSS of the process as JSON.
+
+Run it from the root of the repository, e.g.:
+
+    python -m benchmarks.end_to_end --matches 50 --game-duration 0.5 --output result.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+import saiblo_worker.path_manager as path_manager
+import saiblo_worker.tracing as tracing
+from benchmarks.fake_docker import FakeDockerClient, FakeDockerLatencies
+from benchmarks.fake_saiblo_server import FakeSaibloServer
+from saiblo_worker.agent_code_fetcher import AgentCodeFetcher
+from saiblo_worker.async_docker_client import AsyncDockerClient
+from saiblo_worker.build_result_reporter import BuildResultReporter
+from saiblo_worker.build_task import BuildTaskFactory
+from saiblo_worker.docker_image_builder import DockerImageBuilder
+from saiblo_worker.judge_task import JudgeTaskFactory
+from saiblo_worker.match_judger import MatchJudger
+from saiblo_worker.match_result_reporter import MatchResultReporter
+from saiblo_worker.match_result_store import MatchResultStore
+from saiblo_worker.report_outbox import ReportOutbox
+from saiblo_worker.saiblo_client import SaibloClient
+from saiblo_worker.storage_manager import StorageManager
+from saiblo_worker.task_scheduler import TaskScheduler
+
+# The name MatchJudger gives the game host container of a match, followed by the match ID.
+_GAME_HOST_CONTAINER_NAME_PREFIX = "saiblo-worker-game-host"
+_GAME_HOST_IMAGE = "saiblo-worker-benchmark-game-host"
+_WORKER_NAME = "saiblo-worker-benchmark"
+
+
+def main() -> None:
+    """Parses the command line, runs the benchmark and writes the report."""
+
+    args = parse_args()
+
+    logging.basicConfig(level=args.logging_level, stream=sys.stderr)
+
+    report = asyncio.run(run_benchmark(args))
+
+    report_json = json.dumps(report, indent=2)
+
+    if args.output is not None:
+        Path(args.output).write_text(report_json + "\n", encoding="utf-8")
+
+    else:
+        print(report_json)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the command line arguments.
+
+    Args:
+        argv: The arguments to parse. Defaults to the ones of the process.
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the worker against a fake Saiblo server and a fake Docker daemon."
+    )
+
+    workload = parser.add_argument_group("workload")
+    workload.add_argument("--matches", type=int, default=20, help="judge tasks to run")
+    workload.add_argument(
+        "--builds", type=int, default=0, help="compilation tasks sent on connection"
+    )
+    workload.add_argument(
+        "--agent-codes", type=int, default=4, help="distinct agent codes"
+    )
+    workload.add_argument("--players", type=int, default=2, help="players per match")
+    workload.add_argument(
+        "--agent-code-size", type=int, default=65536, help="agent source size in bytes"
+    )
+    workload.add_argument(
+        "--replay-size", type=int, default=1 << 20, help="replay size in bytes"
+    )
+    workload.add_argument(
+        "--stderr-size", type=int, default=4096, help="stderr size per container"
+    )
+
+    latencies = parser.add_argument_group("fake Docker latencies in seconds")
+    latencies.add_argument("--game-duration", type=float, default=1.0)
+    latencies.add_argument("--image-build-latency", type=float, default=0.5)
+    latencies.add_argument("--container-create-latency", type=float, default=0.05)
+    latencies.add_argument("--container-remove-latency", type=float, default=0.05)
+    latencies.add_argument("--container-start-latency", type=float, default=0.1)
+    latencies.add_argument("--container-stop-latency", type=float, default=0.01)
+    latencies.add_argument("--network-create-latency", type=float, default=0.02)
+    latencies.add_argument("--network-remove-latency", type=float, default=0.02)
+    latencies.add_argument(
+        "--jitter", type=float, default=0.2, help="relative spread of every latency"
+    )
+    latencies.add_argument("--seed", type=int, default=0)
+
+    worker = parser.add_argument_group("worker")
+    worker.add_argument("--game-host-data-mount", action="store_true")
+    worker.add_argument("--game-host-pool-size", type=int, default=0)
+    worker.add_argument("--network-pool-size", type=int, default=0)
+    worker.add_argument("--replay-compression-level", type=int, default=None)
+    worker.add_argument("--report-concurrency", type=int, default=4)
+
+    parser.add_argument(
+        "--timeout", type=float, default=600, help="give up after this many seconds"
+    )
+    parser.add_argument("--output", help="file to write the report to, not stdout")
+    parser.add_argument("--trace-file", help="file to append trace spans to")
+    parser.add_argument("--logging-level", default="WARNING")
+
+    return parser.parse_args(argv)
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs the benchmark.
+
+    Args:
+        args: The parsed command line arguments
+
+    Returns:
+        The machine-readable report
+    """
+
+    server = FakeSaibloServer(
+        agent_code_count=args.agent_codes,
+        agent_code_size=args.agent_code_size,
+        build_count=args.builds,
+        match_count=args.matches,
+        players_per_match=args.players,
+    )
+    fake_docker_client = FakeDockerClient(
+        latencies=FakeDockerLatencies(
+            image_build=args.image_build_latency,
+            container_create=args.container_create_latency,
+            container_remove=args.container_remove_latency,
+            container_start=args.container_start_latency,
+            container_stop=args.container_stop_latency,
+            game_duration=args.game_duration,
+            jitter=args.jitter,
+            network_create=args.network_create_latency,
+            network_remove=args.network_remove_latency,
+        ),
+        replay_size=args.replay_size,
+        seed=args.seed,
+        stderr_size=args.stderr_size,
+    )
+
+    span_exporter = (
+        tracing.JsonlSpanExporter(Path(args.trace_file))
+        if args.trace_file is not None
+        else None
+    )
+
+    tracing.set_exporter(span_exporter)
+
+    with tempfile.TemporaryDirectory(prefix="saiblo-worker-benchmark-") as data_dir:
+        path_manager.set_data_dir_path(Path(data_dir))
+
+        await server.start()
+
+        session = aiohttp.ClientSession(server.http_base_url)
+        docker_client = AsyncDockerClient(client_factory=lambda: fake_docker_client)
+        result_store = MatchResultStore()
+
+        try:
+            storage_manager = StorageManager()
+            task_scheduler = TaskScheduler(storage_manager=storage_manager)
+
+            report_outbox = ReportOutbox(
+                BuildResultReporter(session),
+                MatchResultReporter(session),
+                concurrency=args.report_concurrency,
+                storage_manager=storage_manager,
+            )
+
+            match_judger = MatchJudger(
+                agent_cpus=0.5,
+                agent_mem_limit="1g",
+                game_host_cpus=1,
+                game_host_mem_limit="1g",
+                judge_timeout=args.game_duration * (1 + args.jitter) + 60,
+                docker_client=docker_client,
+                game_host_data_mount=args.game_host_data_mount,
+                game_host_pool_size=args.game_host_pool_size,
+                name=_WORKER_NAME,
+                network_pool_size=args.network_pool_size,
+                replay_compression_level=args.replay_compression_level,
+                result_store=result_store,
+                storage_manager=storage_manager,
+            )
+
+            agent_code_fetcher = AgentCodeFetcher(
+                session, storage_manager=storage_manager
+            )
+            docker_image_builder = DockerImageBuilder(
+                build_timeout=300, docker_client=docker_client
+            )
+
+            saiblo_client = SaibloClient(
+                _WORKER_NAME,
+                server.websocket_url,
+                task_scheduler,
+                BuildTaskFactory(
+                    agent_code_fetcher,
+                    docker_image_builder,
+                    report_outbox.build_result_reporter,
+                ),
+                JudgeTaskFactory(
+                    _GAME_HOST_IMAGE,
+                    agent_code_fetcher,
+                    docker_image_builder,
+                    report_outbox.build_result_reporter,
+                    match_judger,
+                    report_outbox.match_result_reporter,
+                ),
+            )
+
+            match_judger.warm_up()
+
+            start_time = time.monotonic()
+
+            worker_tasks = [
+                asyncio.create_task(report_outbox.start()),
+                asyncio.create_task(task_scheduler.start()),
+                asyncio.create_task(saiblo_client.start()),
+            ]
+
+            try:
+                await asyncio.wait_for(server.wait_done(), args.timeout)
+
+            finally:
+                elapsed = time.monotonic() - start_time
+
+                for worker_task in worker_tasks:
+                    worker_task.cancel()
+
+                await asyncio.gather(*worker_tasks, return_exceptions=True)
+
+        finally:
+            await session.close()
+            await docker_client.close()
+            result_store.close()
+            await server.stop()
+
+            path_manager.set_data_dir_path(Path("data"))
+
+            tracing.set_exporter(None)
+
+            if span_exporter is not None:
+                span_exporter.close()
+
+    return _make_report(args, server, fake_docker_client, elapsed)
+
+
+def _get_peak_rss() -> int:
+    """Gets the peak resident set size of the process.
+
+    Returns:
+        The peak RSS in bytes
+    """
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _make_report(
+    args: argparse.Namespace,
+    server: FakeSaibloServer,
+    fake_docker_client: FakeDockerClient,
+    elapsed: float,
+) -> Dict[str, Any]:
+    """Makes the report of a finished benchmark.
+
+    Phases of matches are delimited by the time the judge task was sent, the time the game host
+    container started and exited, and the times the result and the finish notification arrived.
+
+    Args:
+        args: The parsed command line arguments
+        server: The fake Saiblo server
+        fake_docker_client: The fake Docker client
+        elapsed: The wall time of the benchmark in seconds
+
+    Returns:
+        The report
+    """
+
+    phases: Dict[str, List[float]] = {
+        "build": [],
+        "match_setup": [],
+        "match_run": [],
+        "match_report": [],
+        "match_finish": [],
+        "match_total": [],
+    }
+
+    for timing in server.build_timings.values():
+        if timing.reported_at is not None:
+            phases["build"].append(timing.reported_at - timing.sent_at)
+
+    for match_id, timing in server.match_timings.items():
+        if timing.reported_at is None or timing.finished_at is None:
+            continue
+
+        phases["match_total"].append(
+            max(timing.reported_at, timing.finished_at) - timing.sent_at
+        )
+
+        game_host_timing = fake_docker_client.container_timings.get(
+            f"{_GAME_HOST_CONTAINER_NAME_PREFIX}-{match_id}"
+        )
+
+        if game_host_timing is None or game_host_timing.exited_at is None:
+            continue
+
+        phases["match_setup"].append(game_host_timing.started_at - timing.sent_at)
+        phases["match_run"].append(
+            game_host_timing.exited_at - game_host_timing.started_at
+        )
+        phases["match_report"].append(timing.reported_at - game_host_timing.exited_at)
+        phases["match_finish"].append(timing.finished_at - game_host_timing.exited_at)
+
+    return {
+        "config": vars(args),
+        "elapsed_seconds": elapsed,
+        "matches": len(phases["match_total"]),
+        "matches_per_minute": len(phases["match_total"]) / elapsed * 60,
+        "builds": len(phases["build"]),
+        "failed_builds": server.stats.failed_builds,
+        "failed_matches": server.stats.failed_matches,
+        "agent_code_downloads": server.stats.agent_code_downloads,
+        "replay_bytes": server.stats.replay_bytes,
+        "websocket_connections": server.stats.websocket_connections,
+        "phase_latencies_seconds": {
+            name: _summarize(values) for name, values in phases.items()
+        },
+        "peak_rss_bytes": _get_peak_rss(),
+    }
+
+
+def _summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """Summarizes latencies with nearest-rank percentiles.
+
+    Args:
+        values: The latencies in seconds
+
+    Returns:
+        The count, mean, p50, p95, p99 and max of the latencies, or None for an empty list
+    """
+
+    if len(values) == 0:
+        return {
+            "count": 0,
+            "mean": None,
+            "p50": None,
+            "p95": None,
+            "p99": None,
+            "max": None,
+        }
+
+    sorted_values = sorted(values)
+
+    def percentile(p: float) -> float:
+        return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+    return {
+        "count": len(sorted_values),
+        "mean": sum(sorted_values) / len(sorted_values),
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "max": sorted_values[-1],
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,785 @@
+"""A fake in-memory Docker client with synthetic latencies for benchmarks.
+
+The fake stands in for docker.DockerClient behind AsyncDockerClient, so that the real worker stack
+can be driven without a Docker daemon. Every daemon call sleeps for its configured latency in the
+calling thread, like a blocking call to a real daemon would, and containers exit on timers.
+"""
+
+import io
+import json
+import queue
+import random
+import tarfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import docker.errors
+import docker.models.containers
+import docker.models.images
+import docker.models.networks
+
+_GAME_HOST_ROLE = "game-host"
+_ROLE_LABEL = "saiblo-worker.role"
+_STDERR_CHUNK_SIZE = 16384
+
+
+@dataclass
+class FakeDockerLatencies:
+    """The synthetic latencies of the fake Docker daemon in seconds.
+
+    Attributes:
+        image_build: The time to build an agent image
+        container_create: The time to create a container
+        container_remove: The time to remove a container
+        container_start: The time to start a container
+        container_stop: The time to stop a container
+        game_duration: The time a game host runs before it exits by itself
+        jitter: The relative random spread applied to every latency, e.g. 0.2 for ±20%
+        network_create: The time to create a network
+        network_remove: The time to remove a network
+    """
+
+    image_build: float = 0.5
+    container_create: float = 0.05
+    container_remove: float = 0.05
+    container_start: float = 0.1
+    container_stop: float = 0.01
+    game_duration: float = 1.0
+    jitter: float = 0.0
+    network_create: float = 0.02
+    network_remove: float = 0.02
+
+
+@dataclass
+class FakeContainerTiming:
+    """The times a fake container started and exited, from time.monotonic.
+
+    Attributes:
+        exited_at: The time the container exited, or None if it has not exited
+        labels: The labels of the container
+        started_at: The time the container started
+    """
+
+    exited_at: Optional[float]
+    labels: Dict[str, str]
+    started_at: float
+
+
+class FakeContainer(docker.models.containers.Container):
+    """A fake container.
+
+    Game host containers exit by themselves after the game duration, writing a result and a
+    replay to their app data. Other containers run until they are stopped.
+    """
+
+    client: "FakeDockerClient"
+
+    _exited: threading.Event
+    _timer: Optional[threading.Timer] = None
+
+    def __init__(self, client: "FakeDockerClient", image: str, **kwargs: Any):
+        """Initializes the container in the created state.
+
+        Args:
+            client: The fake Docker client
+            image: The image of the container
+            **kwargs: The keyword arguments of ContainerCollection.create
+        """
+
+        super().__init__(
+            attrs={
+                "Config": {
+                    "Env": [
+                        f"{key}={value}"
+                        for key, value in (kwargs.get("environment") or {}).items()
+                    ],
+                    "Image": image,
+                    "Labels": kwargs.get("labels") or {},
+                },
+                "HostConfig": {"Mounts": kwargs.get("mounts") or []},
+                "Id": uuid.uuid4().hex,
+                "Name": f"/{kwargs.get('name') or uuid.uuid4().hex}",
+                "State": {
+                    "ExitCode": 0,
+                    "OOMKilled": False,
+                    "Pid": 0,
+                    "Status": "created",
+                },
+            },
+            client=client,
+            collection=client.containers,
+        )
+
+        self._exited = threading.Event()
+
+    def get_archive(self, path, chunk_size=2097152, encode_stream=False):
+        return (
+            _iter_chunks(self.client.make_game_host_app_data(self), chunk_size),
+            {"name": path},
+        )
+
+    def kill(self, signal=None):
+        self._exit(137)
+
+    def logs(self, **kwargs):
+        stderr_output = b"x" * self.client.stderr_size
+
+        if kwargs.get("stream"):
+            return _iter_chunks(stderr_output, _STDERR_CHUNK_SIZE)
+
+        return stderr_output
+
+    def put_archive(self, path, data):
+        return True
+
+    def reload(self):
+        pass
+
+    def remove(self, **kwargs):
+        self.client.sleep(self.client.latencies.container_remove)
+
+        self._exit(137)
+
+        self.client.containers.pop(self)
+
+    def rename(self, name):
+        self.attrs["Name"] = f"/{name}"
+
+    def start(self, **kwargs):
+        self.client.sleep(self.client.latencies.container_start)
+
+        self.attrs["State"]["Status"] = "running"
+        self.client.record_started(self)
+
+        if self.labels.get(_ROLE_LABEL) == _GAME_HOST_ROLE:
+            self._timer = threading.Timer(
+                self.client.jitter(self.client.latencies.game_duration),
+                self._exit,
+                args=(0,),
+            )
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stats(self, **kwargs):
+        return {
+            "cpu_stats": {
+                "cpu_usage": {"total_usage": 0},
+                "throttling_data": {"throttled_periods": 0},
+            },
+            "memory_stats": {"usage": 0},
+            "networks": {},
+        }
+
+    def stop(self, **kwargs):
+        self.client.sleep(self.client.latencies.container_stop)
+
+        self._exit(137)
+
+    def wait(self, **kwargs):
+        self._exited.wait(kwargs.get("timeout"))
+
+        return {"StatusCode": self.attrs["State"]["ExitCode"]}
+
+    def _exit(self, exit_code: int) -> None:
+        """Makes the container exit if it is running, emitting a die event.
+
+        Args:
+            exit_code: The exit code
+        """
+
+        with self.client.lock:
+            if self.attrs["State"]["Status"] != "running":
+                return
+
+            self.attrs["State"]["ExitCode"] = exit_code
+            self.attrs["State"]["Status"] = "exited"
+
+        if self._timer is not None:
+            self._timer.cancel()
+
+        if self.labels.get(_ROLE_LABEL) == _GAME_HOST_ROLE:
+            # Game hosts with bind-mounted app data write their results there.
+            for mount in self.attrs["HostConfig"]["Mounts"]:
+                _write_game_host_app_data(self.client, self, mount["Source"])
+
+        self._exited.set()
+
+        self.client.record_exited(self)
+        self.client.emit_event(
+            {
+                "Action": "die",
+                "Actor": {
+                    "Attributes": {"exitCode": str(exit_code)},
+                    "ID": self.id,
+                },
+                "Type": "container",
+            }
+        )
+
+
+class FakeContainerCollection:
+    """The fake containers of a fake Docker client."""
+
+    _client: "FakeDockerClient"
+    _containers: Dict[str, FakeContainer]
+
+    def __init__(self, client: "FakeDockerClient"):
+        """Initializes the collection.
+
+        Args:
+            client: The fake Docker client
+        """
+
+        self._client = client
+        self._containers = {}
+
+    def create(self, image: str, **kwargs: Any) -> FakeContainer:
+        """Creates a container. See ContainerCollection.create.
+
+        Args:
+            image: The image of the container
+            **kwargs: The options of the container
+
+        Returns:
+            The container
+        """
+
+        self._client.sleep(self._client.latencies.container_create)
+
+        container = FakeContainer(self._client, image, **kwargs)
+
+        with self._client.lock:
+            assert container.id is not None
+            self._containers[container.id] = container
+
+        return container
+
+    def get(self, container_id: str) -> FakeContainer:
+        """Gets a container by ID or name.
+
+        Args:
+            container_id: The ID or name of the container
+
+        Returns:
+            The container
+        """
+
+        with self._client.lock:
+            for container in self._containers.values():
+                if container_id in (container.id, container.name):
+                    return container
+
+        raise docker.errors.NotFound(f"No such container: {container_id}")
+
+    def list(self, **kwargs: Any) -> List[FakeContainer]:
+        """Lists containers. See ContainerCollection.list.
+
+        Args:
+            **kwargs: all and filters by label are supported
+
+        Returns:
+            The containers
+        """
+
+        with self._client.lock:
+            containers = list(self._containers.values())
+
+        return [
+            container
+            for container in containers
+            if (kwargs.get("all") or container.status == "running")
+            and _match_labels(container.labels, kwargs.get("filters"))
+        ]
+
+    def pop(self, container: FakeContainer) -> None:
+        """Forgets a removed container.
+
+        Args:
+            container: The container
+        """
+
+        with self._client.lock:
+            assert container.id is not None
+            self._containers.pop(container.id, None)
+
+    def run(self, image: str, **kwargs: Any) -> FakeContainer:
+        """Creates and starts a container. See ContainerCollection.run.
+
+        Args:
+            image: The image of the container
+            **kwargs: The options of the container
+
+        Returns:
+            The container
+        """
+
+        kwargs.pop("detach", None)
+
+        container = self.create(image, **kwargs)
+        container.start()
+
+        return container
+
+
+class FakeImage(docker.models.images.Image):
+    """A fake image."""
+
+    client: "FakeDockerClient"
+
+    def remove(self, force=False, noprune=False):
+        self.client.images.pop(self)
+
+
+class FakeImageCollection:
+    """The fake images of a fake Docker client."""
+
+    _client: "FakeDockerClient"
+    _images: List[FakeImage]
+
+    def __init__(self, client: "FakeDockerClient"):
+        """Initializes the collection.
+
+        Args:
+            client: The fake Docker client
+        """
+
+        self._client = client
+        self._images = []
+
+    def build(self, **kwargs: Any) -> Tuple[FakeImage, Iterator[Dict[str, Any]]]:
+        """Builds an image from a context tarball. See ImageCollection.build.
+
+        Args:
+            **kwargs: fileobj and tag are supported
+
+        Returns:
+            The image and an empty build log
+        """
+
+        # The context is read like a daemon would receive it.
+        kwargs["fileobj"].read()
+
+        self._client.sleep(self._client.latencies.image_build)
+
+        image = FakeImage(
+            attrs={"Id": f"sha256:{uuid.uuid4().hex}", "RepoTags": [kwargs["tag"]]},
+            client=self._client,
+        )
+
+        with self._client.lock:
+            self._images.append(image)
+
+        return image, iter([])
+
+    def list(self, name: Optional[str] = None) -> List[FakeImage]:
+        """Lists images. See ImageCollection.list.
+
+        Args:
+            name: The repository to list the images of. All images are listed if not given.
+
+        Returns:
+            The images
+        """
+
+        with self._client.lock:
+            return [
+                image
+                for image in self._images
+                if name is None or any(tag.split(":")[0] == name for tag in image.tags)
+            ]
+
+    def pop(self, image: FakeImage) -> None:
+        """Forgets a removed image.
+
+        Args:
+            image: The image
+        """
+
+        with self._client.lock:
+            if image in self._images:
+                self._images.remove(image)
+
+
+class FakeNetwork(docker.models.networks.Network):
+    """A fake network."""
+
+    client: "FakeDockerClient"
+
+    def connect(self, container, *args, **kwargs):
+        pass
+
+    def remove(self):
+        self.client.sleep(self.client.latencies.network_remove)
+
+        self.client.networks.pop(self)
+
+
+class FakeNetworkCollection:
+    """The fake networks of a fake Docker client."""
+
+    _client: "FakeDockerClient"
+    _networks: Dict[str, FakeNetwork]
+
+    def __init__(self, client: "FakeDockerClient"):
+        """Initializes the collection.
+
+        Args:
+            client: The fake Docker client
+        """
+
+        self._client = client
+        self._networks = {}
+
+    def create(self, name: str, **kwargs: Any) -> FakeNetwork:
+        """Creates a network. See NetworkCollection.create.
+
+        Args:
+            name: The name of the network
+            **kwargs: labels is supported
+
+        Returns:
+            The network
+        """
+
+        self._client.sleep(self._client.latencies.network_create)
+
+        network = FakeNetwork(
+            attrs={
+                "Id": uuid.uuid4().hex,
+                "Labels": kwargs.get("labels") or {},
+                "Name": name,
+            },
+            client=self._client,
+        )
+
+        with self._client.lock:
+            assert network.id is not None
+            self._networks[network.id] = network
+
+        return network
+
+    def list(self, **kwargs: Any) -> List[FakeNetwork]:
+        """Lists networks. See NetworkCollection.list.
+
+        Args:
+            **kwargs: filters by label is supported
+
+        Returns:
+            The networks
+        """
+
+        with self._client.lock:
+            networks = list(self._networks.values())
+
+        return [
+            network
+            for network in networks
+            if _match_labels(network.attrs["Labels"], kwargs.get("filters"))
+        ]
+
+    def pop(self, network: FakeNetwork) -> None:
+        """Forgets a removed network.
+
+        Args:
+            network: The network
+        """
+
+        with self._client.lock:
+            assert network.id is not None
+            self._networks.pop(network.id, None)
+
+
+class FakeDockerClient:
+    """A fake Docker client keeping containers, images and networks in memory.
+
+    The start and exit times of containers are recorded in container_timings, keyed by the name of
+    each container when it started.
+    """
+
+    container_timings: Dict[str, FakeContainerTiming]
+    containers: FakeContainerCollection
+    images: FakeImageCollection
+    latencies: FakeDockerLatencies
+    lock: threading.Lock
+    networks: FakeNetworkCollection
+    replay_size: int
+    stderr_size: int
+
+    _event_queues: List["queue.Queue[Optional[Dict[str, Any]]]"]
+    _random: random.Random
+    _replay: bytes
+
+    def __init__(
+        self,
+        *,
+        latencies: Optional[FakeDockerLatencies] = None,
+        replay_size: int = 1 << 20,
+        seed: int = 0,
+        stderr_size: int = 4096,
+    ):
+        """Initializes the fake Docker client.
+
+        Args:
+            latencies: The synthetic latencies. Defaults to FakeDockerLatencies().
+            replay_size: The size in bytes of the replay written by each game host
+            seed: The seed of the random jitter of latencies and of the replay content
+            stderr_size: The size in bytes of the stderr output of each container
+        """
+
+        self.container_timings = {}
+        self.containers = FakeContainerCollection(self)
+        self.images = FakeImageCollection(self)
+        self.latencies = latencies or FakeDockerLatencies()
+        self.lock = threading.Lock()
+        self.networks = FakeNetworkCollection(self)
+        self.replay_size = replay_size
+        self.stderr_size = stderr_size
+
+        self._event_queues = []
+        self._random = random.Random(seed)
+        self._replay = self._random.randbytes(replay_size)
+
+    def close(self) -> None:
+        """Does nothing.
+
+        Event subscriptions are left open, since ending them would make subscribers resubscribe.
+        Their reading threads are daemon threads, so they do not keep the process alive.
+        """
+
+    def emit_event(self, event: Dict[str, Any]) -> None:
+        """Sends an event to all subscriptions.
+
+        Args:
+            event: The decoded event
+        """
+
+        with self.lock:
+            event_queues = list(self._event_queues)
+
+        for event_queue in event_queues:
+            event_queue.put(event)
+
+    def events(self, **kwargs: Any) -> "_FakeEventStream":
+        """Subscribes to events. See DockerClient.events.
+
+        Args:
+            **kwargs: The options of the subscription, which are ignored
+
+        Returns:
+            The stream of decoded events
+        """
+
+        del kwargs
+
+        event_queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+
+        with self.lock:
+            self._event_queues.append(event_queue)
+
+        return _FakeEventStream(self, event_queue)
+
+    def jitter(self, latency: float) -> float:
+        """Applies the random jitter to a latency.
+
+        Args:
+            latency: The latency in seconds
+
+        Returns:
+            The jittered latency in seconds
+        """
+
+        with self.lock:
+            factor = 1 + self._random.uniform(
+                -self.latencies.jitter, self.latencies.jitter
+            )
+
+        return max(0.0, latency * factor)
+
+    def make_game_host_app_data(self, container: FakeContainer) -> bytes:
+        """Makes the tarball of the app data directory of a game host.
+
+        Args:
+            container: The game host container
+
+        Returns:
+            The tarball with data/result.json and data/replay.dat
+        """
+
+        buffer = io.BytesIO()
+
+        with tarfile.open(fileobj=buffer, mode="w") as tar_file:
+            for name, data in [
+                ("data/result.json", _make_result_json(container)),
+                ("data/replay.dat", self._replay),
+            ]:
+                tar_info = tarfile.TarInfo(name)
+                tar_info.size = len(data)
+                tar_file.addfile(tar_info, io.BytesIO(data))
+
+        return buffer.getvalue()
+
+    def record_exited(self, container: FakeContainer) -> None:
+        """Records the time a container exited.
+
+        Args:
+            container: The container
+        """
+
+        with self.lock:
+            timing = self.container_timings.get(str(container.name))
+
+            if timing is not None:
+                timing.exited_at = time.monotonic()
+
+    def record_started(self, container: FakeContainer) -> None:
+        """Records the time a container started.
+
+        Args:
+            container: The container
+        """
+
+        with self.lock:
+            self.container_timings[str(container.name)] = FakeContainerTiming(
+                exited_at=None, labels=container.labels, started_at=time.monotonic()
+            )
+
+    def remove_stream(self, event_queue: "queue.Queue[Optional[Dict[str, Any]]]"):
+        """Ends an event subscription.
+
+        Args:
+            event_queue: The queue of the subscription
+        """
+
+        with self.lock:
+            if event_queue in self._event_queues:
+                self._event_queues.remove(event_queue)
+
+        event_queue.put(None)
+
+    def sleep(self, latency: float) -> None:
+        """Blocks the calling thread for a jittered latency.
+
+        Args:
+            latency: The latency in seconds
+        """
+
+        time.sleep(self.jitter(latency))
+
+
+class _FakeEventStream:
+    """A fake stream of decoded Docker events."""
+
+    _client: FakeDockerClient
+    _queue: "queue.Queue[Optional[Dict[str, Any]]]"
+
+    def __init__(
+        self,
+        client: FakeDockerClient,
+        event_queue: "queue.Queue[Optional[Dict[str, Any]]]",
+    ):
+        """Initializes the stream.
+
+        Args:
+            client: The fake Docker client
+            event_queue: The queue of the subscription
+        """
+
+        self._client = client
+        self._queue = event_queue
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            event = self._queue.get()
+
+            if event is None:
+                return
+
+            yield event
+
+    def close(self) -> None:
+        """Ends the subscription."""
+
+        self._client.remove_stream(self._queue)
+
+
+def _iter_chunks(data: bytes, chunk_size: int) -> Iterator[bytes]:
+    """Iterates over the chunks of some bytes.
+
+    Args:
+        data: The bytes
+        chunk_size: The size of each chunk
+
+    Returns:
+        The chunks
+    """
+
+    return (data[i : i + chunk_size] for i in range(0, len(data), chunk_size))
+
+
+def _make_result_json(container: FakeContainer) -> bytes:
+    """Makes the result of a game, giving every agent whose token is known a score.
+
+    Args:
+        container: The game host container
+
+    Returns:
+        The result serialized as JSON
+    """
+
+    tokens = [
+        token
+        for env in container.attrs["Config"]["Env"]
+        if env.startswith("TOKENS=")
+        for token in env.removeprefix("TOKENS=").split(",")
+    ]
+
+    return json.dumps(
+        {"scores": {token: float(i) for i, token in enumerate(tokens)}}
+    ).encode()
+
+
+def _match_labels(labels: Dict[str, str], filters: Optional[Dict[str, Any]]) -> bool:
+    """Checks whether labels match the label filters of a list call.
+
+    Args:
+        labels: The labels
+        filters: The filters of the list call
+
+    Returns:
+        Whether the labels match
+    """
+
+    for label_filter in (filters or {}).get("label", []):
+        key, _, value = label_filter.partition("=")
+
+        if key not in labels or (value and labels[key] != value):
+            return False
+
+    return True
+
+
+def _write_game_host_app_data(
+    client: FakeDockerClient, container: FakeContainer, dir_path: str
+) -> None:
+    """Writes the result and replay of a game host to its bind-mounted app data directory.
+
+    Args:
+        client: The fake Docker client
+        container: The game host container
+        dir_path: The path to the app data directory on the host
+    """
+
+    with tarfile.open(
+        fileobj=io.BytesIO(client.make_game_host_app_data(container))
+    ) as tar_file:
+        for member in tar_file.getmembers():
+            extracted_file = tar_file.extractfile(member)
+            assert extracted_file is not None
+
+            with open(
+                f"{dir_path}/{member.name.removeprefix('data/')}", "wb"
+            ) as target_file:
+                target_file.write(extracted_file.read())
@@ -0,0 +1,379 @@
+"""A fake Saiblo server for benchmarks.
+
+The server speaks the websocket protocol and the HTTP API the worker uses: it sends compilation
+tasks once a worker connects and a judge task whenever the worker requests one, serves agent code
+downloads and accepts build and match results. The times of all of these are recorded.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import aiohttp
+import aiohttp.web
+import yarl
+
+
+@dataclass
+class FakeBuildTiming:
+    """The times of a compilation task, from time.monotonic.
+
+    Attributes:
+        reported_at: The time the build result was received, or None if not yet
+        sent_at: The time the compilation task was sent
+    """
+
+    reported_at: Optional[float]
+    sent_at: float
+
+
+@dataclass
+class FakeMatchTiming:
+    """The times of a judge task, from time.monotonic.
+
+    Attributes:
+        finished_at: The time the worker notified that it finished the match, or None if not yet
+        reported_at: The time the match result was received, or None if not yet
+        sent_at: The time the judge task was sent
+    """
+
+    finished_at: Optional[float]
+    reported_at: Optional[float]
+    sent_at: float
+
+
+@dataclass
+class FakeSaibloStats:
+    """The counts of what a fake Saiblo server received.
+
+    Attributes:
+        agent_code_downloads: The number of agent code downloads
+        failed_builds: The number of failed builds reported
+        failed_matches: The number of failed matches reported
+        replay_bytes: The total size in bytes of the replays received
+        websocket_connections: The number of websocket connections of the worker
+    """
+
+    agent_code_downloads: int = 0
+    failed_builds: int = 0
+    failed_matches: int = 0
+    replay_bytes: int = 0
+    websocket_connections: int = 0
+
+
+class FakeSaibloServer:
+    """A fake Saiblo server on the loopback interface.
+
+    Attributes:
+        build_timings: The times of compilation tasks by code ID
+        match_timings: The times of judge tasks by match ID
+        stats: The counts of what the server received
+    """
+
+    build_timings: Dict[str, FakeBuildTiming]
+    match_timings: Dict[str, FakeMatchTiming]
+    stats: FakeSaibloStats
+
+    _agent_code_count: int
+    _agent_code_zip: bytes
+    _build_count: int
+    _done: asyncio.Event
+    _match_count: int
+    _players_per_match: int
+    _runner: Optional[aiohttp.web.AppRunner] = None
+    _url: Optional[yarl.URL] = None
+
+    def __init__(
+        self,
+        *,
+        agent_code_count: int = 4,
+        agent_code_size: int = 65536,
+        build_count: int = 0,
+        match_count: int = 10,
+        players_per_match: int = 2,
+    ):
+        """Initializes the server.
+
+        Args:
+            agent_code_count: The number of distinct agent codes players are drawn from
+            agent_code_size: The size in bytes of the source file of each agent code
+            build_count: The number of compilation tasks sent once the worker connects, at most
+                one for each agent code
+            match_count: The number of judge tasks to send in total
+            players_per_match: The number of players in each match
+        """
+
+        self.build_timings = {}
+        self.match_timings = {}
+        self.stats = FakeSaibloStats()
+
+        self._agent_code_count = agent_code_count
+        self._agent_code_zip = _make_agent_code_zip(agent_code_size)
+        self._build_count = min(build_count, agent_code_count)
+        self._done = asyncio.Event()
+        self._match_count = match_count
+        self._players_per_match = players_per_match
+
+    @property
+    def http_base_url(self) -> yarl.URL:
+        """The base URL of the HTTP API."""
+
+        assert self._url is not None, "The server is not started"
+
+        return self._url
+
+    @property
+    def websocket_url(self) -> str:
+        """The URL of the websocket endpoint."""
+
+        return str(self.http_base_url.with_scheme("ws") / "ws" / "")
+
+    async def start(self) -> None:
+        """Starts listening on a free port of the loopback interface."""
+
+        app = aiohttp.web.Application(client_max_size=1 << 30)
+        app.add_routes(
+            [
+                aiohttp.web.get("/ws/", self._handle_websocket),
+                aiohttp.web.get(
+                    "/judger/codes/{code_id}/download", self._handle_download
+                ),
+                aiohttp.web.put("/judger/codes/{code_id}/", self._handle_build_result),
+                aiohttp.web.put(
+                    "/judger/matches/{match_id}/", self._handle_match_result
+                ),
+            ]
+        )
+
+        self._runner = aiohttp.web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+
+        site = aiohttp.web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+
+        host, port = self._runner.addresses[0][:2]
+        self._url = yarl.URL.build(scheme="http", host=host, port=port)
+
+    async def stop(self) -> None:
+        """Stops listening and closes all connections."""
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def wait_done(self) -> None:
+        """Waits until all builds and matches are reported and all matches are finished."""
+
+        await self._done.wait()
+
+    def _check_done(self) -> None:
+        """Sets the done event if all builds and matches are reported and finished."""
+
+        if (
+            len(self.match_timings) == self._match_count
+            and all(
+                timing.reported_at is not None and timing.finished_at is not None
+                for timing in self.match_timings.values()
+            )
+            and all(
+                timing.reported_at is not None for timing in self.build_timings.values()
+            )
+        ):
+            self._done.set()
+
+    def _get_code_ids(self, count: int, offset: int) -> List[str]:
+        """Gets agent code IDs from the pool in a round-robin manner.
+
+        Args:
+            count: The number of code IDs
+            offset: The position in the pool to start from
+
+        Returns:
+            The code IDs
+        """
+
+        return [
+            f"benchmark-code-{(offset + i) % self._agent_code_count}"
+            for i in range(count)
+        ]
+
+    async def _handle_build_result(
+        self, request: aiohttp.web.Request
+    ) -> aiohttp.web.Response:
+        """Handles a build result.
+
+        Args:
+            request: The request
+
+        Returns:
+            The response
+        """
+
+        body = await request.json()
+        timing = self.build_timings.get(request.match_info["code_id"])
+
+        if body["compile_status"] != "编译成功":
+            self.stats.failed_builds += 1
+
+        if timing is not None and timing.reported_at is None:
+            timing.reported_at = time.monotonic()
+
+            self._check_done()
+
+        return aiohttp.web.json_response({})
+
+    async def _handle_download(
+        self, request: aiohttp.web.Request
+    ) -> aiohttp.web.Response:
+        """Handles an agent code download.
+
+        Args:
+            request: The request
+
+        Returns:
+            The response with the zipped agent code
+        """
+
+        del request
+
+        self.stats.agent_code_downloads += 1
+
+        return aiohttp.web.Response(
+            body=self._agent_code_zip, content_type="application/zip"
+        )
+
+    async def _handle_match_result(
+        self, request: aiohttp.web.Request
+    ) -> aiohttp.web.Response:
+        """Handles a match result.
+
+        Args:
+            request: The request
+
+        Returns:
+            The response
+        """
+
+        form = await request.post()
+        timing = self.match_timings.get(request.match_info["match_id"])
+
+        if form["state"] != "评测成功":
+            self.stats.failed_matches += 1
+
+        replay_file = form["file"]
+
+        if isinstance(replay_file, aiohttp.web.FileField):
+            self.stats.replay_bytes += len(replay_file.file.read())
+
+        if timing is not None and timing.reported_at is None:
+            timing.reported_at = time.monotonic()
+
+            self._check_done()
+
+        return aiohttp.web.json_response({})
+
+    async def _handle_websocket(
+        self, request: aiohttp.web.Request
+    ) -> aiohttp.web.WebSocketResponse:
+        """Handles the websocket connection of a worker.
+
+        Args:
+            request: The request
+
+        Returns:
+            The websocket response
+        """
+
+        websocket = aiohttp.web.WebSocketResponse()
+        await websocket.prepare(request)
+
+        self.stats.websocket_connections += 1
+
+        async for message in websocket:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+
+            data = json.loads(message.data)
+
+            match data["type"]:
+                case "init":
+                    # Compilation tasks are only sent on the first connection.
+                    for code_id in self._get_code_ids(self._build_count, 0):
+                        if code_id in self.build_timings:
+                            continue
+
+                        self.build_timings[code_id] = FakeBuildTiming(
+                            reported_at=None, sent_at=time.monotonic()
+                        )
+                        await websocket.send_json(
+                            {"type": "compilation_task", "data": {"code_id": code_id}}
+                        )
+
+                case "request_judge_task":
+                    if len(self.match_timings) < self._match_count:
+                        await self._send_judge_task(websocket)
+
+                case "finish_judge_task":
+                    timing = self.match_timings.get(str(data["data"]["match_id"]))
+
+                    if timing is not None and timing.finished_at is None:
+                        timing.finished_at = time.monotonic()
+
+                        self._check_done()
+
+        logging.debug("Worker websocket connection closed")
+
+        return websocket
+
+    async def _send_judge_task(self, websocket: aiohttp.web.WebSocketResponse) -> None:
+        """Sends the next judge task.
+
+        Args:
+            websocket: The websocket of the worker
+        """
+
+        match_index = len(self.match_timings)
+        match_id = str(match_index + 1)
+
+        self.match_timings[match_id] = FakeMatchTiming(
+            finished_at=None, reported_at=None, sent_at=time.monotonic()
+        )
+
+        await websocket.send_json(
+            {
+                "type": "judge_task",
+                "data": {
+                    "match_id": int(match_id),
+                    "players": [
+                        {"code_id": code_id}
+                        for code_id in self._get_code_ids(
+                            self._players_per_match, match_index
+                        )
+                    ],
+                },
+            }
+        )
+
+
+def _make_agent_code_zip(size: int) -> bytes:
+    """Makes the zip archive of an agent code, like Saiblo serves for downloads.
+
+    Args:
+        size: The size in bytes of the source file
+
+    Returns:
+        The zip archive
+    """
+
+    buffer = io.BytesIO()
+
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr("Dockerfile", "FROM scratch\nCOPY main.py /main.py\n")
+        zip_file.writestr("main.py", b"#" * size)
+
+    return buffer.getvalue()
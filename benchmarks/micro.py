@@ -0,0 +1,544 @@
+"""Micro-benchmarks of the byte-heavy data paths of the worker.
+
+Each benchmark runs at several payload sizes. Its wall time is measured over a number of rounds
+and its peak memory allocated by Python is measured with tracemalloc in a separate round. The
+results are compared against the baselines stored in benchmarks/baselines/micro.json, and the
+process exits with status 1 if any of them regressed beyond the tolerances.
+
+Baselines depend on the machine, so they should be recorded on one like the deployment, e.g.:
+
+    python -m benchmarks.micro --save-baselines
+    python -m benchmarks.micro --filter zip_to_tarball --output result.json
+"""
+
+import argparse
+import dataclasses
+import io
+import json
+import random
+import statistics
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import dacite
+
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.agent_code_fetcher import convert_zip_to_tarball
+from saiblo_worker.game_host_app_data import extract_game_host_app_data
+from saiblo_worker.match_result import MatchResult
+from saiblo_worker.match_result_reporter import (  # pylint: disable=protected-access
+    _make_form_data,
+)
+
+_BASELINES_PATH = Path(__file__).parent / "baselines" / "micro.json"
+_CHUNK_SIZE = 1024 * 1024
+_KIB = 1024
+_MAX_ROUNDS = 1000
+_MIB = 1024 * 1024
+
+
+@dataclass
+class MicroBenchmarkResult:
+    """The result of a micro-benchmark.
+
+    Attributes:
+        name: The name of the benchmark with its payload size, e.g. zip_to_tarball[1MiB]
+        min_seconds: The shortest wall time of a round
+        median_seconds: The median wall time of the rounds
+        peak_memory_bytes: The peak memory allocated by Python during a round
+        rounds: The number of timed rounds
+    """
+
+    name: str
+    min_seconds: float
+    median_seconds: float
+    peak_memory_bytes: int
+    rounds: int
+
+
+# A benchmark prepares its payload in a temporary directory and returns the function to measure.
+_Benchmark = Callable[[Path], Callable[[], Any]]
+
+
+def main() -> None:
+    """Parses the command line, runs the benchmarks and compares them against the baselines."""
+
+    args = _parse_args()
+
+    results: List[MicroBenchmarkResult] = []
+
+    for name, benchmark in _get_benchmarks().items():
+        if args.filter is not None and args.filter not in name:
+            continue
+
+        result = run_micro_benchmark(
+            name, benchmark, min_rounds=args.min_rounds, min_time=args.min_time
+        )
+        results.append(result)
+
+        print(
+            f"{result.name:<40} median {result.median_seconds * 1e3:10.3f} ms"
+            f"  min {result.min_seconds * 1e3:10.3f} ms"
+            f"  peak {result.peak_memory_bytes / _MIB:9.2f} MiB",
+            file=sys.stderr,
+        )
+
+    baselines: Dict[str, Dict[str, Any]] = (
+        json.loads(_BASELINES_PATH.read_text(encoding="utf-8"))
+        if _BASELINES_PATH.is_file()
+        else {}
+    )
+
+    if args.save_baselines:
+        baselines.update(
+            {
+                result.name: {
+                    "median_seconds": result.median_seconds,
+                    "peak_memory_bytes": result.peak_memory_bytes,
+                }
+                for result in results
+            }
+        )
+
+        _BASELINES_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _BASELINES_PATH.write_text(
+            json.dumps(dict(sorted(baselines.items())), indent=2) + "\n",
+            encoding="utf-8",
+        )
+
+    regressions = [
+        regression
+        for result in results
+        for regression in _compare(
+            result,
+            baselines.get(result.name),
+            time_tolerance=args.time_tolerance,
+            memory_tolerance=args.memory_tolerance,
+        )
+    ]
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+
+    report_json = json.dumps(
+        {
+            "results": [dataclasses.asdict(result) for result in results],
+            "regressions": regressions,
+        },
+        indent=2,
+    )
+
+    if args.output is not None:
+        Path(args.output).write_text(report_json + "\n", encoding="utf-8")
+
+    else:
+        print(report_json)
+
+    if len(regressions) > 0 and not args.save_baselines:
+        sys.exit(1)
+
+
+def run_micro_benchmark(
+    name: str, benchmark: _Benchmark, *, min_rounds: int = 5, min_time: float = 0.5
+) -> MicroBenchmarkResult:
+    """Runs a micro-benchmark in a fresh temporary directory.
+
+    One warm-up round is run first, then the timed rounds and finally a round under tracemalloc.
+    Fast benchmarks get more timed rounds, so that their median is less noisy.
+
+    Args:
+        name: The name of the benchmark
+        benchmark: The benchmark
+        min_rounds: The minimum number of timed rounds
+        min_time: The minimum total time in seconds of the timed rounds, up to _MAX_ROUNDS
+
+    Returns:
+        The result
+    """
+
+    with tempfile.TemporaryDirectory(prefix="saiblo-worker-benchmark-") as dir_path:
+        func = benchmark(Path(dir_path))
+
+        func()
+
+        durations: List[float] = []
+
+        while len(durations) < min_rounds or (
+            sum(durations) < min_time and len(durations) < _MAX_ROUNDS
+        ):
+            start_time = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start_time)
+
+        tracemalloc.start()
+
+        try:
+            func()
+            _, peak_memory_bytes = tracemalloc.get_traced_memory()
+
+        finally:
+            tracemalloc.stop()
+
+        path_manager.set_data_dir_path(Path("data"))
+
+    return MicroBenchmarkResult(
+        name=name,
+        min_seconds=min(durations),
+        median_seconds=statistics.median(durations),
+        peak_memory_bytes=peak_memory_bytes,
+        rounds=len(durations),
+    )
+
+
+def _bench_extract_game_host_app_data(
+    replay_size: int, replay_compression_level: Optional[int]
+) -> _Benchmark:
+    """Benchmarks extracting the app data tarball of a game host, like MatchJudger.judge.
+
+    Args:
+        replay_size: The size in bytes of the replay in the tarball
+        replay_compression_level: The gzip compression level of the saved replay, if any
+
+    Returns:
+        The benchmark
+    """
+
+    def prepare(dir_path: Path) -> Callable[[], Any]:
+        buffer = io.BytesIO()
+
+        with tarfile.open(fileobj=buffer, mode="w") as tar_file:
+            for name, data in [
+                ("data/result.json", json.dumps({"scores": {"token": 1.0}}).encode()),
+                ("data/replay.dat", _make_payload(replay_size)),
+            ]:
+                tar_info = tarfile.TarInfo(name)
+                tar_info.size = len(data)
+                tar_file.addfile(tar_info, io.BytesIO(data))
+
+        tarball = buffer.getvalue()
+
+        def run() -> Any:
+            return extract_game_host_app_data(
+                (
+                    tarball[i : i + _CHUNK_SIZE]
+                    for i in range(0, len(tarball), _CHUNK_SIZE)
+                ),
+                dir_path / "replay.dat",
+                replay_compression_level=replay_compression_level,
+            )
+
+        return run
+
+    return prepare
+
+
+def _bench_list_paths(
+    file_count: int,
+    get_path: Callable[[str], Path],
+    list_paths: Callable[[], List[Path]],
+) -> _Benchmark:
+    """Benchmarks listing files in the data directory with a path_manager function.
+
+    Args:
+        file_count: The number of files to create
+        get_path: The path_manager function getting the path of a file by ID
+        list_paths: The path_manager function listing the files
+
+    Returns:
+        The benchmark
+    """
+
+    def prepare(dir_path: Path) -> Callable[[], Any]:
+        path_manager.set_data_dir_path(dir_path)
+
+        for i in range(file_count):
+            path = get_path(f"{i:020d}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+        return list_paths
+
+    return prepare
+
+
+def _bench_make_form_data(stderr_size: int) -> _Benchmark:
+    """Benchmarks encoding the stderr outputs of a failed match, like MatchResultReporter.report.
+
+    Args:
+        stderr_size: The size in bytes of the stderr output of the game host and each agent
+
+    Returns:
+        The benchmark
+    """
+
+    def prepare(dir_path: Path) -> Callable[[], Any]:
+        del dir_path
+
+        match_result = _make_match_result(stderr_size)
+
+        return lambda: _make_form_data(match_result, None)
+
+    return prepare
+
+
+def _bench_match_result_json(stderr_size: int) -> _Benchmark:
+    """Benchmarks serializing a match result to JSON and parsing it back, like MatchResultStore.
+
+    Args:
+        stderr_size: The size in bytes of the stderr output of the game host and each agent
+
+    Returns:
+        The benchmark
+    """
+
+    def prepare(dir_path: Path) -> Callable[[], Any]:
+        del dir_path
+
+        match_result = _make_match_result(stderr_size)
+
+        def run() -> Any:
+            return dacite.from_dict(
+                MatchResult, json.loads(json.dumps(dataclasses.asdict(match_result)))
+            )
+
+        return run
+
+    return prepare
+
+
+def _bench_zip_to_tarball(file_size: int, file_count: int) -> _Benchmark:
+    """Benchmarks converting a zipped agent code to a tarball, like AgentCodeFetcher.fetch.
+
+    Args:
+        file_size: The size in bytes of each file of the agent code
+        file_count: The number of files of the agent code
+
+    Returns:
+        The benchmark
+    """
+
+    def prepare(dir_path: Path) -> Callable[[], Any]:
+        buffer = io.BytesIO()
+
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for i in range(file_count):
+                zip_file.writestr(f"src/{i}.py", _make_payload(file_size))
+
+        zip_data = buffer.getvalue()
+
+        return lambda: convert_zip_to_tarball(zip_data, dir_path / "code.tar")
+
+    return prepare
+
+
+def _compare(
+    result: MicroBenchmarkResult,
+    baseline: Optional[Dict[str, Any]],
+    *,
+    time_tolerance: float,
+    memory_tolerance: float,
+) -> List[str]:
+    """Compares a result against its baseline.
+
+    Args:
+        result: The result
+        baseline: The baseline, or None if there is none
+        time_tolerance: The allowed relative increase of the median wall time
+        memory_tolerance: The allowed relative increase of the peak memory
+
+    Returns:
+        The descriptions of the regressions
+    """
+
+    if baseline is None:
+        return []
+
+    regressions: List[str] = []
+
+    if result.median_seconds > baseline["median_seconds"] * (1 + time_tolerance):
+        regressions.append(
+            f"{result.name}: median {result.median_seconds:.6f} s, "
+            f"baseline {baseline['median_seconds']:.6f} s"
+        )
+
+    if result.peak_memory_bytes > baseline["peak_memory_bytes"] * (
+        1 + memory_tolerance
+    ):
+        regressions.append(
+            f"{result.name}: peak memory {result.peak_memory_bytes} bytes, "
+            f"baseline {baseline['peak_memory_bytes']} bytes"
+        )
+
+    return regressions
+
+
+def _format_size(size: int) -> str:
+    """Formats a size for the name of a benchmark.
+
+    Args:
+        size: The size in bytes
+
+    Returns:
+        The formatted size, e.g. 64KiB
+    """
+
+    if size >= _MIB and size % _MIB == 0:
+        return f"{size // _MIB}MiB"
+
+    if size >= _KIB and size % _KIB == 0:
+        return f"{size // _KIB}KiB"
+
+    return f"{size}B"
+
+
+def _get_benchmarks() -> Dict[str, _Benchmark]:
+    """Gets all benchmarks by name.
+
+    Returns:
+        The benchmarks
+    """
+
+    benchmarks: Dict[str, _Benchmark] = {}
+
+    for file_size, file_count in [(4 * _KIB, 16), (64 * _KIB, 16), (1 * _MIB, 16)]:
+        benchmarks[f"zip_to_tarball[{file_count}x{_format_size(file_size)}]"] = (
+            _bench_zip_to_tarball(file_size, file_count)
+        )
+
+    for replay_size in [1 * _MIB, 16 * _MIB, 64 * _MIB]:
+        benchmarks[f"extract_game_host_app_data[{_format_size(replay_size)}]"] = (
+            _bench_extract_game_host_app_data(replay_size, None)
+        )
+
+    benchmarks[f"extract_game_host_app_data[{_format_size(16 * _MIB)},gzip]"] = (
+        _bench_extract_game_host_app_data(16 * _MIB, 6)
+    )
+
+    for stderr_size in [1 * _KIB, 64 * _KIB, 512 * _KIB]:
+        benchmarks[f"match_result_json[{_format_size(stderr_size)}]"] = (
+            _bench_match_result_json(stderr_size)
+        )
+
+    for stderr_size in [64 * _KIB, 512 * _KIB, 4 * _MIB]:
+        benchmarks[f"make_form_data[{_format_size(stderr_size)}]"] = (
+            _bench_make_form_data(stderr_size)
+        )
+
+    for file_count in [10_000, 100_000]:
+        benchmarks[f"get_agent_code_tarball_paths[{file_count}]"] = _bench_list_paths(
+            file_count,
+            path_manager.get_agent_code_tarball_path,
+            path_manager.get_agent_code_tarball_paths,
+        )
+        benchmarks[f"get_report_outbox_paths[{file_count}]"] = _bench_list_paths(
+            file_count,
+            path_manager.get_report_outbox_path,
+            path_manager.get_report_outbox_paths,
+        )
+
+    return benchmarks
+
+
+def _make_match_result(stderr_size: int) -> MatchResult:
+    """Makes the result of a failed match with two agents and inline stderr outputs.
+
+    Args:
+        stderr_size: The size in bytes of the stderr output of the game host and each agent
+
+    Returns:
+        The match result
+    """
+
+    stderr_output = _make_payload(stderr_size).decode()
+    resource_usage = MatchResult.ResourceUsage(
+        cpu_ns=1,
+        network_rx_bytes=1,
+        network_tx_bytes=1,
+        peak_memory_bytes=1,
+        throttled_periods=1,
+        wall_time_ns=1,
+    )
+
+    return MatchResult(
+        match_id="1",
+        agent_results=[
+            MatchResult.AgentResult(
+                exit_code=1,
+                score=0.0,
+                status="RE",
+                stderr_output=stderr_output,
+                resource_usage=resource_usage,
+            )
+            for _ in range(2)
+        ],
+        error_message="error",
+        replay_file_path=None,
+        stderr_output=stderr_output,
+        resource_usage=resource_usage,
+    )
+
+
+def _make_payload(size: int) -> bytes:
+    """Makes a deterministic payload of random hex digits, which compresses to about half.
+
+    Args:
+        size: The size in bytes
+
+    Returns:
+        The payload
+    """
+
+    return random.Random(size).randbytes((size + 1) // 2).hex().encode()[:size]
+
+
+def _parse_args() -> argparse.Namespace:
+    """Parses the command line arguments.
+
+    Returns:
+        The parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Run micro-benchmarks of the data paths of the worker."
+    )
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument(
+        "--min-rounds", type=int, default=5, help="minimum number of timed rounds"
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="minimum total time in seconds of the timed rounds",
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=0.5,
+        help="allowed relative increase of the median time over the baseline",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative increase of the peak memory over the baseline",
+    )
+    parser.add_argument(
+        "--save-baselines",
+        action="store_true",
+        help="store the results as the new baselines",
+    )
+    parser.add_argument("--output", help="file to write the report to, not stdout")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
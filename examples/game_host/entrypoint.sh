@@ -1,5 +1,10 @@
 #!/bin/sh
 
+# Pooled game host containers get their tokens from a file.
+if [ -z "$TOKENS" ] && [ -n "$TOKENS_FILE" ]; then
+    TOKENS=$(cat "$TOKENS_FILE")
+fi
+
 echo "TOKENS=$TOKENS"
 
 mkdir -p data
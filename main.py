@@ -3,19 +3,33 @@
 import asyncio
 import logging
 import os
+from pathlib import Path
+from typing import Literal, Optional
 
 import aiohttp
 import dotenv
 import yarl
 
+import saiblo_worker.metrics as metrics
+import saiblo_worker.path_manager as path_manager
+import saiblo_worker.tracing as tracing
 from saiblo_worker.agent_code_fetcher import AgentCodeFetcher
+from saiblo_worker.async_docker_client import AsyncDockerClient
 from saiblo_worker.build_result_reporter import BuildResultReporter
 from saiblo_worker.build_task import BuildTaskFactory
+from saiblo_worker.cpu_allocator import CpuAllocator
+from saiblo_worker.data_layout import (
+    empty_trash_in_background,
+    migrate_to_sharded_layout,
+)
 from saiblo_worker.docker_image_builder import DockerImageBuilder
+from saiblo_worker.event_loop_watchdog import EventLoopWatchdog
 from saiblo_worker.judge_task import JudgeTaskFactory
 from saiblo_worker.match_judger import MatchJudger
 from saiblo_worker.match_result_reporter import MatchResultReporter
+from saiblo_worker.report_outbox import ReportOutbox
 from saiblo_worker.saiblo_client import SaibloClient
+from saiblo_worker.storage_manager import StorageManager
 from saiblo_worker.task_scheduler import TaskScheduler
 
 
@@ -27,67 +41,264 @@ async def main():
 
     agent_build_timeout = int(os.getenv("AGENT_BUILD_TIMEOUT", "300"))
 
+    agent_code_budget = (
+        int(os.environ["AGENT_CODE_BUDGET"])
+        if "AGENT_CODE_BUDGET" in os.environ
+        else None
+    )
+
+    agent_cpu_time_limit = (
+        float(os.environ["AGENT_CPU_TIME_LIMIT"])
+        if "AGENT_CPU_TIME_LIMIT" in os.environ
+        else None
+    )
+
     agent_cpus = float(os.getenv("AGENT_CPUS", "0.5"))
 
     agent_mem_limit = os.getenv("AGENT_MEM_LIMIT", "1g")
 
+    agent_output_limit = (
+        int(os.environ["AGENT_OUTPUT_LIMIT"])
+        if "AGENT_OUTPUT_LIMIT" in os.environ
+        else None
+    )
+
+    agent_stderr_limit = int(os.getenv("AGENT_STDERR_LIMIT", "524288"))
+
+    cpu_pinning = os.getenv("CPU_PINNING", "false").lower() == "true"
+
+    data_dir = os.getenv("DATA_DIR", "data")
+
+    early_termination_grace_period = float(
+        os.getenv("EARLY_TERMINATION_GRACE_PERIOD", "5")
+    )
+
+    early_termination_quorum_str = os.getenv("EARLY_TERMINATION_QUORUM")
+    early_termination_quorum: Optional[int | Literal["all"]] = (
+        None
+        if early_termination_quorum_str is None
+        else (
+            "all"
+            if early_termination_quorum_str == "all"
+            else int(early_termination_quorum_str)
+        )
+    )
+
+    event_loop_debug = os.getenv("EVENT_LOOP_DEBUG", "false").lower() == "true"
+
+    event_loop_lag_threshold = float(os.getenv("EVENT_LOOP_LAG_THRESHOLD", "0.5"))
+
+    free_space_floor = int(os.getenv("FREE_SPACE_FLOOR", "0"))
+
     game_host_cpus = float(os.getenv("GAME_HOST_CPUS", "1"))
 
+    game_host_data_mount = os.getenv("GAME_HOST_DATA_MOUNT", "false").lower() == "true"
+
+    game_host_data_host_dir = os.getenv("GAME_HOST_DATA_HOST_DIR")
+
+    game_host_data_size_limit = (
+        int(os.environ["GAME_HOST_DATA_SIZE_LIMIT"])
+        if "GAME_HOST_DATA_SIZE_LIMIT" in os.environ
+        else None
+    )
+
     game_host_image = os.getenv("GAME_HOST_IMAGE")
     assert game_host_image is not None, "GAME_HOST_IMAGE must be set"
 
     game_host_mem_limit = os.getenv("GAME_HOST_MEM_LIMIT", "1g")
 
+    game_host_pool_size = int(os.getenv("GAME_HOST_POOL_SIZE", "0"))
+
+    game_host_stderr_limit = int(os.getenv("GAME_HOST_STDERR_LIMIT", "524288"))
+
     http_base_url = yarl.URL(os.getenv("HTTP_BASE_URL", "https://api.dev.saiblo.net"))
 
     judge_timeout = float(os.getenv("JUDGE_TIMEOUT", "600"))
 
     logging_level = os.getenv("LOGGING_LEVEL", "INFO")
 
+    match_recovery = os.getenv("MATCH_RECOVERY", "false").lower() == "true"
+
+    match_replay_budget = (
+        int(os.environ["MATCH_REPLAY_BUDGET"])
+        if "MATCH_REPLAY_BUDGET" in os.environ
+        else None
+    )
+
+    match_stderr_budget = (
+        int(os.environ["MATCH_STDERR_BUDGET"])
+        if "MATCH_STDERR_BUDGET" in os.environ
+        else None
+    )
+
+    metrics_host = os.getenv("METRICS_HOST", "127.0.0.1")
+
+    metrics_port = (
+        int(os.environ["METRICS_PORT"]) if "METRICS_PORT" in os.environ else None
+    )
+
     name = os.getenv("NAME")
     assert name is not None, "NAME must be set"
 
+    network_pool_size = int(os.getenv("NETWORK_POOL_SIZE", "0"))
+
+    replay_compression = os.getenv("REPLAY_COMPRESSION", "none").lower()
+
+    if replay_compression not in ("gzip", "none"):
+        raise ValueError(f"Unsupported replay compression {replay_compression}")
+
+    replay_compression_level = (
+        int(os.getenv("REPLAY_COMPRESSION_LEVEL", "6"))
+        if replay_compression == "gzip"
+        else None
+    )
+
+    report_concurrency = int(os.getenv("REPORT_CONCURRENCY", "4"))
+
+    report_max_retry_interval = float(os.getenv("REPORT_MAX_RETRY_INTERVAL", "60"))
+
+    trace_file = os.getenv("TRACE_FILE")
+
     websocket_url = os.getenv("WEBSOCKET_URL", "wss://api.dev.saiblo.net/ws/")
 
     # Set up everything.
     logging.getLogger().setLevel(logging_level)
 
-    task_scheduler = TaskScheduler()
+    span_exporter = (
+        tracing.JsonlSpanExporter(Path(trace_file)) if trace_file is not None else None
+    )
+
+    tracing.set_exporter(span_exporter)
+
+    metrics_server = (
+        metrics.MetricsServer(host=metrics_host, port=metrics_port)
+        if metrics_port is not None
+        else None
+    )
+
+    if metrics_server is not None:
+        await metrics_server.start()
+
+    path_manager.set_data_dir_path(Path(data_dir))
+
+    await asyncio.to_thread(migrate_to_sharded_layout)
+
+    empty_trash_in_background()
+
+    storage_manager = StorageManager(
+        agent_code_budget=agent_code_budget,
+        free_space_floor=free_space_floor,
+        match_replay_budget=match_replay_budget,
+        match_stderr_budget=match_stderr_budget,
+    )
+
+    cpu_allocator = CpuAllocator() if cpu_pinning else None
+
+    task_scheduler = TaskScheduler(
+        cpu_allocator=cpu_allocator, storage_manager=storage_manager
+    )
 
     session = aiohttp.ClientSession(http_base_url)
 
+    docker_client = AsyncDockerClient()
+
+    report_outbox = ReportOutbox(
+        BuildResultReporter(session),
+        MatchResultReporter(session),
+        concurrency=report_concurrency,
+        max_retry_interval=report_max_retry_interval,
+        storage_manager=storage_manager,
+    )
+
+    # Pin the files of matches with undelivered results before anything is evicted.
+    await report_outbox.load()
+
+    await asyncio.to_thread(storage_manager.scan)
+
+    match_judger = MatchJudger(
+        agent_cpus=agent_cpus,
+        agent_mem_limit=agent_mem_limit,
+        game_host_cpus=game_host_cpus,
+        game_host_mem_limit=game_host_mem_limit,
+        judge_timeout=judge_timeout,
+        agent_cpu_time_limit=agent_cpu_time_limit,
+        agent_output_limit=agent_output_limit,
+        agent_stderr_limit=agent_stderr_limit,
+        cpu_allocator=cpu_allocator,
+        docker_client=docker_client,
+        early_termination_grace_period=early_termination_grace_period,
+        early_termination_quorum=early_termination_quorum,
+        game_host_data_mount=game_host_data_mount,
+        game_host_data_host_dir_path=game_host_data_host_dir,
+        game_host_data_size_limit=game_host_data_size_limit,
+        game_host_pool_size=game_host_pool_size,
+        game_host_stderr_limit=game_host_stderr_limit,
+        name=name,
+        network_pool_size=network_pool_size,
+        replay_compression_level=replay_compression_level,
+        storage_manager=storage_manager,
+    )
+
+    judge_task_factory = JudgeTaskFactory(
+        game_host_image,
+        AgentCodeFetcher(session, storage_manager=storage_manager),
+        DockerImageBuilder(
+            build_timeout=agent_build_timeout, docker_client=docker_client
+        ),
+        report_outbox.build_result_reporter,
+        match_judger,
+        report_outbox.match_result_reporter,
+    )
+
     saiblo_client = SaibloClient(
         name,
         websocket_url,
         task_scheduler,
         BuildTaskFactory(
-            AgentCodeFetcher(session),
-            DockerImageBuilder(build_timeout=agent_build_timeout),
-            BuildResultReporter(session),
-        ),
-        JudgeTaskFactory(
-            game_host_image,
-            AgentCodeFetcher(session),
-            DockerImageBuilder(build_timeout=agent_build_timeout),
-            BuildResultReporter(session),
-            MatchJudger(
-                agent_cpus=agent_cpus,
-                agent_mem_limit=agent_mem_limit,
-                game_host_cpus=game_host_cpus,
-                game_host_mem_limit=game_host_mem_limit,
-                judge_timeout=judge_timeout,
+            AgentCodeFetcher(session, storage_manager=storage_manager),
+            DockerImageBuilder(
+                build_timeout=agent_build_timeout, docker_client=docker_client
             ),
-            MatchResultReporter(session),
+            report_outbox.build_result_reporter,
         ),
+        judge_task_factory,
+        report_outbox=report_outbox,
+    )
+
+    # Resume matches running before a restart.
+    if match_recovery:
+        for journal_entry in await match_judger.recover():
+            await task_scheduler.schedule(
+                judge_task_factory.resume(
+                    journal_entry.match_id,
+                    [agent.image if agent else None for agent in journal_entry.agents],
+                )
+            )
+
+    # Fill the pools before the first match instead of after it.
+    match_judger.warm_up()
+
+    event_loop_watchdog = EventLoopWatchdog(
+        debug=event_loop_debug, threshold=event_loop_lag_threshold
     )
 
     await asyncio.gather(
+        asyncio.create_task(event_loop_watchdog.start()),
+        asyncio.create_task(report_outbox.start()),
         asyncio.create_task(task_scheduler.start()),
         asyncio.create_task(saiblo_client.start()),
     )
 
     await session.close()
 
+    await docker_client.close()
+
+    if metrics_server is not None:
+        await metrics_server.stop()
+
+    if span_exporter is not None:
+        span_exporter.close()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,39 +1,47 @@
 """The implementation of the agent code fetcher."""
 
+import asyncio
 import io
 import logging
-import shutil
 import tarfile
 import zipfile
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 import aiohttp
 
 import saiblo_worker.path_manager as path_manager
 from saiblo_worker.base_agent_code_fetcher import BaseAgentCodeFetcher
+from saiblo_worker.data_layout import remove_in_background
+from saiblo_worker.storage_manager import StorageManager
 
 
 class AgentCodeFetcher(BaseAgentCodeFetcher):
     """The agent code fetcher"""
 
     _session: aiohttp.ClientSession
-
-    def __init__(self, session: aiohttp.ClientSession):
+    _storage_manager: Optional[StorageManager]
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        storage_manager: Optional[StorageManager] = None,
+    ):
         """Initializes the agent code fetcher.
 
         Args:
             session: The aiohttp client session initialized with the base URL of the API
+            storage_manager: The storage manager to track fetched tarballs with, so that the least
+                recently used ones are evicted when over budget
         """
         self._session = session
+        self._storage_manager = storage_manager
 
     async def clean(self) -> None:
         logging.debug("Cleaning agent code")
 
-        agent_code_base_dir_path = path_manager.get_agent_code_base_dir_path()
-
-        if agent_code_base_dir_path.is_dir():
-            shutil.rmtree(agent_code_base_dir_path, ignore_errors=True)
+        remove_in_background(path_manager.get_agent_code_base_dir_path())
 
         logging.info("Agent code cleaned")
 
@@ -45,6 +53,8 @@ async def fetch(self, code_id: str) -> Path:
 
         # If fetched, return the cached tarball.
         if agent_code_tarball_path.is_file():
+            await self._track(agent_code_tarball_path)
+
             return agent_code_tarball_path
 
         async with self._session.get(f"/judger/codes/{code_id}/download") as response:
@@ -53,26 +63,51 @@ async def fetch(self, code_id: str) -> Path:
 
             bytes_ = await response.content.read()
 
-        zip_file = zipfile.ZipFile(io.BytesIO(bytes_))
-
-        with tarfile.open(agent_code_tarball_path, "w") as tar_file:
-            for file_name in zip_file.namelist():
-                # Skip directories.
-                if file_name.endswith("/"):
-                    continue
-
-                file_data = zip_file.read(file_name)
-
-                tar_info = tarfile.TarInfo(name=file_name)
-                tar_info.size = len(file_data)
-
-                tar_file.addfile(tar_info, io.BytesIO(file_data))
+        convert_zip_to_tarball(bytes_, agent_code_tarball_path)
 
         logging.info("Agent code %s fetched", code_id)
 
+        await self._track(agent_code_tarball_path)
+
         return agent_code_tarball_path
 
     async def list(self) -> Dict[str, Path]:
         agent_code_tarball_paths = path_manager.get_agent_code_tarball_paths()
 
         return {path.stem: path for path in agent_code_tarball_paths if path.is_file()}
+
+    async def _track(self, agent_code_tarball_path: Path) -> None:
+        """Tracks a fetched or reused tarball as the most recently used one.
+
+        Args:
+            agent_code_tarball_path: The path to the tarball
+        """
+
+        if self._storage_manager is not None:
+            await asyncio.to_thread(
+                self._storage_manager.track, "agent_code", agent_code_tarball_path
+            )
+
+
+def convert_zip_to_tarball(zip_data: bytes, tarball_path: Path) -> None:
+    """Converts a zipped agent code to a tarball that can be used as a Docker build context.
+
+    Args:
+        zip_data: The zip archive
+        tarball_path: The path to write the tarball to
+    """
+
+    zip_file = zipfile.ZipFile(io.BytesIO(zip_data))
+
+    with tarfile.open(tarball_path, "w") as tar_file:
+        for file_name in zip_file.namelist():
+            # Skip directories.
+            if file_name.endswith("/"):
+                continue
+
+            file_data = zip_file.read(file_name)
+
+            tar_info = tarfile.TarInfo(name=file_name)
+            tar_info.size = len(file_data)
+
+            tar_file.addfile(tar_info, io.BytesIO(file_data))
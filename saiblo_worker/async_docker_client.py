@@ -0,0 +1,231 @@
+"""The implementation of the asynchronous Docker client."""
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+import docker
+import docker.models.containers
+import docker.models.images
+import docker.models.networks
+
+_DEFAULT_MAX_WORKERS = 32
+
+_T = TypeVar("_T")
+
+
+class AsyncDockerClient:
+    """An asyncio facade over the Docker SDK.
+
+    The Docker SDK is synchronous, so every daemon interaction is run in a dedicated thread pool
+    owned by this client. Nothing here blocks the event loop, including the creation of the
+    underlying Docker client, which queries the daemon for its API version.
+    """
+
+    _client: Optional[docker.DockerClient] = None
+    _client_factory: Callable[[], docker.DockerClient]
+    _client_lock: threading.Lock
+    _executor: ThreadPoolExecutor
+
+    def __init__(
+        self,
+        *,
+        client_factory: Optional[Callable[[], docker.DockerClient]] = None,
+        max_workers: int = _DEFAULT_MAX_WORKERS,
+    ):
+        """Initializes the asynchronous Docker client.
+
+        Args:
+            client_factory: The factory creating the underlying Docker client. Defaults to
+                docker.from_env with a connection pool as large as the thread pool
+            max_workers: The maximum number of concurrent Docker daemon calls
+        """
+
+        self._client_factory = client_factory or functools.partial(
+            docker.from_env, max_pool_size=max_workers
+        )
+        self._client_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="saiblo-worker-docker"
+        )
+
+    async def call(self, func: Callable[..., _T], /, *args: Any, **kwargs: Any) -> _T:
+        """Calls a blocking Docker SDK function in the thread pool.
+
+        This is meant for methods of Docker SDK models, e.g. `container.stop`.
+
+        Args:
+            func: The function to call
+            *args: The positional arguments to pass to the function
+            **kwargs: The keyword arguments to pass to the function
+
+        Returns:
+            The return value of the function
+        """
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def call_with_client(
+        self, func: Callable[[docker.DockerClient], _T], /
+    ) -> _T:
+        """Calls a blocking function taking the underlying Docker client in the thread pool.
+
+        Args:
+            func: The function to call
+
+        Returns:
+            The return value of the function
+        """
+
+        return await self.call(lambda: func(self._get_client()))
+
+    async def close(self) -> None:
+        """Closes the underlying Docker client and shuts down the thread pool."""
+
+        if self._client is not None:
+            await self.call(self._client.close)
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def build_image(self, **kwargs: Any) -> docker.models.images.Image:
+        """Builds an image. See `docker.models.images.ImageCollection.build`."""
+
+        image, _ = await self.call_with_client(
+            lambda client: client.images.build(**kwargs)
+        )
+
+        return image
+
+    async def create_container(
+        self, image: str, **kwargs: Any
+    ) -> docker.models.containers.Container:
+        """Creates a container without starting it. See
+        `docker.models.containers.ContainerCollection.create`."""
+
+        return await self.call_with_client(
+            lambda client: client.containers.create(image, **kwargs)
+        )
+
+    async def create_network(
+        self, name: str, **kwargs: Any
+    ) -> docker.models.networks.Network:
+        """Creates a network. See `docker.models.networks.NetworkCollection.create`."""
+
+        return await self.call_with_client(
+            lambda client: client.networks.create(name, **kwargs)
+        )
+
+    async def list_containers(
+        self, **kwargs: Any
+    ) -> List[docker.models.containers.Container]:
+        """Lists containers. See `docker.models.containers.ContainerCollection.list`."""
+
+        return await self.call_with_client(
+            lambda client: client.containers.list(**kwargs)
+        )
+
+    async def list_images(self, name: str) -> List[docker.models.images.Image]:
+        """Lists images. See `docker.models.images.ImageCollection.list`."""
+
+        return await self.call_with_client(lambda client: client.images.list(name))
+
+    async def list_networks(
+        self, **kwargs: Any
+    ) -> List[docker.models.networks.Network]:
+        """Lists networks. See `docker.models.networks.NetworkCollection.list`."""
+
+        return await self.call_with_client(
+            lambda client: client.networks.list(**kwargs)
+        )
+
+    async def remove_containers(
+        self, containers: List[docker.models.containers.Container]
+    ) -> None:
+        """Stops and removes containers concurrently.
+
+        Failures are logged rather than raised, so that one stuck container does not prevent
+        the others from being removed.
+
+        Args:
+            containers: The containers to remove
+        """
+
+        async def remove_container(container: docker.models.containers.Container):
+            await self.call(container.stop, timeout=0)
+            await self.call(container.remove, v=True, force=True)
+
+        results = await asyncio.gather(
+            *[remove_container(container) for container in containers],
+            return_exceptions=True,
+        )
+
+        for container, result in zip(containers, results):
+            if isinstance(result, Exception):
+                logging.error(
+                    "Failed to remove container %s: (%s) %s",
+                    container.name,
+                    type(result),
+                    result,
+                )
+
+    async def remove_networks(
+        self, networks: List[docker.models.networks.Network]
+    ) -> None:
+        """Removes networks concurrently.
+
+        Failures are logged rather than raised, like in remove_containers.
+
+        Args:
+            networks: The networks to remove
+        """
+
+        results = await asyncio.gather(
+            *[self.call(network.remove) for network in networks],
+            return_exceptions=True,
+        )
+
+        for network, result in zip(networks, results):
+            if isinstance(result, Exception):
+                logging.error(
+                    "Failed to remove network %s: (%s) %s",
+                    network.name,
+                    type(result),
+                    result,
+                )
+
+    async def run_container(
+        self, image: str, **kwargs: Any
+    ) -> docker.models.containers.Container:
+        """Creates and starts a container. See
+        `docker.models.containers.ContainerCollection.run`."""
+
+        return await self.call_with_client(
+            lambda client: client.containers.run(image, **kwargs)
+        )
+
+    async def wait_container(
+        self, container: docker.models.containers.Container, timeout: float
+    ) -> Dict[str, Any]:
+        """Waits for a container to stop. See `docker.models.containers.Container.wait`."""
+
+        return await self.call(container.wait, timeout=timeout)
+
+    def _get_client(self) -> docker.DockerClient:
+        """Gets the underlying Docker client, creating it on first use.
+
+        This method must only be called from the thread pool.
+
+        Returns:
+            The underlying Docker client
+        """
+
+        with self._client_lock:
+            if self._client is None:
+                self._client = self._client_factory()
+
+            return self._client
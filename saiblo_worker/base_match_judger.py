@@ -32,8 +32,15 @@ async def judge(
         """
 
     @abstractmethod
-    async def list(self) -> Dict[str, MatchResult]:
-        """Lists all the matches that have been judged.
+    async def list(
+        self, *, after: Optional[str] = None, limit: Optional[int] = None
+    ) -> Dict[str, MatchResult]:
+        """Lists the matches that have been judged, in the order of their match IDs.
+
+        Args:
+            after: The match ID to list matches after, e.g. the last one of the previous page.
+                Matches are listed from the first one if not given.
+            limit: The maximum number of matches. All matches are listed if not given.
 
         Returns:
             A dictionary mapping match IDs to their corresponding MatchResult objects
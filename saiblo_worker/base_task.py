@@ -12,6 +12,12 @@ class BaseTask(ABC):
     def result(self) -> Optional[Any]:
         """The task execution result."""
 
+    @property
+    def trace_key(self) -> Optional[str]:
+        """The key of the trace the spans of the task belong to, or None for a trace of its own."""
+
+        return None
+
     @abstractmethod
     def __str__(self) -> str:
         """Returns a string representation of the task."""
@@ -4,7 +4,7 @@
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class BuildResult:
     """Build result.
 
@@ -4,6 +4,8 @@
 
 import aiohttp
 
+import saiblo_worker.metrics as metrics
+import saiblo_worker.tracing as tracing
 from saiblo_worker.base_build_result_reporter import BaseBuildResultReporter
 from saiblo_worker.build_result import BuildResult
 
@@ -22,15 +24,22 @@ def __init__(self, session: aiohttp.ClientSession):
     async def report(self, result: BuildResult) -> None:
         logging.debug("Reporting build result for agent code %s", result.code_id)
 
-        async with self._session.put(
-            f"/judger/codes/{result.code_id}/",
-            json={
-                "compile_status": (
-                    "编译成功" if result.image is not None else "编译失败"
-                ),
-                "compile_message": result.message,
-            },
-        ) as response:
-            response.raise_for_status()
+        with (
+            metrics.REPORT_DURATION.time(type="build"),
+            metrics.REPORT_FAILURES.count_exceptions(type="build"),
+            tracing.span(
+                "upload", trace_key=tracing.get_build_trace_key(result.code_id)
+            ),
+        ):
+            async with self._session.put(
+                f"/judger/codes/{result.code_id}/",
+                json={
+                    "compile_status": (
+                        "编译成功" if result.image is not None else "编译失败"
+                    ),
+                    "compile_message": result.message,
+                },
+            ) as response:
+                response.raise_for_status()
 
         logging.info("Build result reported for agent code %s", result.code_id)
@@ -3,6 +3,7 @@
 import logging
 from typing import Optional
 
+import saiblo_worker.tracing as tracing
 from saiblo_worker.base_agent_code_fetcher import BaseAgentCodeFetcher
 from saiblo_worker.base_build_result_reporter import BaseBuildResultReporter
 from saiblo_worker.base_docker_image_builder import BaseDockerImageBuilder
@@ -36,6 +37,10 @@ def __init__(
     def result(self) -> Optional[BuildResult]:
         return self._result
 
+    @property
+    def trace_key(self) -> str:
+        return tracing.get_build_trace_key(self._code_id)
+
     def __str__(self) -> str:
         return f"BuildTask(code_id={self._code_id})"
 
@@ -43,11 +48,13 @@ async def execute(self) -> BuildResult:
         build_result: Optional[BuildResult] = None
 
         try:
-            agent_code_tarball_path = await self._fetcher.fetch(self._code_id)
+            with tracing.span("fetch", code_id=self._code_id):
+                agent_code_tarball_path = await self._fetcher.fetch(self._code_id)
 
-            build_result = await self._builder.build(
-                self._code_id, agent_code_tarball_path
-            )
+            with tracing.span("build", code_id=self._code_id):
+                build_result = await self._builder.build(
+                    self._code_id, agent_code_tarball_path
+                )
 
         except Exception as e:  # pylint: disable=broad-except
             logging.error(
@@ -60,7 +67,8 @@ async def execute(self) -> BuildResult:
                 message=str(e),
             )
 
-        await self._reporter.report(build_result)
+        with tracing.span("report", code_id=self._code_id):
+            await self._reporter.report(build_result)
 
         self._result = build_result
 
@@ -0,0 +1,183 @@
+"""Reads and bounds the logs of containers."""
+
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import docker.models.containers
+import docker.types
+
+# The json-file logging driver wraps each line of output in a JSON object of about 70 bytes with
+# its stream and time, so log files are sized this many times as large as the output they hold,
+# which is enough for lines of at least 24 bytes.
+_LOG_SIZE_FACTOR = 4
+
+# The json-file logging driver keeps the current log file and this many rotated ones minus one.
+_MAX_LOG_FILES = 2
+
+
+class LogOutputCounter:
+    """Counts the bytes a container has written to stdout and stderr from its log files.
+
+    The json-file logging driver wraps each line of output in a JSON object with its stream and
+    time, so the size of the log files is far from the size of the output. The counter reads the
+    lines appended to the log files since it last counted and sums the sizes of the output they
+    hold, following the log file when it is rotated.
+
+    The log files are only visible if the worker runs on the Docker host, or has the Docker data
+    directory mounted at the same path, and the container uses the json-file logging driver.
+    Output in a log file rotated away between two counts is missed.
+
+    All methods block on file I/O, so they must not be run on the event loop.
+    """
+
+    _container: docker.models.containers.Container
+    _file_id: Optional[Tuple[int, int]] = None
+    _offset: int = 0
+    _output_size: int = 0
+
+    def __init__(self, container: docker.models.containers.Container):
+        """Initializes the counter.
+
+        Args:
+            container: The container, whose attributes are loaded after it started before
+                counting
+        """
+
+        self._container = container
+
+    def count(self) -> int:
+        """Counts the output of the container so far.
+
+        Returns:
+            The size of the output in bytes, or 0 if the log files are not visible
+        """
+
+        log_path: Optional[str] = self._container.attrs.get("LogPath")
+
+        if not log_path:
+            return self._output_size
+
+        try:
+            stat_result = os.stat(log_path)
+
+        except (FileNotFoundError, PermissionError):
+            return self._output_size
+
+        file_id = (stat_result.st_dev, stat_result.st_ino)
+
+        if self._file_id is not None and file_id != self._file_id:
+            # The log file read so far has been rotated, so the rest of it is read first.
+            self._read(f"{log_path}.1")
+            self._offset = 0
+
+        self._file_id = file_id
+        self._read(log_path)
+
+        return self._output_size
+
+    def _read(self, path: str) -> None:
+        """Reads the complete lines appended to the log file read so far.
+
+        Args:
+            path: The path the log file is expected at
+        """
+
+        try:
+            with open(path, "rb") as file:
+                stat_result = os.fstat(file.fileno())
+
+                if (stat_result.st_dev, stat_result.st_ino) != self._file_id:
+                    return
+
+                file.seek(self._offset)
+                data = file.read()
+
+        except (FileNotFoundError, PermissionError):
+            return
+
+        # The last line may still be being written.
+        end = data.rfind(b"\n") + 1
+
+        for line in data[:end].splitlines():
+            try:
+                self._output_size += len(json.loads(line)["log"].encode("utf-8"))
+
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        self._offset += end
+
+
+def make_log_config(output_size: int) -> docker.types.LogConfig:
+    """Makes the log config of a container, so that the log files on the daemon stay bounded.
+
+    The log files hold the stdout and stderr output together, and keep at least the latest
+    output_size bytes of it as long as its lines average at least 24 bytes. Shorter lines take
+    relatively more space in the log files, so less output is kept.
+
+    Args:
+        output_size: The size in bytes of the latest stdout and stderr output to keep
+
+    Returns:
+        The log config
+    """
+
+    # A full rotated log file is always kept.
+    return docker.types.LogConfig(
+        type=docker.types.LogConfig.types.JSON,
+        config={
+            "max-file": str(_MAX_LOG_FILES),
+            "max-size": str(output_size * _LOG_SIZE_FACTOR),
+        },
+    )
+
+
+def read_log_tail(
+    container: docker.models.containers.Container, max_size: int
+) -> bytes:
+    """Reads the tail of the stderr output of a container.
+
+    The log is streamed from the daemon and only the last max_size bytes are kept, so that memory
+    usage does not depend on how much the container has written. The log is not followed, so the
+    output written so far is read even if the container is still running.
+
+    This function blocks on the Docker daemon, so it must not be run on the event loop.
+
+    Args:
+        container: The container
+        max_size: The maximum size in bytes of the tail
+
+    Returns:
+        The tail of the stderr output
+    """
+
+    if max_size <= 0:
+        return b""
+
+    tail = bytearray()
+
+    # The log would be followed by default when streamed, blocking until the container exits.
+    for chunk in container.logs(stdout=False, stderr=True, stream=True, follow=False):
+        tail += chunk
+
+        # Trim only once the buffer has doubled, so that trimming takes amortized constant time.
+        if len(tail) > 2 * max_size:
+            del tail[:-max_size]
+
+    return bytes(tail[-max_size:])
+
+
+def write_log_tail(tail: bytes, path: Path) -> None:
+    """Writes the tail of the stderr output of a container to a file.
+
+    This function blocks on file I/O, so it must not be run on the event loop.
+
+    Args:
+        tail: The tail of the stderr output
+        path: The path to the file
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(tail)
@@ -0,0 +1,293 @@
+"""Samples the resource usage of containers during matches."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import docker.models.containers
+
+from saiblo_worker.async_docker_client import AsyncDockerClient
+from saiblo_worker.match_result import MatchResult
+
+_CGROUP_ROOT_PATH = Path("/sys/fs/cgroup")
+_PROC_ROOT_PATH = Path("/proc")
+
+
+@dataclass
+class _Sample:
+    """A sample of the cumulative resource usage of a container."""
+
+    cpu_ns: int
+    memory_bytes: int
+    network_rx_bytes: int
+    network_tx_bytes: int
+    throttled_periods: int
+
+
+async def sample_resource_usage(
+    docker_client: AsyncDockerClient,
+    container: docker.models.containers.Container,
+    exited: Awaitable[Any],
+    *,
+    interval: float,
+    on_sample: Optional[Callable[[MatchResult.ResourceUsage], Awaitable[None]]] = None,
+) -> Optional[MatchResult.ResourceUsage]:
+    """Samples the resource usage of a started container periodically until it exits.
+
+    The cgroup v2 files of the container are read directly when the worker can see them, which
+    costs a few file reads per sample. Otherwise, the Docker stats API is used. Since the cgroup of
+    a container is removed on exit, the CPU time used after the last sample is not accounted.
+
+    Sampling never fails a match: if no sample could be taken, None is returned.
+
+    Args:
+        docker_client: The Docker client to use
+        container: The container to sample
+        exited: An awaitable that completes when the container exits
+        interval: The interval between samples in seconds
+        on_sample: The callback to call with the resource usage so far after each sample, e.g.
+            to enforce limits
+
+    Returns:
+        The resource usage of the container, or None if it could not be sampled
+    """
+
+    start_time_ns = time.monotonic_ns()
+    exited_future = asyncio.ensure_future(exited)
+    resource_usage: Optional[MatchResult.ResourceUsage] = None
+
+    try:
+        await docker_client.call(container.reload)
+
+        assert container.id is not None
+        pid: int = container.attrs["State"]["Pid"]
+        cgroup_dir_path = await asyncio.to_thread(
+            _find_cgroup_dir_path, container.id, pid
+        )
+
+        while True:
+            try:
+                if cgroup_dir_path is not None:
+                    sample = await asyncio.to_thread(
+                        _read_cgroup_sample, cgroup_dir_path, pid
+                    )
+
+                else:
+                    sample = _parse_docker_stats(
+                        await docker_client.call(
+                            container.stats, stream=False, one_shot=True
+                        )
+                    )
+
+            except Exception as e:  # pylint: disable=broad-except
+                # The container is gone, so no more samples can be taken.
+                logging.debug(
+                    "Failed to sample container %s: (%s) %s", container.name, type(e), e
+                )
+
+                break
+
+            resource_usage = _accumulate(resource_usage, sample, start_time_ns)
+
+            if on_sample is not None:
+                await on_sample(resource_usage)
+
+            done, _ = await asyncio.wait([exited_future], timeout=interval)
+
+            if len(done) > 0:
+                break
+
+    except Exception as e:  # pylint: disable=broad-except
+        logging.warning(
+            "Failed to sample container %s: (%s) %s", container.name, type(e), e
+        )
+
+        return None
+
+    finally:
+        exited_future.cancel()
+
+    if resource_usage is not None:
+        resource_usage.wall_time_ns = time.monotonic_ns() - start_time_ns
+
+    return resource_usage
+
+
+def _accumulate(
+    resource_usage: Optional[MatchResult.ResourceUsage],
+    sample: _Sample,
+    start_time_ns: int,
+) -> MatchResult.ResourceUsage:
+    """Accumulates a sample into the resource usage so far.
+
+    Args:
+        resource_usage: The resource usage so far, or None before the first sample
+        sample: The sample
+        start_time_ns: The monotonic time when sampling started in nanoseconds
+
+    Returns:
+        The accumulated resource usage
+    """
+
+    wall_time_ns = time.monotonic_ns() - start_time_ns
+
+    if resource_usage is None:
+        return MatchResult.ResourceUsage(
+            cpu_ns=sample.cpu_ns,
+            network_rx_bytes=sample.network_rx_bytes,
+            network_tx_bytes=sample.network_tx_bytes,
+            peak_memory_bytes=sample.memory_bytes,
+            throttled_periods=sample.throttled_periods,
+            wall_time_ns=wall_time_ns,
+        )
+
+    return MatchResult.ResourceUsage(
+        cpu_ns=max(resource_usage.cpu_ns, sample.cpu_ns),
+        network_rx_bytes=max(resource_usage.network_rx_bytes, sample.network_rx_bytes),
+        network_tx_bytes=max(resource_usage.network_tx_bytes, sample.network_tx_bytes),
+        peak_memory_bytes=max(resource_usage.peak_memory_bytes, sample.memory_bytes),
+        throttled_periods=max(
+            resource_usage.throttled_periods, sample.throttled_periods
+        ),
+        wall_time_ns=wall_time_ns,
+    )
+
+
+def _find_cgroup_dir_path(container_id: str, pid: int) -> Optional[Path]:
+    """Finds the cgroup v2 directory of a container.
+
+    Args:
+        container_id: The ID of the container
+        pid: The PID of the main process of the container on the host
+
+    Returns:
+        The path to the cgroup directory, or None if it is not visible to the worker
+    """
+
+    candidate_paths: List[Path] = []
+
+    try:
+        for line in (_PROC_ROOT_PATH / str(pid) / "cgroup").read_text().splitlines():
+            # Only the unified hierarchy has an empty controller list.
+            hierarchy_id, controllers, path = line.split(":", 2)
+
+            if hierarchy_id == "0" and controllers == "":
+                candidate_paths.append(_CGROUP_ROOT_PATH / path.lstrip("/"))
+
+    except (FileNotFoundError, PermissionError, ValueError):
+        pass
+
+    candidate_paths += [
+        _CGROUP_ROOT_PATH / "system.slice" / f"docker-{container_id}.scope",
+        _CGROUP_ROOT_PATH / "docker" / container_id,
+    ]
+
+    for candidate_path in candidate_paths:
+        if (candidate_path / "cpu.stat").is_file():
+            return candidate_path
+
+    return None
+
+
+def _parse_docker_stats(stats: Dict[str, Any]) -> _Sample:
+    """Parses a sample from the Docker stats of a container.
+
+    Args:
+        stats: The stats returned by `Container.stats` with stream=False
+
+    Returns:
+        The sample
+    """
+
+    memory_stats: Dict[str, Any] = stats.get("memory_stats", {})
+
+    if "usage" not in memory_stats:
+        raise ValueError("Container is not running")
+
+    networks: Dict[str, Dict[str, int]] = stats.get("networks", {})
+
+    return _Sample(
+        cpu_ns=stats["cpu_stats"]["cpu_usage"]["total_usage"],
+        memory_bytes=memory_stats.get("max_usage", memory_stats["usage"]),
+        network_rx_bytes=sum(network["rx_bytes"] for network in networks.values()),
+        network_tx_bytes=sum(network["tx_bytes"] for network in networks.values()),
+        throttled_periods=stats["cpu_stats"]
+        .get("throttling_data", {})
+        .get("throttled_periods", 0),
+    )
+
+
+def _read_cgroup_sample(cgroup_dir_path: Path, pid: int) -> _Sample:
+    """Reads a sample from the cgroup v2 files of a container.
+
+    Args:
+        cgroup_dir_path: The path to the cgroup directory of the container
+        pid: The PID of the main process of the container on the host
+
+    Returns:
+        The sample
+    """
+
+    cpu_stat = _read_flat_keyed_file(cgroup_dir_path / "cpu.stat")
+
+    # memory.peak is only available since Linux 5.19.
+    memory_peak_path = cgroup_dir_path / "memory.peak"
+    memory_bytes = int(
+        (
+            memory_peak_path
+            if memory_peak_path.is_file()
+            else cgroup_dir_path / "memory.current"
+        )
+        .read_text()
+        .strip()
+    )
+
+    network_rx_bytes = 0
+    network_tx_bytes = 0
+
+    try:
+        # The first two lines are headers.
+        for line in (
+            (_PROC_ROOT_PATH / str(pid) / "net" / "dev").read_text().splitlines()[2:]
+        ):
+            interface, counters = line.split(":", 1)
+
+            if interface.strip() == "lo":
+                continue
+
+            fields = counters.split()
+            network_rx_bytes += int(fields[0])
+            network_tx_bytes += int(fields[8])
+
+    except (FileNotFoundError, PermissionError):
+        pass
+
+    return _Sample(
+        cpu_ns=cpu_stat["usage_usec"] * 1000,
+        memory_bytes=memory_bytes,
+        network_rx_bytes=network_rx_bytes,
+        network_tx_bytes=network_tx_bytes,
+        throttled_periods=cpu_stat.get("nr_throttled", 0),
+    )
+
+
+def _read_flat_keyed_file(path: Path) -> Dict[str, int]:
+    """Reads a flat keyed cgroup file, e.g. cpu.stat.
+
+    Args:
+        path: The path to the file
+
+    Returns:
+        The mapping from keys to values
+    """
+
+    entries: Dict[str, int] = {}
+
+    for line in path.read_text().splitlines():
+        key, value = line.split()
+        entries[key] = int(value)
+
+    return entries
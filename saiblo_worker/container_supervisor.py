@@ -0,0 +1,264 @@
+"""The implementation of the supervisor of match containers."""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Literal, Optional, Set
+
+import docker.errors
+import docker.models.containers
+
+from saiblo_worker.async_docker_client import AsyncDockerClient
+from saiblo_worker.container_logs import (
+    LogOutputCounter,
+    read_log_tail,
+    write_log_tail,
+)
+from saiblo_worker.container_resource_sampler import sample_resource_usage
+from saiblo_worker.docker_event_monitor import ContainerExit, DockerEventMonitor
+from saiblo_worker.match_result import MatchResult
+
+_STOPPED_CONTAINER_EXIT_TIMEOUT = 1
+
+
+@dataclass
+class ContainerOutcome:
+    """The outcome of a supervised container.
+
+    Attributes:
+        exit_code: The exit code of the container, or 0 if it was stopped by the supervisor
+        limit_status: The status of the container if it was killed for exceeding a limit
+        oom_killed: Whether the container was killed for running out of memory
+        resource_usage: The resource usage of the container, if sampled
+        stderr_file_path: The path to the file the tail of the stderr output is stored in
+        stderr_output: The tail of the stderr output of the container, empty if stored in a file
+    """
+
+    exit_code: int
+    limit_status: Optional[Literal["OLE", "TLE"]]
+    oom_killed: bool
+    resource_usage: Optional[MatchResult.ResourceUsage]
+    stderr_file_path: Optional[str]
+    stderr_output: str
+
+
+class ContainerSupervisor:
+    """Supervises a started container of a match until the match is over.
+
+    The supervisor waits for the container to exit, samples its resource usage and kills it as
+    soon as it exceeds its CPU time or output limit.
+    """
+
+    _container: docker.models.containers.Container
+    _cpu_time_limit_ns: Optional[int]
+    _docker_client: AsyncDockerClient
+    _event_monitor: DockerEventMonitor
+    _exit_task: Optional[asyncio.Future[ContainerExit]] = None
+    _limit_status: Optional[Literal["OLE", "TLE"]] = None
+    _output_counter: LogOutputCounter
+    _output_limit: Optional[int]
+    _sampling_interval: float
+    _sampling_task: Optional[asyncio.Future[Optional[MatchResult.ResourceUsage]]] = None
+    _stderr_limit: int
+
+    def __init__(
+        self,
+        docker_client: AsyncDockerClient,
+        event_monitor: DockerEventMonitor,
+        container: docker.models.containers.Container,
+        *,
+        sampling_interval: float,
+        stderr_limit: int,
+        cpu_time_limit_ns: Optional[int] = None,
+        output_limit: Optional[int] = None,
+    ):
+        """Initializes the supervisor.
+
+        Args:
+            docker_client: The Docker client to use
+            event_monitor: The started event monitor to wait for the container with
+            container: The container to supervise
+            sampling_interval: The interval between resource usage samples in seconds
+            stderr_limit: The maximum size in bytes of the stderr output to keep
+            cpu_time_limit_ns: The CPU time limit of the container in nanoseconds
+            output_limit: The limit in bytes of the output of the container to stdout and
+                stderr, counted from its log files
+        """
+
+        self._docker_client = docker_client
+        self._event_monitor = event_monitor
+        self._container = container
+        self._sampling_interval = sampling_interval
+        self._stderr_limit = stderr_limit
+        self._cpu_time_limit_ns = cpu_time_limit_ns
+        self._output_limit = output_limit
+
+        self._output_counter = LogOutputCounter(container)
+
+    @property
+    def exit_task(self) -> asyncio.Future[ContainerExit]:
+        """The task resolving to the exit of the container."""
+
+        assert self._exit_task is not None
+
+        return self._exit_task
+
+    def cancel(self) -> None:
+        """Stops supervising the container, e.g. when the match has failed."""
+
+        for task in [self._exit_task, self._sampling_task]:
+            if task is not None:
+                task.cancel()
+
+    async def finish(
+        self, *, stderr_file_path: Optional[Path] = None
+    ) -> ContainerOutcome:
+        """Stops the container if it is still running and gets its outcome.
+
+        Args:
+            stderr_file_path: The path to store a non-empty tail of the stderr output in, instead
+                of keeping it in the outcome
+
+        Returns:
+            The outcome of the container
+        """
+
+        assert self._exit_task is not None and self._sampling_task is not None
+
+        if self._exit_task.done():
+            container_exit = self._exit_task.result()
+            exit_code = container_exit.exit_code
+
+        else:
+            logging.debug("Stopping container %s", self._container.name)
+
+            await self._docker_client.call(self._container.stop, timeout=0)
+
+            # The container is stopped by the supervisor so we regard it as a normal exit. Its exit
+            # is still awaited to know if it has been OOM killed.
+            exit_code = 0
+
+            done, _ = await asyncio.wait(
+                [self._exit_task], timeout=_STOPPED_CONTAINER_EXIT_TIMEOUT
+            )
+            container_exit = (
+                self._exit_task.result()
+                if len(done) > 0
+                else ContainerExit(exit_code=exit_code, oom_killed=False)
+            )
+
+        stderr_output: bytes = await self._docker_client.call(
+            read_log_tail, self._container, self._stderr_limit
+        )
+
+        if stderr_file_path is not None and len(stderr_output) > 0:
+            await asyncio.to_thread(write_log_tail, stderr_output, stderr_file_path)
+
+        else:
+            stderr_file_path = None
+
+        return ContainerOutcome(
+            exit_code=exit_code,
+            limit_status=self._limit_status,
+            oom_killed=container_exit.oom_killed,
+            resource_usage=await self._sampling_task,
+            stderr_file_path=(
+                str(stderr_file_path) if stderr_file_path is not None else None
+            ),
+            stderr_output=(
+                stderr_output.decode("utf-8", errors="replace")
+                if stderr_file_path is None
+                else ""
+            ),
+        )
+
+    def start(self) -> None:
+        """Starts supervising the container."""
+
+        self._exit_task = asyncio.ensure_future(
+            self._event_monitor.wait(self._container)
+        )
+        self._sampling_task = asyncio.ensure_future(
+            sample_resource_usage(
+                self._docker_client,
+                self._container,
+                self._event_monitor.wait(self._container),
+                interval=self._sampling_interval,
+                on_sample=self._enforce_limits,
+            )
+        )
+
+    async def _enforce_limits(self, resource_usage: MatchResult.ResourceUsage) -> None:
+        """Kills the container if it has exceeded its CPU time or output limit.
+
+        Args:
+            resource_usage: The resource usage of the container so far
+        """
+
+        if self._limit_status is not None:
+            return
+
+        if (
+            self._cpu_time_limit_ns is not None
+            and resource_usage.cpu_ns > self._cpu_time_limit_ns
+        ):
+            self._limit_status = "TLE"
+
+        elif (
+            self._output_limit is not None
+            and await asyncio.to_thread(self._output_counter.count) > self._output_limit
+        ):
+            self._limit_status = "OLE"
+
+        else:
+            return
+
+        logging.info(
+            "Killing container %s: %s", self._container.name, self._limit_status
+        )
+
+        try:
+            await self._docker_client.call(self._container.kill)
+
+        except docker.errors.APIError as e:
+            # The container may have exited in the meantime.
+            logging.debug("Failed to kill container %s: %s", self._container.name, e)
+
+
+async def wait_exit_quorum(
+    supervisors: List[ContainerSupervisor],
+    quorum: Optional[int | Literal["all"]],
+    *,
+    grace_period: float,
+) -> None:
+    """Waits until a quorum of supervised containers has exited, plus a grace period.
+
+    Waits forever if there is no quorum or no container.
+
+    Args:
+        supervisors: The started supervisors of the containers
+        quorum: The number of containers, capped at the number of containers, or "all"
+        grace_period: The time in seconds to wait after the quorum is reached
+    """
+
+    exit_tasks: Set[asyncio.Future[ContainerExit]] = {
+        supervisor.exit_task for supervisor in supervisors
+    }
+
+    quorum_count = (
+        len(exit_tasks) if quorum == "all" else min(quorum or 0, len(exit_tasks))
+    )
+
+    if quorum_count == 0:
+        await asyncio.Future()
+
+    exited_count = 0
+
+    while exited_count < quorum_count:
+        done, exit_tasks = await asyncio.wait(
+            exit_tasks, return_when=asyncio.FIRST_COMPLETED
+        )
+        exited_count += len(done)
+
+    await asyncio.sleep(grace_period)
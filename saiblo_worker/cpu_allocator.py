@@ -0,0 +1,245 @@
+"""The implementation of the allocator of CPUs to pin match containers to."""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+_SYSFS_CPU_ONLINE_PATH = Path("/sys/devices/system/cpu/online")
+_SYSFS_NODE_DIR_PATH = Path("/sys/devices/system/node")
+
+
+class CpuAllocator:
+    """Allocates disjoint sets of CPUs to matches, preferring CPUs of a single NUMA node.
+
+    The allocator is shared between the match judger, which pins the containers of each match to
+    the allocated CPUs, and the task scheduler, which only admits new tasks while there are
+    enough free CPUs.
+    """
+
+    _condition: asyncio.Condition
+    _free_cpus: Set[int]
+    _last_request_count: int = 0
+    _nodes: List[List[int]]
+
+    def __init__(self, *, nodes: Optional[List[List[int]]] = None):
+        """Initializes the allocator.
+
+        Args:
+            nodes: The CPUs of each NUMA node. Read from sysfs and restricted to the CPUs the
+                worker may run on if not given.
+        """
+
+        self._nodes = [sorted(node) for node in (nodes or read_cpu_topology()) if node]
+        self._free_cpus = {cpu for node in self._nodes for cpu in node}
+        self._condition = asyncio.Condition()
+
+        logging.info(
+            "Allocating CPUs %s to matches",
+            " | ".join(format_cpu_list(node) for node in self._nodes),
+        )
+
+    @property
+    def available_count(self) -> int:
+        """The number of free CPUs."""
+
+        return len(self._free_cpus)
+
+    @property
+    def can_admit(self) -> bool:
+        """Whether as many CPUs as requested last time are free.
+
+        That is, whether another match of the same size can start without waiting for CPUs.
+        """
+
+        return len(self._free_cpus) >= self._last_request_count
+
+    @property
+    def total_count(self) -> int:
+        """The number of CPUs managed by the allocator."""
+
+        return sum(len(node) for node in self._nodes)
+
+    async def allocate(self, count: int) -> List[int]:
+        """Allocates CPUs, waiting until enough of them are free.
+
+        The CPUs are taken from the NUMA node with the fewest free CPUs that still has enough of
+        them, so that large nodes stay available for large requests. If no node has enough free
+        CPUs, the CPUs are taken from the nodes with the most free CPUs.
+
+        Args:
+            count: The number of CPUs
+
+        Returns:
+            The sorted allocated CPUs
+
+        Raises:
+            ValueError: If the allocator manages fewer CPUs than requested
+        """
+
+        if count > self.total_count:
+            raise ValueError(
+                f"Cannot allocate {count} CPUs out of {self.total_count} CPUs"
+            )
+
+        self._last_request_count = count
+
+        async with self._condition:
+            await self._condition.wait_for(lambda: len(self._free_cpus) >= count)
+
+            free_cpus_by_node: Dict[int, List[int]] = {
+                i: [cpu for cpu in node if cpu in self._free_cpus]
+                for i, node in enumerate(self._nodes)
+            }
+
+            fitting_nodes = [
+                i for i, cpus in free_cpus_by_node.items() if len(cpus) >= count
+            ]
+
+            if len(fitting_nodes) > 0:
+                best_node = min(fitting_nodes, key=lambda i: len(free_cpus_by_node[i]))
+                cpus = free_cpus_by_node[best_node][:count]
+
+            else:
+                cpus = []
+
+                for i in sorted(
+                    free_cpus_by_node,
+                    key=lambda i: len(free_cpus_by_node[i]),
+                    reverse=True,
+                ):
+                    cpus += free_cpus_by_node[i][: count - len(cpus)]
+
+            self._free_cpus.difference_update(cpus)
+
+            return sorted(cpus)
+
+    async def release(self, cpus: List[int]) -> None:
+        """Releases allocated CPUs.
+
+        Args:
+            cpus: The CPUs returned by allocate
+        """
+
+        async with self._condition:
+            self._free_cpus.update(cpus)
+            self._condition.notify_all()
+
+    async def reserve(self, cpus: List[int]) -> None:
+        """Marks CPUs as allocated without waiting, e.g. those of matches resumed after a restart.
+
+        Args:
+            cpus: The CPUs
+        """
+
+        async with self._condition:
+            self._free_cpus.difference_update(cpus)
+
+
+def format_cpu_list(cpus: List[int]) -> str:
+    """Formats CPUs as a list accepted by the cpuset_cpus option of Docker, like "0-3,8".
+
+    Args:
+        cpus: The CPUs
+
+    Returns:
+        The CPU list
+    """
+
+    ranges: List[str] = []
+    sorted_cpus = sorted(cpus)
+
+    start = 0
+
+    for i, cpu in enumerate(sorted_cpus):
+        if i + 1 < len(sorted_cpus) and sorted_cpus[i + 1] == cpu + 1:
+            continue
+
+        ranges.append(
+            f"{sorted_cpus[start]}-{cpu}" if start < i else str(sorted_cpus[start])
+        )
+        start = i + 1
+
+    return ",".join(ranges)
+
+
+def parse_cpu_list(cpu_list: str) -> List[int]:
+    """Parses a CPU list in the format of sysfs and cgroups, like "0-3,8".
+
+    Args:
+        cpu_list: The CPU list
+
+    Returns:
+        The sorted CPUs
+    """
+
+    cpus: List[int] = []
+
+    for part in cpu_list.strip().split(","):
+        if part == "":
+            continue
+
+        first, _, last = part.partition("-")
+        cpus += range(int(first), int(last or first) + 1)
+
+    return sorted(cpus)
+
+
+def read_cpu_topology() -> List[List[int]]:
+    """Reads the CPUs of each NUMA node from sysfs.
+
+    Only CPUs the worker process may run on are included, so that a worker limited to some CPUs
+    only hands out those. Without NUMA information, all online CPUs form a single node.
+
+    Returns:
+        The CPUs of each NUMA node
+    """
+
+    usable_cpus = os.sched_getaffinity(0)
+
+    node_cpu_list_paths = sorted(
+        _SYSFS_NODE_DIR_PATH.glob("node[0-9]*/cpulist"),
+        key=lambda path: int(path.parent.name.removeprefix("node")),
+    )
+
+    if len(node_cpu_list_paths) > 0:
+        nodes = [
+            parse_cpu_list(path.read_text(encoding="utf-8"))
+            for path in node_cpu_list_paths
+        ]
+
+    elif _SYSFS_CPU_ONLINE_PATH.is_file():
+        nodes = [parse_cpu_list(_SYSFS_CPU_ONLINE_PATH.read_text(encoding="utf-8"))]
+
+    else:
+        nodes = [sorted(usable_cpus)]
+
+    return [
+        usable_node
+        for usable_node in (
+            [cpu for cpu in node if cpu in usable_cpus] for node in nodes
+        )
+        if len(usable_node) > 0
+    ]
+
+
+def split_cpus(cpus: List[int], counts: List[int]) -> List[List[int]]:
+    """Splits CPUs into consecutive disjoint parts.
+
+    Args:
+        cpus: The CPUs
+        counts: The number of CPUs of each part
+
+    Returns:
+        The parts, in the order of the counts
+    """
+
+    parts: List[List[int]] = []
+    start = 0
+
+    for count in counts:
+        parts.append(cpus[start : start + count])
+        start += count
+
+    return parts
@@ -0,0 +1,135 @@
+"""Maintains the layout of the data directory: migration of old layouts and removal of entries."""
+
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Set
+
+import saiblo_worker.path_manager as path_manager
+
+_removal_tasks: Set[asyncio.Future[None]] = set()
+
+
+def empty_trash_in_background() -> None:
+    """Removes entries left in the trash directory, e.g. by a crash, in background threads.
+
+    Must be called on the event loop.
+    """
+
+    trash_dir_path = path_manager.get_trash_dir_path()
+
+    if not trash_dir_path.is_dir():
+        return
+
+    for path in trash_dir_path.iterdir():
+        _schedule_removal(path)
+
+
+def migrate_to_sharded_layout() -> None:
+    """Moves agent code, replays and stderr outputs saved flat by earlier versions into shards.
+
+    Entries are renamed, so that no data is copied. Entries already in shards are left as is.
+
+    This function blocks on file I/O, so it must not be run on the event loop.
+    """
+
+    moved_count = 0
+
+    agent_code_base_dir_path = path_manager.get_agent_code_base_dir_path()
+
+    for path in list(agent_code_base_dir_path.glob("*.tar")):
+        _move(path, path_manager.get_agent_code_tarball_path(path.stem))
+        moved_count += 1
+
+    match_replay_base_dir_path = path_manager.get_match_replay_base_dir_path()
+
+    for path in list(match_replay_base_dir_path.glob("*.dat")):
+        _move(path, path_manager.get_match_replay_path(path.stem))
+        moved_count += 1
+
+    # Stderr output directories of matches contain files, whereas shards only contain
+    # directories.
+    match_stderr_base_dir_path = path_manager.get_match_stderr_base_dir_path()
+
+    if match_stderr_base_dir_path.is_dir():
+        for path in list(match_stderr_base_dir_path.iterdir()):
+            if path.is_dir() and any(child.is_file() for child in path.iterdir()):
+                # A match ID may be a shard name, so the directory is moved aside first.
+                temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+                os.replace(path, temp_path)
+
+                _move(temp_path, path_manager.get_match_stderr_dir_path(path.name))
+                moved_count += 1
+
+    if moved_count > 0:
+        logging.info("Moved %d entries into the sharded layout", moved_count)
+
+
+def remove_in_background(path: Path) -> None:
+    """Removes a file or directory in a background thread.
+
+    The entry is moved to the trash directory first, so that it is gone at once and its path can
+    be reused immediately.
+
+    Must be called on the event loop.
+
+    Args:
+        path: The path to the file or directory
+    """
+
+    if not path.exists():
+        return
+
+    trash_path = path_manager.get_trash_dir_path() / uuid.uuid4().hex
+
+    try:
+        _move(path, trash_path)
+
+    except OSError as e:
+        # The entry may be on another file system than the trash directory.
+        logging.debug("Failed to move %s to the trash: %s", path, e)
+
+        trash_path = path
+
+    _schedule_removal(trash_path)
+
+
+def _move(path: Path, target_path: Path) -> None:
+    """Moves a file or directory, creating the parent directory of the target.
+
+    Args:
+        path: The path to the file or directory
+        target_path: The path to move it to
+    """
+
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(path, target_path)
+
+
+def _remove(path: Path) -> None:
+    """Removes a file or directory.
+
+    Args:
+        path: The path to the file or directory
+    """
+
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _schedule_removal(path: Path) -> None:
+    """Removes a file or directory in a background thread.
+
+    Args:
+        path: The path to the file or directory
+    """
+
+    removal_task = asyncio.ensure_future(asyncio.to_thread(_remove, path))
+    _removal_tasks.add(removal_task)
+    removal_task.add_done_callback(_removal_tasks.discard)
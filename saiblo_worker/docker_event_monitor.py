@@ -0,0 +1,278 @@
+"""The implementation of the Docker event monitor."""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import docker.models.containers
+
+from saiblo_worker.async_docker_client import AsyncDockerClient
+
+_MAX_RECENT_CONTAINERS = 4096
+_RESUBSCRIBE_INTERVAL = 1
+
+
+@dataclass
+class ContainerExit:
+    """The exit of a container.
+
+    Attributes:
+        exit_code: The exit code of the container
+        oom_killed: Whether the container was killed for running out of memory
+    """
+
+    exit_code: int
+    oom_killed: bool
+
+
+class DockerEventMonitor:
+    """Dispatches container exits from a single Docker events subscription to asyncio futures.
+
+    Waiting for a container takes no thread, however many containers are waited for. The
+    subscription itself is read by one dedicated thread. The exits of the most recent containers
+    are remembered, so that a container exiting right after its start is not missed.
+    """
+
+    _docker_client: AsyncDockerClient
+    _exits: OrderedDict[str, ContainerExit]
+    _filters: Dict[str, Any]
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _oom_killed_container_ids: OrderedDict[str, None]
+    _start_lock: asyncio.Lock
+    _stream: Optional[Any] = None
+    _waiters: Dict[str, List[asyncio.Future[ContainerExit]]]
+
+    def __init__(self, docker_client: AsyncDockerClient, *, labels: List[str]):
+        """Initializes the Docker event monitor.
+
+        Args:
+            docker_client: The Docker client to use
+            labels: The label filters of the containers to monitor, e.g. ["key=value"]
+        """
+
+        self._docker_client = docker_client
+        self._filters = {
+            "event": ["die", "oom"],
+            "label": labels,
+            "type": ["container"],
+        }
+
+        self._exits = OrderedDict()
+        self._oom_killed_container_ids = OrderedDict()
+        self._start_lock = asyncio.Lock()
+        self._waiters = {}
+
+    async def close(self) -> None:
+        """Stops monitoring and closes the subscription."""
+
+        if self._stream is not None:
+            stream = self._stream
+            self._stream = None
+
+            await self._docker_client.call(stream.close)
+
+    def get_exit(
+        self, container: docker.models.containers.Container
+    ) -> Optional[ContainerExit]:
+        """Gets the exit of a container if it is known to have exited.
+
+        Args:
+            container: The container
+
+        Returns:
+            The exit of the container, or None if it is not known to have exited
+        """
+
+        assert container.id is not None
+
+        return self._exits.get(container.id)
+
+    def record_exited(self, container: docker.models.containers.Container) -> None:
+        """Records the exit of a container if it has exited, e.g. while no one was subscribed.
+
+        Args:
+            container: The container, with its attributes loaded after subscribing
+        """
+
+        assert container.id is not None
+
+        state = container.attrs["State"]
+
+        if state["Status"] in ("exited", "dead"):
+            self._resolve(
+                container.id,
+                ContainerExit(
+                    exit_code=state["ExitCode"], oom_killed=state["OOMKilled"]
+                ),
+            )
+
+    async def start(self) -> None:
+        """Subscribes to Docker events, unless subscribed already.
+
+        All container exits happening after this method returns are dispatched.
+        """
+
+        async with self._start_lock:
+            if self._stream is not None:
+                return
+
+            self._loop = asyncio.get_running_loop()
+
+            await self._subscribe()
+
+    async def wait(
+        self, container: docker.models.containers.Container
+    ) -> ContainerExit:
+        """Waits until a started container exits.
+
+        The monitor must have been started before the container.
+
+        Args:
+            container: The container to wait for
+
+        Returns:
+            The exit of the container
+        """
+
+        assert container.id is not None
+
+        if container.id in self._exits:
+            return self._exits[container.id]
+
+        future: asyncio.Future[ContainerExit] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._waiters.setdefault(container.id, []).append(future)
+
+        try:
+            return await future
+
+        finally:
+            waiters = self._waiters.get(container.id, [])
+
+            if future in waiters:
+                waiters.remove(future)
+
+            if len(waiters) == 0:
+                self._waiters.pop(container.id, None)
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        """Handles a Docker event on the event loop.
+
+        Args:
+            event: The decoded event
+        """
+
+        container_id: str = event["Actor"]["ID"]
+
+        match event["Action"]:
+            case "oom":
+                _remember(self._oom_killed_container_ids, container_id, None)
+
+            case "die":
+                self._resolve(
+                    container_id,
+                    ContainerExit(
+                        exit_code=int(event["Actor"]["Attributes"].get("exitCode", 0)),
+                        oom_killed=container_id in self._oom_killed_container_ids,
+                    ),
+                )
+
+    def _read_events(self, stream: Any) -> None:
+        """Reads the subscription in the dedicated thread until it ends.
+
+        Args:
+            stream: The stream of decoded events
+        """
+
+        assert self._loop is not None
+
+        try:
+            for event in stream:
+                self._loop.call_soon_threadsafe(self._dispatch, event)
+
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error("Docker event subscription failed: (%s) %s", type(e), e)
+
+        if self._stream is stream and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._resubscribe(), self._loop)
+
+    async def _resubscribe(self) -> None:
+        """Subscribes again after the subscription ended unexpectedly.
+
+        Exits that happened while unsubscribed are recovered by inspecting waited containers.
+        """
+
+        logging.warning("Docker event subscription ended, resubscribing")
+
+        while True:
+            try:
+                await self._subscribe()
+                break
+
+            except Exception as e:  # pylint: disable=broad-except
+                logging.error(
+                    "Failed to subscribe to Docker events: (%s) %s", type(e), e
+                )
+
+                await asyncio.sleep(_RESUBSCRIBE_INTERVAL)
+
+        for container_id in list(self._waiters):
+            try:
+                container = await self._docker_client.call_with_client(
+                    lambda client, container_id=container_id: client.containers.get(
+                        container_id
+                    )
+                )
+
+            except Exception:  # pylint: disable=broad-except
+                continue
+
+            self.record_exited(container)
+
+    def _resolve(self, container_id: str, container_exit: ContainerExit) -> None:
+        """Records the exit of a container and wakes up its waiters.
+
+        Args:
+            container_id: The ID of the container
+            container_exit: The exit of the container
+        """
+
+        _remember(self._exits, container_id, container_exit)
+
+        for future in self._waiters.pop(container_id, []):
+            if not future.done():
+                future.set_result(container_exit)
+
+    async def _subscribe(self) -> None:
+        """Opens a subscription and starts reading it in a dedicated thread."""
+
+        self._stream = await self._docker_client.call_with_client(
+            lambda client: client.events(decode=True, filters=self._filters)
+        )
+
+        threading.Thread(
+            target=self._read_events,
+            args=(self._stream,),
+            daemon=True,
+            name="saiblo-worker-docker-events",
+        ).start()
+
+
+def _remember(recent: OrderedDict, key: str, value: Any) -> None:
+    """Adds an entry to a dictionary of recent entries, evicting the oldest ones.
+
+    Args:
+        recent: The dictionary of recent entries
+        key: The key of the entry
+        value: The value of the entry
+    """
+
+    recent[key] = value
+    recent.move_to_end(key)
+
+    while len(recent) > _MAX_RECENT_CONTAINERS:
+        recent.popitem(last=False)
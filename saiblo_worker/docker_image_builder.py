@@ -1,14 +1,14 @@
 """The implementation of the Docker image builder."""
 
-import asyncio
 import logging
+import time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
-import docker
-import docker.errors
 import urllib3
 
+import saiblo_worker.metrics as metrics
+from saiblo_worker.async_docker_client import AsyncDockerClient
 from saiblo_worker.base_docker_image_builder import BaseDockerImageBuilder
 from saiblo_worker.build_result import BuildResult
 
@@ -19,16 +19,17 @@ class DockerImageBuilder(BaseDockerImageBuilder):
     """The Docker image builder."""
 
     _build_timeout: int
-    _docker_client: docker.DockerClient
+    _docker_client: AsyncDockerClient
 
     def __init__(
         self,
         *,
         build_timeout: int,
+        docker_client: Optional[AsyncDockerClient] = None,
     ):
         self._build_timeout = build_timeout
 
-        self._docker_client = docker.from_env()
+        self._docker_client = docker_client or AsyncDockerClient()
 
     async def build(self, code_id: str, file_path: Path) -> BuildResult:
         logging.debug("Building agent code %s", code_id)
@@ -36,25 +37,29 @@ async def build(self, code_id: str, file_path: Path) -> BuildResult:
         # If built, return the image tag.
         matched_image = [
             tag
-            for image in self._docker_client.images.list(_IMAGE_REPOSITORY)
+            for image in await self._docker_client.list_images(_IMAGE_REPOSITORY)
             for tag in image.tags
             if tag.split(":")[-1] == code_id
         ]
 
         if len(matched_image) > 0:
+            metrics.BUILD_CACHE_LOOKUPS.inc(result="hit")
+
             return BuildResult(
                 code_id=code_id,
                 image=matched_image[0],
                 message="",
             )
 
+        metrics.BUILD_CACHE_LOOKUPS.inc(result="miss")
+
         tag = f"{_IMAGE_REPOSITORY}:{code_id}"
+        start_time = time.perf_counter()
 
         try:
             with open(file_path, "rb") as tar_file:
                 try:
-                    await asyncio.to_thread(
-                        self._docker_client.images.build,
+                    await self._docker_client.build_image(
                         custom_context=True,
                         fileobj=tar_file,
                         forcerm=True,
@@ -69,6 +74,10 @@ async def build(self, code_id: str, file_path: Path) -> BuildResult:
 
             logging.info("Agent code %s built", code_id)
 
+            metrics.BUILD_DURATION.observe(
+                time.perf_counter() - start_time, status="success"
+            )
+
             return BuildResult(
                 code_id=code_id,
                 image=tag,
@@ -78,6 +87,10 @@ async def build(self, code_id: str, file_path: Path) -> BuildResult:
         except Exception as e:  # pylint: disable=broad-except
             logging.error("Failed to build agent code %s: (%s) %s", code_id, type(e), e)
 
+            metrics.BUILD_DURATION.observe(
+                time.perf_counter() - start_time, status="failure"
+            )
+
             return BuildResult(
                 code_id=code_id,
                 image=None,
@@ -87,17 +100,17 @@ async def build(self, code_id: str, file_path: Path) -> BuildResult:
     async def clean(self) -> None:
         logging.debug("Cleaning images")
 
-        images = self._docker_client.images.list(_IMAGE_REPOSITORY)
+        images = await self._docker_client.list_images(_IMAGE_REPOSITORY)
 
         for image in images:
-            image.remove(force=True)
+            await self._docker_client.call(image.remove, force=True)
 
         logging.info("Images cleaned")
 
     async def list(self) -> Dict[str, str]:
         images = [
             tag
-            for image in self._docker_client.images.list(_IMAGE_REPOSITORY)
+            for image in await self._docker_client.list_images(_IMAGE_REPOSITORY)
             for tag in image.tags
             if tag.split(":")[0] == _IMAGE_REPOSITORY
         ]
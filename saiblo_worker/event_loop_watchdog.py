@@ -0,0 +1,124 @@
+"""The implementation of the event loop watchdog."""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+import saiblo_worker.metrics as metrics
+
+_DEFAULT_INTERVAL = 0.1
+_DEFAULT_THRESHOLD = 0.5
+
+
+class EventLoopWatchdog:
+    """Measures the lag of the event loop and reports where it is blocked.
+
+    A task on the event loop sleeps repeatedly and measures how late it wakes up. A dedicated
+    thread watches the time the task last woke up, and once the event loop has been blocked for
+    longer than the threshold, it logs the stack of the event loop thread, i.e. of the blocking
+    call in the coroutine that made it. Each stall is logged once.
+    """
+
+    _debug: bool
+    _interval: float
+    _last_wake_up_time: float = 0
+    _threshold: float
+
+    def __init__(
+        self,
+        *,
+        debug: bool = False,
+        interval: float = _DEFAULT_INTERVAL,
+        threshold: float = _DEFAULT_THRESHOLD,
+    ):
+        """Initializes the watchdog.
+
+        Args:
+            debug: Whether to turn on the debug mode of asyncio, which also logs every callback
+                running longer than the threshold
+            interval: The time in seconds between measurements of the lag
+            threshold: The lag in seconds beyond which the event loop is considered stalled
+        """
+
+        self._debug = debug
+        self._interval = interval
+        self._threshold = threshold
+
+    async def start(self) -> None:
+        """Watches the event loop until cancelled."""
+
+        loop = asyncio.get_running_loop()
+
+        if self._debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self._threshold
+
+        self._last_wake_up_time = time.monotonic()
+
+        stop_event = threading.Event()
+        thread = threading.Thread(
+            target=self._watch,
+            args=(threading.get_ident(), stop_event),
+            daemon=True,
+            name="saiblo-worker-event-loop-watchdog",
+        )
+        thread.start()
+
+        try:
+            while True:
+                sleep_time = time.monotonic()
+
+                await asyncio.sleep(self._interval)
+
+                self._last_wake_up_time = time.monotonic()
+
+                lag = max(0.0, self._last_wake_up_time - sleep_time - self._interval)
+
+                metrics.EVENT_LOOP_LAG.observe(lag)
+
+                if lag > self._threshold:
+                    metrics.EVENT_LOOP_STALLS.inc()
+
+                    logging.warning("Event loop lagged %.3f s", lag)
+
+        finally:
+            stop_event.set()
+
+    def _watch(self, loop_thread_id: int, stop_event: threading.Event) -> None:
+        """Logs the stack of the event loop thread whenever it stalls.
+
+        Args:
+            loop_thread_id: The ID of the thread running the event loop
+            stop_event: The event set to stop watching
+        """
+
+        logged_wake_up_time: Optional[float] = None
+
+        while not stop_event.wait(self._interval):
+            last_wake_up_time = self._last_wake_up_time
+            blocked_time = time.monotonic() - last_wake_up_time - self._interval
+
+            if (
+                blocked_time <= self._threshold
+                or last_wake_up_time == logged_wake_up_time
+            ):
+                continue
+
+            logged_wake_up_time = last_wake_up_time
+
+            frame = sys._current_frames().get(  # pylint: disable=protected-access
+                loop_thread_id
+            )
+
+            if frame is None:
+                continue
+
+            logging.warning(
+                "Event loop blocked for %.3f s at:\n%s",
+                blocked_time,
+                "".join(traceback.format_stack(frame)).rstrip(),
+            )
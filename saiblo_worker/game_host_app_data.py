@@ -0,0 +1,362 @@
+"""Passes the tokens to and extracts the app data of game host containers."""
+
+import asyncio
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import stat
+import tarfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, TypedDict
+
+import docker.models.containers
+
+GAME_HOST_APP_DATA_DIR_PATH = "/app/data/"
+GAME_HOST_REPLAY_FILE_NAME = "data/replay.dat"
+GAME_HOST_RESULT_FILE_NAME = "data/result.json"
+GAME_HOST_TOKENS_FILE_PATH = "/app/tokens"
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+_GAME_HOST_APP_DATA_CHUNK_SIZE = 1024 * 1024
+_MAX_RESULT_FILE_SIZE = 16 * 1024 * 1024
+
+
+class GameHostMatchResult(TypedDict):
+    """The result of a match from the game host.
+
+    Attributes:
+        scores: The mapping from agent tokens to scores.
+    """
+
+    scores: Dict[str, float]
+
+
+class _ChunkReader(io.RawIOBase):
+    """A readable binary stream over an iterable of byte chunks.
+
+    Only one chunk is held in memory at a time.
+    """
+
+    _chunk: memoryview
+    _chunks: Iterator[bytes]
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunk = memoryview(b"")
+        self._chunks = iter(chunks)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._chunk) == 0:
+            next_chunk: Optional[bytes] = next(self._chunks, None)
+
+            if next_chunk is None:
+                return 0
+
+            self._chunk = memoryview(next_chunk)
+
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+
+        return size
+
+
+def check_dir_size(dir_path: Path, size_limit: int) -> None:
+    """Checks that the total size of the files in a directory is within a limit.
+
+    Args:
+        dir_path: The path to the directory
+        size_limit: The size limit in bytes
+
+    Raises:
+        ValueError: If the directory exceeds the size limit
+    """
+
+    size = get_dir_size(dir_path)
+
+    if size > size_limit:
+        raise ValueError(f"Game host data size {size} exceeds limit {size_limit}")
+
+
+def extract_game_host_app_data(
+    tarball_chunks: Iterable[bytes],
+    replay_file_path: Path,
+    *,
+    replay_compression_level: Optional[int] = None,
+) -> GameHostMatchResult:
+    """Extracts the result and the replay file from the app data tarball of a game host.
+
+    The tarball is walked once as a stream. The replay file is written straight to its path with
+    a bounded buffer, the result file is parsed from its own member only, and all other members
+    are skipped. Memory usage does not depend on the size of the tarball.
+
+    This function blocks, so it must not be run on the event loop.
+
+    Args:
+        tarball_chunks: The chunks of the app data tarball, e.g. from `Container.get_archive`
+        replay_file_path: The path to save the replay file to
+        replay_compression_level: The gzip compression level to compress the replay file with
+            while saving it. The replay file is saved as is if not given.
+
+    Returns:
+        The match result reported by the game host
+
+    Raises:
+        FileNotFoundError: If the game host has not written the result or the replay file. A
+            replay path holding anything but a regular file is read as an empty replay.
+    """
+
+    game_host_match_result: Optional[GameHostMatchResult] = None
+    replay_saved = False
+
+    with tarfile.open(
+        fileobj=io.BufferedReader(_ChunkReader(tarball_chunks), _COPY_BUFFER_SIZE),
+        mode="r|",
+    ) as tar_file:
+        for tar_info in tar_file:
+            if tar_info.name == GAME_HOST_REPLAY_FILE_NAME:
+                # A replay member that is not a regular file, e.g. a directory, is saved as an
+                # empty replay, as it always has been. Links cannot be followed in a stream.
+                member_file = (
+                    tar_file.extractfile(tar_info) if tar_info.isfile() else None
+                )
+
+                _save_replay_file(
+                    member_file or io.BytesIO(),
+                    replay_file_path,
+                    replay_compression_level,
+                )
+
+                replay_saved = True
+
+            elif tar_info.name == GAME_HOST_RESULT_FILE_NAME and tar_info.isfile():
+                if tar_info.size > _MAX_RESULT_FILE_SIZE:
+                    raise ValueError(
+                        f"Game host result file too large: {tar_info.size} bytes"
+                    )
+
+                member_file = tar_file.extractfile(tar_info)
+                assert member_file is not None
+
+                game_host_match_result = json.loads(member_file.read().decode("utf-8"))
+
+    if game_host_match_result is None:
+        raise FileNotFoundError(f"Game host wrote no {GAME_HOST_RESULT_FILE_NAME}")
+
+    if not replay_saved:
+        raise FileNotFoundError(f"Game host wrote no {GAME_HOST_REPLAY_FILE_NAME}")
+
+    return game_host_match_result
+
+
+def collect_game_host_app_data(
+    data_dir_path: Path,
+    replay_file_path: Path,
+    *,
+    replay_compression_level: Optional[int] = None,
+) -> GameHostMatchResult:
+    """Collects the result and the replay file from the host data directory of a game host.
+
+    Unless it is compressed, the replay file is moved by a rename if both paths are on the same
+    file system, or by a copy using sendfile otherwise. Symbolic links are rejected, so that a
+    game host cannot make the worker read or upload files outside its data directory.
+
+    This function blocks, so it must not be run on the event loop.
+
+    Args:
+        data_dir_path: The host directory mounted at the app data directory of the game host
+        replay_file_path: The path to move the replay file to
+        replay_compression_level: The gzip compression level to compress the replay file with.
+            The replay file is moved as is if not given.
+
+    Returns:
+        The match result reported by the game host
+
+    Raises:
+        FileNotFoundError: If the game host has not written the result or the replay file
+    """
+
+    result_file_path = data_dir_path / Path(GAME_HOST_RESULT_FILE_NAME).name
+    game_host_replay_file_path = data_dir_path / Path(GAME_HOST_REPLAY_FILE_NAME).name
+
+    if not _is_regular_file(result_file_path):
+        raise FileNotFoundError(f"Game host wrote no {GAME_HOST_RESULT_FILE_NAME}")
+
+    if not _is_regular_file(game_host_replay_file_path):
+        raise FileNotFoundError(f"Game host wrote no {GAME_HOST_REPLAY_FILE_NAME}")
+
+    result_file_size = result_file_path.stat().st_size
+
+    if result_file_size > _MAX_RESULT_FILE_SIZE:
+        raise ValueError(f"Game host result file too large: {result_file_size} bytes")
+
+    game_host_match_result: GameHostMatchResult = json.loads(
+        result_file_path.read_bytes().decode("utf-8")
+    )
+
+    if replay_compression_level is None:
+        shutil.move(game_host_replay_file_path, replay_file_path)
+
+    else:
+        with game_host_replay_file_path.open("rb") as f:
+            _save_replay_file(f, replay_file_path, replay_compression_level)
+
+        game_host_replay_file_path.unlink()
+
+    return game_host_match_result
+
+
+def get_dir_size(dir_path: Path) -> int:
+    """Gets the total size of the files in a directory, without following symbolic links.
+
+    Args:
+        dir_path: The path to the directory
+
+    Returns:
+        The total size in bytes, or 0 if the directory does not exist
+    """
+
+    size = 0
+
+    for root, _, file_names in os.walk(dir_path):
+        for file_name in file_names:
+            try:
+                size += os.lstat(os.path.join(root, file_name)).st_size
+            except FileNotFoundError:
+                pass
+
+    return size
+
+
+def make_tokens_tarball(tokens: List[str]) -> bytes:
+    """Makes a tarball containing the tokens file for a game host container.
+
+    Args:
+        tokens: The tokens of the agents
+
+    Returns:
+        The tarball to extract at the root of the game host container
+    """
+
+    tokens_bytes = ",".join(tokens).encode("utf-8")
+
+    tar_info = tarfile.TarInfo(GAME_HOST_TOKENS_FILE_PATH.lstrip("/"))
+    tar_info.mode = 0o444
+    tar_info.size = len(tokens_bytes)
+
+    tarball_bytesio = io.BytesIO()
+
+    with tarfile.open(fileobj=tarball_bytesio, mode="w") as tar_file:
+        tar_file.addfile(tar_info, io.BytesIO(tokens_bytes))
+
+    return tarball_bytesio.getvalue()
+
+
+def save_game_host_app_data(
+    game_host_container: docker.models.containers.Container,
+    replay_file_path: Path,
+    *,
+    replay_compression_level: Optional[int] = None,
+) -> GameHostMatchResult:
+    """Gets the app data of a stopped game host container and saves the replay file.
+
+    This function blocks on the Docker daemon, so it must not be run on the event loop.
+
+    Args:
+        game_host_container: The game host container
+        replay_file_path: The path to save the replay file to
+        replay_compression_level: The gzip compression level to compress the replay file with
+            while saving it. The replay file is saved as is if not given.
+
+    Returns:
+        The match result reported by the game host
+    """
+
+    game_host_app_data_tarball_stream, _ = game_host_container.get_archive(
+        GAME_HOST_APP_DATA_DIR_PATH, chunk_size=_GAME_HOST_APP_DATA_CHUNK_SIZE
+    )
+
+    return extract_game_host_app_data(
+        game_host_app_data_tarball_stream,
+        replay_file_path,
+        replay_compression_level=replay_compression_level,
+    )
+
+
+async def watch_dir_size(dir_path: Path, size_limit: int, *, interval: float) -> None:
+    """Checks the size of a directory periodically until it exceeds a limit.
+
+    Args:
+        dir_path: The path to the directory
+        size_limit: The size limit in bytes
+        interval: The interval between checks in seconds
+
+    Raises:
+        ValueError: As soon as the directory exceeds the size limit
+    """
+
+    while True:
+        await asyncio.to_thread(check_dir_size, dir_path, size_limit)
+
+        await asyncio.sleep(interval)
+
+
+def _is_regular_file(path: Path) -> bool:
+    """Checks whether a path is a regular file and not a symbolic link.
+
+    Args:
+        path: The path to check
+
+    Returns:
+        Whether the path is a regular file
+    """
+
+    try:
+        return stat.S_ISREG(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+def _save_replay_file(
+    source_file: BinaryIO, replay_file_path: Path, compression_level: Optional[int]
+) -> None:
+    """Copies a replay file with a bounded buffer, compressing it with gzip if requested.
+
+    The compression ratio and time are logged.
+
+    Args:
+        source_file: The replay file to copy from
+        replay_file_path: The path to save the replay file to
+        compression_level: The gzip compression level, or None to save the replay file as is
+    """
+
+    if compression_level is None:
+        with replay_file_path.open("wb") as f:
+            shutil.copyfileobj(source_file, f, _COPY_BUFFER_SIZE)
+
+        return
+
+    start_time = time.perf_counter()
+    size = 0
+
+    with gzip.open(replay_file_path, "wb", compresslevel=compression_level) as f:
+        while chunk := source_file.read(_COPY_BUFFER_SIZE):
+            f.write(chunk)
+            size += len(chunk)
+
+    compressed_size = replay_file_path.stat().st_size
+
+    logging.info(
+        "Compressed replay file %s from %d to %d bytes (ratio %.2f) in %.3f s",
+        replay_file_path,
+        size,
+        compressed_size,
+        size / compressed_size,
+        time.perf_counter() - start_time,
+    )
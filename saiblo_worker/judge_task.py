@@ -3,6 +3,8 @@
 from dataclasses import dataclass
 from typing import List, Optional
 
+import saiblo_worker.metrics as metrics
+import saiblo_worker.tracing as tracing
 from saiblo_worker.base_agent_code_fetcher import BaseAgentCodeFetcher
 from saiblo_worker.base_build_result_reporter import BaseBuildResultReporter
 from saiblo_worker.base_docker_image_builder import BaseDockerImageBuilder
@@ -21,6 +23,7 @@ class JudgeTask(BaseTask):
     _builder: BaseDockerImageBuilder
     _build_result_reporter: BaseBuildResultReporter
     _agent_code_ids: List[str]
+    _agent_images: Optional[List[Optional[str]]]
     _fetcher: BaseAgentCodeFetcher
     _game_host_image_tag: str
     _judger: BaseMatchJudger
@@ -38,11 +41,14 @@ def __init__(
         build_result_reporter: BaseBuildResultReporter,
         judger: BaseMatchJudger,
         match_result_reporter: BaseMatchResultReporter,
+        *,
+        agent_images: Optional[List[Optional[str]]] = None,
     ):
         self._match_id = match_id
 
         self._game_host_image_tag = game_host_image
         self._agent_code_ids = agent_code_ids
+        self._agent_images = agent_images
 
         self._fetcher = fetcher
         self._builder = builder
@@ -60,6 +66,10 @@ def match_id(self) -> str:
     def result(self) -> Optional[MatchResult]:
         return self._result
 
+    @property
+    def trace_key(self) -> str:
+        return tracing.get_match_trace_key(self._match_id)
+
     def __str__(self) -> str:
         return f"JudgeTask(match_id={self._match_id})"
 
@@ -67,31 +77,44 @@ async def execute(self) -> MatchResult:
         match_result: Optional[MatchResult] = None
 
         try:
-            cached_agent_build_results = await self._builder.list()
-
-            agent_build_results = [
-                (
-                    await BuildTask(
-                        code_id,
-                        self._fetcher,
-                        self._builder,
-                        self._build_result_reporter,
-                    ).execute()
-                    if code_id not in cached_agent_build_results
-                    else BuildResult(
-                        code_id=code_id,
-                        image=cached_agent_build_results[code_id],
-                        message="",
-                    )
+            # The agents of a resumed match have been built already.
+            if self._agent_images is None:
+                with tracing.span("build_agents", trace_key=self.trace_key):
+                    cached_agent_build_results = await self._builder.list()
+
+                    agent_build_results: List[BuildResult] = []
+
+                    for code_id in self._agent_code_ids:
+                        if code_id in cached_agent_build_results:
+                            # Misses are counted by the builder when building.
+                            metrics.BUILD_CACHE_LOOKUPS.inc(result="hit")
+
+                            agent_build_results.append(
+                                BuildResult(
+                                    code_id=code_id,
+                                    image=cached_agent_build_results[code_id],
+                                    message="",
+                                )
+                            )
+
+                        else:
+                            agent_build_results.append(
+                                await BuildTask(
+                                    code_id,
+                                    self._fetcher,
+                                    self._builder,
+                                    self._build_result_reporter,
+                                ).execute()
+                            )
+
+                self._agent_images = [x.image for x in agent_build_results]
+
+            with tracing.span("judge", trace_key=self.trace_key):
+                match_result = await self._judger.judge(
+                    self._match_id,
+                    self._game_host_image_tag,
+                    self._agent_images,
                 )
-                for code_id in self._agent_code_ids
-            ]
-
-            match_result = await self._judger.judge(
-                self._match_id,
-                self._game_host_image_tag,
-                [x.image for x in agent_build_results],
-            )
 
         except Exception as e:  # pylint: disable=broad-except
             match_result = MatchResult(
@@ -103,14 +126,15 @@ async def execute(self) -> MatchResult:
                         status="UE",
                         stderr_output="",
                     )
-                    for _ in self._agent_code_ids
+                    for _ in self._agent_images or self._agent_code_ids
                 ],
                 error_message=str(e),
                 replay_file_path=None,
                 stderr_output="",
             )
 
-        await self._match_result_reporter.report(match_result)
+        with tracing.span("report", trace_key=self.trace_key):
+            await self._match_result_reporter.report(match_result)
 
         self._result = match_result
 
@@ -165,3 +189,23 @@ def create(
             self._judger,
             self._match_result_reporter,
         )
+
+    def resume(self, match_id: str, agent_images: List[Optional[str]]) -> JudgeTask:
+        """Creates a new JudgeTask instance for a match running before a restart.
+
+        Args:
+            match_id: The ID of the match to resume
+            agent_images: The images of the agents in the match, or None for agents not provided
+        """
+
+        return JudgeTask(
+            match_id,
+            self._game_host_image,
+            [],
+            self._fetcher,
+            self._builder,
+            self._build_result_reporter,
+            self._judger,
+            self._match_result_reporter,
+            agent_images=agent_images,
+        )
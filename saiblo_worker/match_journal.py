@@ -0,0 +1,112 @@
+"""Persists the state of running matches, so that they can be resumed after a restart."""
+
+import dataclasses
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import dacite
+
+import saiblo_worker.path_manager as path_manager
+
+
+@dataclass
+class MatchJournalEntry:
+    """The state of a running match.
+
+    Attributes:
+        match_id: The ID of the match
+        agents: The agents of the match, or None for agents not provided
+        game_host_container_name: The name of the game host container
+        game_host_image: The game host image
+        started_at: The time the match started, in seconds since the epoch
+        cpus: The CPUs allocated to the match
+        game_host_data_dir_path: The host data directory mounted into the game host container
+    """
+
+    @dataclass
+    class Agent:
+        """An agent of a running match.
+
+        Attributes:
+            container_name: The name of the agent container
+            image: The agent image
+            network_name: The name of the network between the agent and the game host
+            token: The token identifying the agent to the game host
+            cpuset_cpus: The CPUs the agent container is pinned to
+        """
+
+        container_name: str
+        image: str
+        network_name: str
+        token: str
+
+        cpuset_cpus: Optional[str] = None
+
+    match_id: str
+    agents: List[Optional[Agent]]
+    game_host_container_name: str
+    game_host_image: str
+    started_at: float
+
+    cpus: List[int] = field(default_factory=list)
+    game_host_data_dir_path: Optional[str] = None
+
+
+def list_match_journal_entries() -> Dict[str, MatchJournalEntry]:
+    """Lists the journal entries of all running matches.
+
+    Unreadable entries, e.g. left by a crash while writing, are skipped.
+
+    Returns:
+        The journal entries, by match ID
+    """
+
+    entries: Dict[str, MatchJournalEntry] = {}
+
+    for path in path_manager.get_match_journal_paths():
+        try:
+            entry = dacite.from_dict(
+                MatchJournalEntry, json.loads(path.read_text(encoding="utf-8"))
+            )
+
+        except (OSError, ValueError, dacite.DaciteError):
+            continue
+
+        entries[entry.match_id] = entry
+
+    return entries
+
+
+def remove_match_journal_entry(match_id: str) -> None:
+    """Removes the journal entry of a match, if any.
+
+    Args:
+        match_id: The ID of the match
+    """
+
+    path_manager.get_match_journal_path(match_id).unlink(missing_ok=True)
+
+
+def write_match_journal_entry(entry: MatchJournalEntry) -> None:
+    """Writes the journal entry of a match.
+
+    The entry is written to a temporary file first and then moved in place, so that a crash never
+    leaves a partially written entry.
+
+    Args:
+        entry: The journal entry
+    """
+
+    path = path_manager.get_match_journal_path(entry.match_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    temp_path = path.with_name(f"{path.name}.tmp")
+
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(dataclasses.asdict(entry), f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, path)
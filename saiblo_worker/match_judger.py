@@ -1,69 +1,124 @@
 """The implementation of the match judger."""
 
+# pylint: disable=too-many-lines
+
 import asyncio
-import dataclasses
-import io
-import json
+import contextlib
 import logging
-import shutil
-import tarfile
+import math
+import time
 import uuid
-from dataclasses import dataclass
-from typing import Dict, List, Optional, TypedDict
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, Awaitable, Dict, List, Literal, Optional, Set, Tuple
 
-import dacite
-import docker
 import docker.models.containers
 import docker.models.networks
-import requests
-import urllib3
+import docker.types
 
+import saiblo_worker.metrics as metrics
 import saiblo_worker.path_manager as path_manager
+import saiblo_worker.tracing as tracing
+from saiblo_worker.async_docker_client import AsyncDockerClient
 from saiblo_worker.base_match_judger import BaseMatchJudger
+from saiblo_worker.container_logs import (
+    make_log_config,
+    read_log_tail,
+    write_log_tail,
+)
+from saiblo_worker.container_supervisor import ContainerSupervisor, wait_exit_quorum
+from saiblo_worker.cpu_allocator import CpuAllocator, format_cpu_list, split_cpus
+from saiblo_worker.data_layout import remove_in_background
+from saiblo_worker.docker_event_monitor import DockerEventMonitor
+from saiblo_worker.game_host_app_data import (
+    GAME_HOST_APP_DATA_DIR_PATH,
+    GAME_HOST_TOKENS_FILE_PATH,
+    check_dir_size,
+    collect_game_host_app_data,
+    make_tokens_tarball,
+    save_game_host_app_data,
+    watch_dir_size,
+)
+from saiblo_worker.match_journal import (
+    MatchJournalEntry,
+    list_match_journal_entries,
+    remove_match_journal_entry,
+    write_match_journal_entry,
+)
+from saiblo_worker.match_resource_pool import MatchResourcePool
 from saiblo_worker.match_result import MatchResult
+from saiblo_worker.match_result_store import MatchResultStore
+from saiblo_worker.storage_manager import StorageCategory, StorageManager
 
 _AGENT_CONTAINER_NAME_PREFIX = "saiblo-worker-agent"
-_GAME_HOST_APP_DATA_DIR_PATH = "/app/data/"
+_DEFAULT_EARLY_TERMINATION_GRACE_PERIOD = 5
+_DEFAULT_STDERR_LIMIT = 512 * 1024
 _GAME_HOST_CONTAINER_NAME_PREFIX = "saiblo-worker-game-host"
-_GAME_HOST_REPLAY_FILE_NAME = "data/replay.dat"
-_GAME_HOST_RESULT_FILE_NAME = "data/result.json"
+_GAME_HOST_DATA_SIZE_CHECK_INTERVAL = 1
+_GAME_HOST_POOL_CONTAINER_NAME_PREFIX = f"{_GAME_HOST_CONTAINER_NAME_PREFIX}-pool"
+_MATCH_ID_LABEL = "saiblo-worker.match-id"
 _NETWORK_NAME_PREFIX = "saiblo-worker-network"
+_POOL_NETWORK_NAME_PREFIX = f"{_NETWORK_NAME_PREFIX}-pool"
+_RESOURCE_SAMPLING_INTERVAL = 0.5
+_ROLE_LABEL = "saiblo-worker.role"
+_WORKER_LABEL = "saiblo-worker.worker"
 
 
 @dataclass
-class _AgentInfo:
-    """The information of an agent.
+class _MatchResources:
+    """The Docker resources created for a match.
 
     Attributes:
-        code_id: The ID of the agent code.
-        image_tag: The image tag of the agent.
+        match_id: The ID of the match
+        containers: The containers of the match, by ID
+        game_host_container: The game host container
+        cpus: The CPUs allocated to the match
+        game_host_cpuset_cpus: The CPUs the game host container is pinned to
+        game_host_data_dir_path: The host data directory mounted into the game host container
+        networks: The networks of the match, by ID
     """
 
-    container_name: str
-    image: str
-    network_name: str
-    token: str
-
-
-class _GameHostMatchResult(TypedDict):
-    """The result of a match from the game host.
-
-    Attributes:
-        scores: The mapping from agent tokens to scores.
-    """
+    match_id: str
 
-    scores: Dict[str, float]
+    containers: Dict[str, docker.models.containers.Container] = field(
+        default_factory=dict
+    )
+    cpus: List[int] = field(default_factory=list)
+    game_host_container: Optional[docker.models.containers.Container] = None
+    game_host_cpuset_cpus: Optional[str] = None
+    game_host_data_dir_path: Optional[Path] = None
+    networks: Dict[str, docker.models.networks.Network] = field(default_factory=dict)
 
 
 class MatchJudger(BaseMatchJudger):
     """The match judger."""
 
+    _agent_cpu_count: int
+    _agent_cpu_time_limit_ns: Optional[int]
+    _agent_log_config: docker.types.LogConfig
     _agent_mem_limit: str
     _agent_nano_cpus: int
-    _docker_client: docker.DockerClient
+    _agent_output_limit: Optional[int]
+    _agent_stderr_limit: int
+    _cpu_allocator: Optional[CpuAllocator]
+    _docker_client: AsyncDockerClient
+    _early_termination_grace_period: float
+    _early_termination_quorum: Optional[int | Literal["all"]]
+    _event_monitor: DockerEventMonitor
+    _game_host_cpu_count: int
+    _game_host_data_host_dir_path: Optional[PurePosixPath]
+    _game_host_data_size_limit: Optional[int]
+    _game_host_log_config: docker.types.LogConfig
     _game_host_mem_limit: str
     _game_host_nano_cpus: int
+    _game_host_stderr_limit: int
     _judge_timeout: float
+    _name: str
+    _recovered_matches: Dict[str, MatchJournalEntry]
+    _replay_compression_level: Optional[int]
+    _resource_pool: MatchResourcePool
+    _result_store: MatchResultStore
+    _storage_manager: Optional[StorageManager]
 
     def __init__(
         self,
@@ -73,6 +128,23 @@ def __init__(
         game_host_cpus: float,
         game_host_mem_limit: str,
         judge_timeout: float,
+        agent_cpu_time_limit: Optional[float] = None,
+        agent_output_limit: Optional[int] = None,
+        agent_stderr_limit: int = _DEFAULT_STDERR_LIMIT,
+        cpu_allocator: Optional[CpuAllocator] = None,
+        docker_client: Optional[AsyncDockerClient] = None,
+        early_termination_grace_period: float = _DEFAULT_EARLY_TERMINATION_GRACE_PERIOD,
+        early_termination_quorum: Optional[int | Literal["all"]] = None,
+        game_host_data_mount: bool = False,
+        game_host_data_host_dir_path: Optional[str] = None,
+        game_host_data_size_limit: Optional[int] = None,
+        game_host_pool_size: int = 0,
+        game_host_stderr_limit: int = _DEFAULT_STDERR_LIMIT,
+        name: str = "",
+        network_pool_size: int = 0,
+        replay_compression_level: Optional[int] = None,
+        result_store: Optional[MatchResultStore] = None,
+        storage_manager: Optional[StorageManager] = None,
     ) -> None:
         """Initialize the match judger.
 
@@ -82,48 +154,148 @@ def __init__(
             game_host_mem_limit: The memory limit for a game host container.
             game_host_cpus: The CPU shares for a game host container.
             judge_timeout: The timeout for judging a match.
+            agent_cpu_time_limit: The CPU time limit in seconds for an agent container. An agent
+                exceeding it is killed with status TLE.
+            agent_output_limit: The limit in bytes of the output of an agent container to
+                stdout and stderr. An agent exceeding it is killed with status OLE. Only enforced
+                when the worker can read the log files of the Docker daemon.
+            agent_stderr_limit: The maximum size in bytes of the stderr output kept for an agent.
+                The latest output is kept in full as long as the agent has written no more than
+                this to stdout since.
+            cpu_allocator: The allocator of CPUs to pin the containers of each match to. Each
+                container gets its CPU allocation rounded up as its own CPUs. Containers are not
+                pinned if not given.
+            docker_client: The Docker client to use. A new one is created if not given.
+            early_termination_grace_period: The time in seconds the game host is given to finish
+                after the early termination quorum of agents has exited.
+            early_termination_quorum: The number of exited agents, or "all", after which a match
+                is terminated early, instead of waiting for the game host until the judge
+                timeout. Early termination is disabled if not given.
+            game_host_data_mount: Whether to bind-mount a host directory at the app data
+                directory of each game host container and collect results from it, instead of
+                copying an archive out of the stopped container.
+            game_host_data_host_dir_path: The path of the game host data base directory as seen by
+                the Docker daemon. Defaults to its absolute path as seen by the worker.
+            game_host_data_size_limit: The maximum total size in bytes of the app data of a game
+                host container. Only enforced when game_host_data_mount is set.
+            game_host_pool_size: The number of created but not started game host containers to
+                keep for each game host image. Pooled game hosts read their tokens from the file
+                at TOKENS_FILE instead of the TOKENS environment variable.
+            game_host_stderr_limit: The maximum size in bytes of the stderr output kept for a
+                game host. The latest output is kept in full as long as the game host has written
+                no more than this to stdout since.
+            name: The name of the worker. All Docker resources created by the judger are labelled
+                with it, so that workers sharing a Docker daemon never touch each other's.
+            network_pool_size: The number of pre-created agent networks to keep.
+            replay_compression_level: The gzip compression level to compress replay files with
+                while they are saved. Replay files are saved as is if not given.
+            result_store: The store to save match results in. A new one is created if not given.
+            storage_manager: The storage manager to track replays and stderr outputs with. They
+                are pinned until the results of their matches are delivered.
         """
 
         self._agent_nano_cpus = int(agent_cpus * 1e9)
+        self._agent_cpu_count = max(1, math.ceil(agent_cpus))
         self._agent_mem_limit = agent_mem_limit
+        self._agent_cpu_time_limit_ns = (
+            int(agent_cpu_time_limit * 1e9)
+            if agent_cpu_time_limit is not None
+            else None
+        )
+        self._agent_output_limit = agent_output_limit
+        self._agent_stderr_limit = agent_stderr_limit
+        self._game_host_stderr_limit = game_host_stderr_limit
+
+        # Log files hold the stdout output along with the stderr output, so they are sized to
+        # hold as much stdout output besides the kept stderr output.
+        self._agent_log_config = make_log_config(2 * agent_stderr_limit)
+        self._game_host_log_config = make_log_config(2 * game_host_stderr_limit)
         self._game_host_nano_cpus = int(game_host_cpus * 1e9)
+        self._game_host_cpu_count = max(1, math.ceil(game_host_cpus))
         self._game_host_mem_limit = game_host_mem_limit
         self._judge_timeout = judge_timeout
-
-        self._docker_client = docker.from_env()
+        self._game_host_data_host_dir_path = (
+            PurePosixPath(
+                game_host_data_host_dir_path
+                or path_manager.get_game_host_data_base_dir_path().absolute()
+            )
+            if game_host_data_mount
+            else None
+        )
+        self._game_host_data_size_limit = game_host_data_size_limit
+        self._name = name
+        self._replay_compression_level = replay_compression_level
+
+        self._early_termination_grace_period = early_termination_grace_period
+        self._early_termination_quorum = early_termination_quorum
+
+        self._cpu_allocator = cpu_allocator
+        self._recovered_matches = {}
+        self._result_store = result_store or MatchResultStore()
+        self._storage_manager = storage_manager
+        self._docker_client = docker_client or AsyncDockerClient()
+        self._event_monitor = DockerEventMonitor(
+            self._docker_client, labels=[f"{_WORKER_LABEL}={self._name}"]
+        )
+
+        self._resource_pool = MatchResourcePool(
+            create_game_host_container=self._create_pooled_game_host_container,
+            create_network=self._create_pooled_network,
+            game_host_pool_size=game_host_pool_size,
+            network_pool_size=network_pool_size,
+        )
 
     async def clean(self) -> None:
         logging.debug("Cleaning match judger environment")
 
-        # Clean containers.
-        for container in self._docker_client.containers.list(all=True):
-            assert isinstance(container, docker.models.containers.Container)
+        label_filters = {"label": [f"{_WORKER_LABEL}={self._name}"]}
+
+        # Clean containers, including unlabelled ones created before resources were labelled.
+        # Matching the latter by name can be dropped in the next release.
+        await self._docker_client.remove_containers(
+            await self._docker_client.list_containers(all=True, filters=label_filters)
+            + [
+                container
+                for container in await self._docker_client.list_containers(all=True)
+                if _is_unlabelled_legacy_resource(
+                    container.name, container.attrs["Config"].get("Labels")
+                )
+            ]
+        )
+
+        # Clean networks, including unlabelled ones, likewise.
+        await self._docker_client.remove_networks(
+            await self._docker_client.list_networks(filters=label_filters)
+            + [
+                network
+                for network in await self._docker_client.list_networks()
+                if _is_unlabelled_legacy_resource(
+                    network.name, network.attrs.get("Labels")
+                )
+            ]
+        )
+
+        # Pooled resources are gone with the containers and networks above.
+        self._resource_pool.clear()
 
-            if container.name is not None and (
-                container.name.startswith(_AGENT_CONTAINER_NAME_PREFIX)
-                or container.name.startswith(_GAME_HOST_CONTAINER_NAME_PREFIX)
-            ):
-                container.stop(timeout=0)
-                container.remove(v=True, force=True)
+        # Clean game host data directories.
+        remove_in_background(path_manager.get_game_host_data_base_dir_path())
 
-        # Clean networks.
-        for network in self._docker_client.networks.list():
-            if network.name is not None and network.name.startswith(
-                _NETWORK_NAME_PREFIX
-            ):
-                network.remove()
+        # Clean stderr outputs.
+        remove_in_background(path_manager.get_match_stderr_base_dir_path())
 
-        # Clean replays.
-        match_replay_base_dir_path = path_manager.get_match_replay_base_dir_path()
+        # Clean the journal of running matches.
+        remove_in_background(path_manager.get_match_journal_base_dir_path())
+
+        self._recovered_matches.clear()
 
-        if match_replay_base_dir_path.is_dir():
-            shutil.rmtree(match_replay_base_dir_path, ignore_errors=True)
+        # Clean replays.
+        remove_in_background(path_manager.get_match_replay_base_dir_path())
 
-        # Clean results.
-        match_result_base_dir_path = path_manager.get_match_result_base_dir_path()
+        # Clean results, including JSON files not imported into the store yet.
+        await asyncio.to_thread(self._result_store.clear)
 
-        if match_result_base_dir_path.is_dir():
-            shutil.rmtree(match_result_base_dir_path, ignore_errors=True)
+        remove_in_background(path_manager.get_match_result_base_dir_path())
 
         logging.info("Match judger environment cleaned")
 
@@ -135,125 +307,131 @@ async def judge(
     ) -> MatchResult:
         logging.debug("Judging match %s", match_id)
 
+        trace_key = tracing.get_match_trace_key(match_id)
+
         match_replay_file_path = path_manager.get_match_replay_path(match_id)
         match_replay_file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        match_result_file_path = path_manager.get_match_result_path(match_id)
-        match_result_file_path.parent.mkdir(parents=True, exist_ok=True)
-
         # If judged before, return the result.
-        if match_replay_file_path.is_file() and match_result_file_path.is_file():
-            return dacite.from_dict(
-                MatchResult, json.load(match_result_file_path.open("r"))
+        if match_replay_file_path.is_file():
+            stored_match_result = await asyncio.to_thread(
+                self._result_store.get, match_id
             )
 
-        game_host_container_name = f"{_GAME_HOST_CONTAINER_NAME_PREFIX}-{match_id}"
+            if stored_match_result is not None:
+                await self._track_match_files(match_id)
 
-        agent_info_list: List[Optional[_AgentInfo]] = [
-            (
-                _AgentInfo(
-                    container_name=f"{_AGENT_CONTAINER_NAME_PREFIX}-{match_id}-{i}",
-                    image=image,
-                    network_name=f"{_NETWORK_NAME_PREFIX}-{match_id}-{i}",
-                    token=uuid.uuid4().hex,
-                )
-                if image is not None
-                else None
-            )
-            for i, image in enumerate(agent_images)
-        ]
+                # Results saved before replays were sharded refer to the old replay paths.
+                if stored_match_result.replay_file_path is not None:
+                    stored_match_result.replay_file_path = str(match_replay_file_path)
+
+                return stored_match_result
+
+        start_time = time.perf_counter()
+
+        # Resume the match if it was running before a restart.
+        journal_entry = self._recovered_matches.pop(match_id, None)
+        resumed = journal_entry is not None
 
-        game_host_container: Optional[docker.models.containers.Container] = None
+        match_resources = _MatchResources(match_id)
+
+        supervisors: List[ContainerSupervisor] = []
 
         try:
-            # Run the game host.
-            logging.debug("Running game host container %s", game_host_container_name)
-
-            game_host_container = await asyncio.to_thread(
-                self._docker_client.containers.run,
-                game_host_image,
-                detach=True,
-                environment={
-                    "TOKENS": ",".join(
-                        [
-                            agent_info.token
-                            for agent_info in agent_info_list
-                            if agent_info
-                        ]
+            pooled_networks: Dict[str, docker.models.networks.Network] = {}
+
+            if journal_entry is None:
+                # Take as many pre-created networks as possible from the pool. They are tracked
+                # right away, so that they are removed with the other resources if the match
+                # fails before they are used.
+                pooled_networks = {
+                    str(pooled_network.name): pooled_network
+                    for pooled_network in self._resource_pool.take_networks(
+                        sum(image is not None for image in agent_images)
                     )
-                },
-                mem_limit=self._game_host_mem_limit,
-                name=game_host_container_name,
-                nano_cpus=self._game_host_nano_cpus,
-            )
+                }
+
+                for pooled_network in pooled_networks.values():
+                    assert pooled_network.id is not None
+                    match_resources.networks[pooled_network.id] = pooled_network
+
+                pooled_network_names = iter(pooled_networks)
+
+                journal_entry = MatchJournalEntry(
+                    match_id=match_id,
+                    agents=[
+                        (
+                            MatchJournalEntry.Agent(
+                                container_name=f"{_AGENT_CONTAINER_NAME_PREFIX}-{match_id}-{i}",
+                                image=image,
+                                network_name=next(
+                                    pooled_network_names,
+                                    f"{_NETWORK_NAME_PREFIX}-{match_id}-{i}",
+                                ),
+                                token=uuid.uuid4().hex,
+                            )
+                            if image is not None
+                            else None
+                        )
+                        for i, image in enumerate(agent_images)
+                    ],
+                    game_host_container_name=f"{_GAME_HOST_CONTAINER_NAME_PREFIX}-{match_id}",
+                    game_host_image=game_host_image,
+                    started_at=time.time(),
+                )
 
-            # Run agent containers.
-            agent_containers: List[Optional[docker.models.containers.Container]] = []
-            agent_networks: List[Optional[docker.models.networks.Network]] = []
+            game_host_container_name = journal_entry.game_host_container_name
+            agent_info_list = journal_entry.agents
 
-            for agent_info in agent_info_list:
-                # For agents that are not provided, append None.
-                if agent_info is None:
-                    agent_containers.append(None)
-                    agent_networks.append(None)
-                    continue
+            # Subscribe to container exits before any container starts.
+            await self._event_monitor.start()
 
-                # Create network.
-                logging.debug(
-                    "Creating network %s for agent %s",
-                    agent_info.network_name,
-                    agent_info.container_name,
+            with tracing.span("match_start", trace_key=trace_key, resumed=resumed):
+                game_host_container, agent_containers = await (
+                    self._resume_match(journal_entry, match_resources)
+                    if resumed
+                    else self._start_match(
+                        journal_entry, pooled_networks, match_resources
+                    )
                 )
 
-                agent_network = self._docker_client.networks.create(
-                    agent_info.network_name,
-                    internal=True,
-                )
-                agent_network.connect(game_host_container_name)
-                agent_networks.append(agent_network)
-
-                # Run the agent.
-                logging.debug("Running agent container %s", agent_info.container_name)
-
-                agent_container = await asyncio.to_thread(
-                    self._docker_client.containers.run,
-                    agent_info.image,
-                    detach=True,
-                    environment={
-                        "TOKEN": agent_info.token,
-                        "GAME_HOST": f"ws://{game_host_container_name}:14514",
-                    },
-                    mem_limit=self._agent_mem_limit,
-                    name=agent_info.container_name,
-                    nano_cpus=self._agent_nano_cpus,
-                    network=agent_info.network_name,
+            game_host_supervisor = self._supervise(game_host_container, "game-host")
+            supervisors.append(game_host_supervisor)
+
+            agent_supervisors = [
+                (
+                    self._supervise(agent_container, "agent")
+                    if agent_container is not None
+                    else None
                 )
-                agent_containers.append(agent_container)
+                for agent_container in agent_containers
+            ]
+            supervisors += [
+                supervisor for supervisor in agent_supervisors if supervisor
+            ]
 
             # Wait until the game host finishes or timeout.
             logging.debug(
                 "Waiting for game host container %s", game_host_container_name
             )
 
-            try:
-                await asyncio.to_thread(
-                    game_host_container.wait,
-                    timeout=self._judge_timeout,
+            with tracing.span("wait", trace_key=trace_key):
+                await self._wait_game_host_container(
+                    game_host_container,
+                    agent_supervisors,
+                    match_resources,
+                    # A resumed match may be past the judge timeout already.
+                    timeout=max(
+                        self._judge_timeout - (time.time() - journal_entry.started_at),
+                        0,
+                    ),
                 )
-            except requests.exceptions.ConnectionError as exc:
-                if len(exc.args) == 1 and isinstance(
-                    exc.args[0], urllib3.exceptions.ReadTimeoutError
-                ):
-                    logging.error("Game host timeout for match %s", match_id)
-
-                    raise TimeoutError("Game host timeout") from exc
-
-                raise
 
             # Stop the game host and agent containers.
             logging.debug("Stopping game host container %s", game_host_container_name)
 
-            game_host_container.stop(timeout=0)
+            with tracing.span("container_stop", trace_key=trace_key):
+                await self._docker_client.call(game_host_container.stop, timeout=0)
 
             # Get and save the result and the replay file.
             logging.debug(
@@ -261,33 +439,34 @@ async def judge(
                 game_host_container_name,
             )
 
-            game_host_app_data_tarball_stream, _ = game_host_container.get_archive(
-                _GAME_HOST_APP_DATA_DIR_PATH
-            )
-
-            game_host_app_data_tarball_bytesio = io.BytesIO()
-            for chunk in game_host_app_data_tarball_stream:
-                game_host_app_data_tarball_bytesio.write(chunk)
+            with tracing.span("artifact_extraction", trace_key=trace_key):
+                if match_resources.game_host_data_dir_path is not None:
+                    if self._game_host_data_size_limit is not None:
+                        await asyncio.to_thread(
+                            check_dir_size,
+                            match_resources.game_host_data_dir_path,
+                            self._game_host_data_size_limit,
+                        )
 
-            with tarfile.open(
-                fileobj=io.BytesIO(game_host_app_data_tarball_bytesio.getvalue()),
-                mode="r",
-            ) as tar_file:
-                result_file = tar_file.extractfile(
-                    _GAME_HOST_RESULT_FILE_NAME
-                ) or io.BytesIO("{}".encode("utf-8"))
+                    game_host_match_result = await asyncio.to_thread(
+                        collect_game_host_app_data,
+                        match_resources.game_host_data_dir_path,
+                        match_replay_file_path,
+                        replay_compression_level=self._replay_compression_level,
+                    )
 
-                game_host_match_result: _GameHostMatchResult = json.loads(
-                    result_file.read().decode("utf-8")
-                )
+                else:
+                    game_host_match_result = await self._docker_client.call(
+                        save_game_host_app_data,
+                        game_host_container,
+                        match_replay_file_path,
+                        replay_compression_level=self._replay_compression_level,
+                    )
 
-                replay_file = (
-                    tar_file.extractfile(_GAME_HOST_REPLAY_FILE_NAME) or io.BytesIO()
+                metrics.ARTIFACT_BYTES.inc(
+                    (await asyncio.to_thread(match_replay_file_path.stat)).st_size
                 )
 
-                with match_replay_file_path.open("wb") as f:
-                    f.write(replay_file.read())
-
             # Build the result.
             agent_results: List[MatchResult.AgentResult] = []
 
@@ -304,67 +483,89 @@ async def judge(
                         )
                     )
                 else:
-                    container = agent_containers[i]
-                    assert container is not None
+                    agent_supervisor = agent_supervisors[i]
+                    assert agent_supervisor is not None
 
-                    # Reload attributes of the container.
-                    container.reload()
-
-                    # Stop the agent container if it is still running.
-                    if container.status == "running":
-                        logging.debug(
-                            "Stopping agent container %s", agent_info.container_name
+                    agent_outcome = await agent_supervisor.finish(
+                        stderr_file_path=path_manager.get_match_stderr_path(
+                            match_id, f"agent-{i}"
                         )
-
-                        container.stop(timeout=0)
-
-                        # The agent container is stopped by the judger so we regard it as a
-                        # normal exit.
-                        exit_code = 0
-
-                    else:
-                        # Theoretically, the agent container is already stopped so we don't need to
-                        # wait for it. So we don't add a try-except block here.
-                        exit_code = (
-                            await asyncio.to_thread(
-                                container.wait,
-                                timeout=1,  # The shortest possible time.
-                            )
-                        )["StatusCode"]
+                    )
 
                     agent_results.append(
                         MatchResult.AgentResult(
-                            exit_code=exit_code,
+                            exit_code=agent_outcome.exit_code,
                             score=(
                                 game_host_match_result["scores"].get(
                                     agent_info.token, 0.0
                                 )
                             ),
-                            status="OK" if exit_code == 0 else "RE",
-                            stderr_output=container.logs(stdout=False)[
-                                -(512 * 1024) :
-                            ].decode("utf-8"),
+                            status=(
+                                agent_outcome.limit_status
+                                or ("MLE" if agent_outcome.oom_killed else None)
+                                or ("OK" if agent_outcome.exit_code == 0 else "RE")
+                            ),
+                            stderr_output=agent_outcome.stderr_output,
+                            resource_usage=agent_outcome.resource_usage,
+                            stderr_file_path=agent_outcome.stderr_file_path,
                         )
                     )
 
+            game_host_outcome = await game_host_supervisor.finish(
+                stderr_file_path=path_manager.get_match_stderr_path(
+                    match_id, "game-host"
+                )
+            )
+
             match_result = MatchResult(
                 match_id=match_id,
                 agent_results=agent_results,
                 error_message="",
                 replay_file_path=str(match_replay_file_path),
-                stderr_output=game_host_container.logs(stdout=False).decode("utf-8"),
+                stderr_output=game_host_outcome.stderr_output,
+                resource_usage=game_host_outcome.resource_usage,
+                replay_encoding=(
+                    "gzip" if self._replay_compression_level is not None else None
+                ),
+                stderr_file_path=game_host_outcome.stderr_file_path,
             )
 
-            with open(match_result_file_path, "w", encoding="utf-8") as f:
-                json.dump(dataclasses.asdict(match_result), f)
+            await asyncio.to_thread(self._result_store.put, match_result)
+
+            await self._track_match_files(match_id)
 
             logging.info("Match %s judged", match_id)
 
+            metrics.MATCH_DURATION.observe(
+                time.perf_counter() - start_time, status="success"
+            )
+
             return match_result
 
         except Exception as exc:  # pylint: disable=broad-except
             logging.error("Match %s judging failed: (%s) %s", match_id, type(exc), exc)
 
+            game_host_stderr_output = (
+                await self._docker_client.call(
+                    read_log_tail,
+                    match_resources.game_host_container,
+                    self._game_host_stderr_limit,
+                )
+                if match_resources.game_host_container is not None
+                else b""
+            )
+
+            game_host_stderr_file_path: Optional[Path] = None
+
+            if len(game_host_stderr_output) > 0:
+                game_host_stderr_file_path = path_manager.get_match_stderr_path(
+                    match_id, "game-host"
+                )
+
+                await asyncio.to_thread(
+                    write_log_tail, game_host_stderr_output, game_host_stderr_file_path
+                )
+
             match_result = MatchResult(
                 match_id=match_id,
                 agent_results=[
@@ -374,49 +575,812 @@ async def judge(
                         status="UE",
                         stderr_output="",
                     )
-                    for _ in range(len(agent_info_list))
+                    for _ in range(len(agent_images))
                 ],
                 error_message=str(exc),
                 replay_file_path=None,
-                stderr_output=(
-                    game_host_container.logs(stdout=False).decode("utf-8")
-                    if game_host_container is not None
-                    else ""
+                stderr_output="",
+                stderr_file_path=(
+                    str(game_host_stderr_file_path)
+                    if game_host_stderr_file_path is not None
+                    else None
                 ),
             )
 
+            await self._track_match_files(match_id)
+
+            metrics.MATCH_DURATION.observe(
+                time.perf_counter() - start_time, status="failure"
+            )
+
             return match_result
 
         finally:
-            # Clean containers.
-            for container in self._docker_client.containers.list(all=True):
-                assert isinstance(container, docker.models.containers.Container)
-
-                if container.name is not None and (
-                    container.name == game_host_container_name
-                    or container.name
-                    in [
-                        agent_info.container_name
-                        for agent_info in agent_info_list
-                        if agent_info
-                    ]
-                ):
-                    container.stop(timeout=0)
-                    container.remove(v=True, force=True)
-
-            # Clean networks.
-            for network in self._docker_client.networks.list():
-                if network.name is not None and network.name in [
-                    agent_info.network_name
-                    for agent_info in agent_info_list
-                    if agent_info is not None
-                ]:
-                    network.remove()
-
-    async def list(self) -> Dict[str, MatchResult]:
-        match_result_paths = path_manager.get_match_result_paths()
-
-        return {
-            path.stem: dacite.from_dict(MatchResult, json.load(path.open("r")))
-            for path in match_result_paths
+            with tracing.span("cleanup", trace_key=trace_key):
+                for supervisor in supervisors:
+                    supervisor.cancel()
+
+                await self._remove_match_resources(match_resources)
+
+                if match_resources.game_host_data_dir_path is not None:
+                    remove_in_background(match_resources.game_host_data_dir_path)
+
+                if self._cpu_allocator is not None:
+                    await self._cpu_allocator.release(match_resources.cpus)
+
+                await asyncio.to_thread(remove_match_journal_entry, match_id)
+
+            self._resource_pool.schedule_replenishment(game_host_image)
+
+    async def list(
+        self, *, after: Optional[str] = None, limit: Optional[int] = None
+    ) -> Dict[str, MatchResult]:
+        match_results = await asyncio.to_thread(
+            self._result_store.list, after=after, limit=limit
+        )
+
+        return {match_result.match_id: match_result for match_result in match_results}
+
+    async def recover(self) -> List[MatchJournalEntry]:
+        """Inventories the Docker resources of the worker after a restart.
+
+        Matches in the journal whose game host container still exists are resumed by the next
+        call of judge with their match ID. All other containers, networks, game host data
+        directories and journal entries of the worker are orphaned and removed.
+
+        Returns:
+            The journal entries of the matches to resume
+        """
+
+        journal_entries = await asyncio.to_thread(list_match_journal_entries)
+
+        label_filters = {"label": [f"{_WORKER_LABEL}={self._name}"]}
+
+        containers = await self._docker_client.list_containers(
+            all=True, filters=label_filters
+        )
+        networks = await self._docker_client.list_networks(filters=label_filters)
+
+        container_names = {container.name for container in containers}
+
+        self._recovered_matches = {
+            match_id: journal_entry
+            for match_id, journal_entry in journal_entries.items()
+            if journal_entry.game_host_container_name in container_names
         }
+
+        kept_names: Set[str] = set()
+        kept_game_host_data_dir_paths: Set[Path] = set()
+
+        for journal_entry in self._recovered_matches.values():
+            kept_names.add(journal_entry.game_host_container_name)
+            kept_names.update(
+                name
+                for agent in journal_entry.agents
+                if agent is not None
+                for name in (agent.container_name, agent.network_name)
+            )
+
+            if journal_entry.game_host_data_dir_path is not None:
+                kept_game_host_data_dir_paths.add(
+                    Path(journal_entry.game_host_data_dir_path)
+                )
+
+            if self._cpu_allocator is not None:
+                await self._cpu_allocator.reserve(journal_entry.cpus)
+
+        # Reap orphaned resources.
+        await self._docker_client.remove_containers(
+            [container for container in containers if container.name not in kept_names]
+        )
+        await self._docker_client.remove_networks(
+            [network for network in networks if network.name not in kept_names]
+        )
+
+        # Pooled resources are orphaned as well.
+        self._resource_pool.clear()
+
+        for match_id in journal_entries.keys() - self._recovered_matches.keys():
+            await asyncio.to_thread(remove_match_journal_entry, match_id)
+
+        game_host_data_base_dir_path = path_manager.get_game_host_data_base_dir_path()
+
+        if game_host_data_base_dir_path.is_dir():
+            for path in game_host_data_base_dir_path.iterdir():
+                if path not in kept_game_host_data_dir_paths:
+                    remove_in_background(path)
+
+        logging.info("Recovered %d running matches", len(self._recovered_matches))
+
+        return list(self._recovered_matches.values())
+
+    def warm_up(self) -> None:
+        """Starts filling the pool of agent networks in the background.
+
+        Game host containers are only pooled for a game host image after a match with it has
+        been judged, since game host images are not known before.
+        """
+
+        self._resource_pool.schedule_replenishment(None)
+
+    async def _create_agent_network(
+        self,
+        agent_info: Optional[MatchJournalEntry.Agent],
+        pooled_networks: Dict[str, docker.models.networks.Network],
+        match_resources: _MatchResources,
+    ) -> Optional[docker.models.networks.Network]:
+        """Creates the internal network of an agent.
+
+        Args:
+            agent_info: The information of the agent, or None if the agent is not provided
+            pooled_networks: The networks taken from the pool for the match, by name
+            match_resources: The resources of the match to track the network in
+
+        Returns:
+            The network, or None if the agent is not provided
+        """
+
+        if agent_info is None:
+            return None
+
+        if agent_info.network_name in pooled_networks:
+            network = pooled_networks[agent_info.network_name]
+
+        else:
+            logging.debug(
+                "Creating network %s for agent %s",
+                agent_info.network_name,
+                agent_info.container_name,
+            )
+
+            with tracing.span("network_create", network=agent_info.network_name):
+                network = await self._docker_client.create_network(
+                    agent_info.network_name,
+                    internal=True,
+                    labels=self._make_labels("network", match_resources.match_id),
+                )
+
+        assert network.id is not None
+        match_resources.networks[network.id] = network
+
+        return network
+
+    async def _create_game_host_container(
+        self,
+        game_host_image: str,
+        container_name: str,
+        tokens: List[str],
+        match_resources: _MatchResources,
+    ) -> docker.models.containers.Container:
+        """Creates the game host container of a match without starting it.
+
+        A pooled container is used if there is one. It is renamed for the match and the tokens
+        are copied into it, since its environment can no longer be changed.
+
+        Args:
+            game_host_image: The game host image
+            container_name: The name of the game host container
+            tokens: The tokens of the agents
+            match_resources: The resources of the match to track the container in
+
+        Returns:
+            The game host container
+        """
+
+        container = self._resource_pool.take_game_host_container(game_host_image)
+
+        if container is None:
+            with tracing.span(
+                "container_create", container=container_name, pooled=False
+            ):
+                container = await self._docker_client.create_container(
+                    game_host_image,
+                    environment={"TOKENS": ",".join(tokens)},
+                    labels=self._make_labels("game-host", match_resources.match_id),
+                    log_config=self._game_host_log_config,
+                    mem_limit=self._game_host_mem_limit,
+                    mounts=await self._make_game_host_mounts(container_name),
+                    cpuset_cpus=match_resources.game_host_cpuset_cpus,
+                    name=container_name,
+                    nano_cpus=self._game_host_nano_cpus,
+                )
+
+            assert container.id is not None
+            match_resources.containers[container.id] = container
+            match_resources.game_host_container = container
+
+            if self._game_host_data_host_dir_path is not None:
+                match_resources.game_host_data_dir_path = (
+                    path_manager.get_game_host_data_dir_path(container_name)
+                )
+
+            return container
+
+        assert container.id is not None
+        match_resources.containers[container.id] = container
+        match_resources.game_host_container = container
+
+        # The data directory is named after the pooled container.
+        if self._game_host_data_host_dir_path is not None:
+            assert container.name is not None
+            match_resources.game_host_data_dir_path = (
+                path_manager.get_game_host_data_dir_path(container.name)
+            )
+
+        logging.debug(
+            "Using pooled game host container %s as %s", container.name, container_name
+        )
+
+        with tracing.span("container_create", container=container_name, pooled=True):
+            await self._docker_client.call(container.rename, container_name)
+
+            if match_resources.game_host_cpuset_cpus is not None:
+                await self._docker_client.call(
+                    container.update, cpuset_cpus=match_resources.game_host_cpuset_cpus
+                )
+
+            await self._docker_client.call(
+                container.put_archive, "/", make_tokens_tarball(tokens)
+            )
+
+        return container
+
+    async def _create_pooled_game_host_container(
+        self, game_host_image: str
+    ) -> docker.models.containers.Container:
+        """Creates a game host container to pool.
+
+        Args:
+            game_host_image: The game host image
+
+        Returns:
+            The game host container
+        """
+
+        container_name = f"{_GAME_HOST_POOL_CONTAINER_NAME_PREFIX}-{uuid.uuid4().hex}"
+
+        return await self._docker_client.create_container(
+            game_host_image,
+            environment={"TOKENS_FILE": GAME_HOST_TOKENS_FILE_PATH},
+            labels=self._make_labels("game-host", None),
+            log_config=self._game_host_log_config,
+            mem_limit=self._game_host_mem_limit,
+            mounts=await self._make_game_host_mounts(container_name),
+            name=container_name,
+            nano_cpus=self._game_host_nano_cpus,
+        )
+
+    async def _create_pooled_network(self) -> docker.models.networks.Network:
+        """Creates an agent network to pool.
+
+        Returns:
+            The network
+        """
+
+        return await self._docker_client.create_network(
+            f"{_POOL_NETWORK_NAME_PREFIX}-{uuid.uuid4().hex}",
+            internal=True,
+            labels=self._make_labels("network", None),
+        )
+
+    async def _make_game_host_mounts(
+        self, container_name: str
+    ) -> List[docker.types.Mount]:
+        """Creates the host data directory for a game host container and makes its mounts.
+
+        Args:
+            container_name: The name the game host container is created with
+
+        Returns:
+            The mounts, empty if game host data directories are not mounted
+        """
+
+        if self._game_host_data_host_dir_path is None:
+            return []
+
+        data_dir_path = path_manager.get_game_host_data_dir_path(container_name)
+
+        await asyncio.to_thread(data_dir_path.mkdir, parents=True, exist_ok=True)
+
+        # The game host may run as any user.
+        await asyncio.to_thread(data_dir_path.chmod, 0o777)
+
+        return [
+            docker.types.Mount(
+                target=GAME_HOST_APP_DATA_DIR_PATH.rstrip("/"),
+                source=str(self._game_host_data_host_dir_path / container_name),
+                type="bind",
+            )
+        ]
+
+    def _make_labels(self, role: str, match_id: Optional[str]) -> Dict[str, str]:
+        """Makes the labels of a Docker resource created by the judger.
+
+        Args:
+            role: The role of the resource
+            match_id: The ID of the match the resource is created for, or None if it is pooled
+
+        Returns:
+            The labels
+        """
+
+        labels = {_ROLE_LABEL: role, _WORKER_LABEL: self._name}
+
+        if match_id is not None:
+            labels[_MATCH_ID_LABEL] = match_id
+
+        return labels
+
+    async def _pin_match_cpus(
+        self,
+        cpu_allocator: CpuAllocator,
+        agent_info_list: List[Optional[MatchJournalEntry.Agent]],
+        match_resources: _MatchResources,
+    ) -> None:
+        """Allocates CPUs to a match and splits them between its containers.
+
+        Args:
+            cpu_allocator: The CPU allocator
+            agent_info_list: The information of the agents to set the CPUs of
+            match_resources: The resources of the match to track the CPUs in
+        """
+
+        agent_infos = [agent_info for agent_info in agent_info_list if agent_info]
+
+        match_resources.cpus = await cpu_allocator.allocate(
+            self._game_host_cpu_count + self._agent_cpu_count * len(agent_infos)
+        )
+
+        game_host_cpus, *agent_cpus_list = split_cpus(
+            match_resources.cpus,
+            [self._game_host_cpu_count] + [self._agent_cpu_count] * len(agent_infos),
+        )
+
+        match_resources.game_host_cpuset_cpus = format_cpu_list(game_host_cpus)
+
+        for agent_info, agent_cpus in zip(agent_infos, agent_cpus_list):
+            agent_info.cpuset_cpus = format_cpu_list(agent_cpus)
+
+        logging.debug(
+            "Pinning match %s to CPUs %s",
+            match_resources.match_id,
+            match_resources.cpus,
+        )
+
+    async def _remove_match_resources(self, match_resources: _MatchResources) -> None:
+        """Removes all Docker resources of a match.
+
+        Besides the tracked resources, resources labelled with the match ID are looked up by a
+        daemon-side filter, in case a creation succeeded on the daemon but failed on our side.
+
+        Args:
+            match_resources: The resources of the match
+        """
+
+        label_filters = {
+            "label": [
+                f"{_WORKER_LABEL}={self._name}",
+                f"{_MATCH_ID_LABEL}={match_resources.match_id}",
+            ]
+        }
+
+        containers = dict(match_resources.containers)
+        for container in await self._docker_client.list_containers(
+            all=True, filters=label_filters
+        ):
+            assert container.id is not None
+            containers.setdefault(container.id, container)
+
+        await self._docker_client.remove_containers(list(containers.values()))
+
+        # Networks can only be removed after all containers in them are.
+        networks = dict(match_resources.networks)
+        for network in await self._docker_client.list_networks(filters=label_filters):
+            assert network.id is not None
+            networks.setdefault(network.id, network)
+
+        await self._docker_client.remove_networks(list(networks.values()))
+
+    async def _resume_match(
+        self, journal_entry: MatchJournalEntry, match_resources: _MatchResources
+    ) -> Tuple[
+        docker.models.containers.Container,
+        List[Optional[docker.models.containers.Container]],
+    ]:
+        """Re-attaches to the containers and networks of a match running before a restart.
+
+        Args:
+            journal_entry: The journal entry of the match
+            match_resources: The resources of the match to track the found resources in
+
+        Returns:
+            The game host container and the agent containers, or None for agents not provided
+
+        Raises:
+            ValueError: If a container of the match is gone
+        """
+
+        logging.info("Resuming match %s", journal_entry.match_id)
+
+        label_filters = {"label": [f"{_WORKER_LABEL}={self._name}"]}
+
+        containers = {
+            container.name: container
+            for container in await self._docker_client.list_containers(
+                all=True, filters=label_filters
+            )
+        }
+        networks = {
+            network.name: network
+            for network in await self._docker_client.list_networks(
+                filters=label_filters
+            )
+        }
+
+        match_resources.cpus = journal_entry.cpus
+        match_resources.game_host_data_dir_path = (
+            Path(journal_entry.game_host_data_dir_path)
+            if journal_entry.game_host_data_dir_path is not None
+            else None
+        )
+
+        for agent in journal_entry.agents:
+            if agent is not None and agent.network_name in networks:
+                network = networks[agent.network_name]
+                assert network.id is not None
+                match_resources.networks[network.id] = network
+
+        match_containers: List[Optional[docker.models.containers.Container]] = []
+
+        for name in [journal_entry.game_host_container_name] + [
+            agent.container_name if agent else None for agent in journal_entry.agents
+        ]:
+            if name is None:
+                match_containers.append(None)
+                continue
+
+            if name not in containers:
+                raise ValueError(f"Container {name} is gone")
+
+            container = containers[name]
+            assert container.id is not None
+            match_resources.containers[container.id] = container
+
+            # The container may have exited while the worker was down.
+            self._event_monitor.record_exited(container)
+
+            match_containers.append(container)
+
+        game_host_container, *agent_containers = match_containers
+        assert game_host_container is not None
+        match_resources.game_host_container = game_host_container
+
+        return game_host_container, agent_containers
+
+    async def _run_agent_container(
+        self,
+        agent_info: Optional[MatchJournalEntry.Agent],
+        game_host_container_name: str,
+        match_resources: _MatchResources,
+    ) -> Optional[docker.models.containers.Container]:
+        """Runs the container of an agent.
+
+        Args:
+            agent_info: The information of the agent, or None if the agent is not provided
+            game_host_container_name: The name of the game host container
+            match_resources: The resources of the match to track the container in
+
+        Returns:
+            The container, or None if the agent is not provided
+        """
+
+        if agent_info is None:
+            return None
+
+        logging.debug("Running agent container %s", agent_info.container_name)
+
+        container = await self._docker_client.run_container(
+            agent_info.image,
+            cpuset_cpus=agent_info.cpuset_cpus,
+            detach=True,
+            environment={
+                "TOKEN": agent_info.token,
+                "GAME_HOST": f"ws://{game_host_container_name}:14514",
+            },
+            labels=self._make_labels("agent", match_resources.match_id),
+            log_config=self._agent_log_config,
+            mem_limit=self._agent_mem_limit,
+            name=agent_info.container_name,
+            nano_cpus=self._agent_nano_cpus,
+            network=agent_info.network_name,
+        )
+
+        assert container.id is not None
+        match_resources.containers[container.id] = container
+
+        return container
+
+    async def _start_match(
+        self,
+        journal_entry: MatchJournalEntry,
+        pooled_networks: Dict[str, docker.models.networks.Network],
+        match_resources: _MatchResources,
+    ) -> Tuple[
+        docker.models.containers.Container,
+        List[Optional[docker.models.containers.Container]],
+    ]:
+        """Creates and starts the containers and networks of a match, and journals the match.
+
+        Args:
+            journal_entry: The journal entry of the match, completed once the match has started
+            pooled_networks: The pooled networks taken for the agents, by name
+            match_resources: The resources of the match to track the created resources in
+
+        Returns:
+            The game host container and the agent containers, or None for agents not provided
+        """
+
+        game_host_container_name = journal_entry.game_host_container_name
+
+        if self._cpu_allocator is not None:
+            await self._pin_match_cpus(
+                self._cpu_allocator, journal_entry.agents, match_resources
+            )
+
+        # Create the game host container and agent networks concurrently.
+        logging.debug("Creating game host container %s", game_host_container_name)
+
+        game_host_container, *agent_networks = await _gather_all(
+            self._create_game_host_container(
+                journal_entry.game_host_image,
+                game_host_container_name,
+                [agent.token for agent in journal_entry.agents if agent],
+                match_resources,
+            ),
+            *[
+                self._create_agent_network(agent, pooled_networks, match_resources)
+                for agent in journal_entry.agents
+            ],
+        )
+
+        # Connect the game host to agent networks and start it.
+        await _gather_all(
+            *[
+                self._docker_client.call(
+                    agent_network.connect, game_host_container_name
+                )
+                for agent_network in agent_networks
+                if agent_network is not None
+            ]
+        )
+
+        logging.debug("Starting game host container %s", game_host_container_name)
+
+        with tracing.span("container_start"):
+            await self._docker_client.call(game_host_container.start)
+
+            # Run agent containers concurrently.
+            agent_containers: List[Optional[docker.models.containers.Container]] = (
+                await _gather_all(
+                    *[
+                        self._run_agent_container(
+                            agent, game_host_container_name, match_resources
+                        )
+                        for agent in journal_entry.agents
+                    ]
+                )
+            )
+
+        # Journal the match so that it can be resumed after a restart.
+        journal_entry.cpus = match_resources.cpus
+        journal_entry.game_host_data_dir_path = (
+            str(match_resources.game_host_data_dir_path)
+            if match_resources.game_host_data_dir_path is not None
+            else None
+        )
+
+        await asyncio.to_thread(write_match_journal_entry, journal_entry)
+
+        return game_host_container, agent_containers
+
+    def _supervise(
+        self,
+        container: docker.models.containers.Container,
+        role: Literal["agent", "game-host"],
+    ) -> ContainerSupervisor:
+        """Starts supervising a started container of a match.
+
+        Args:
+            container: The container
+            role: The role of the container
+
+        Returns:
+            The supervisor of the container
+        """
+
+        supervisor = (
+            ContainerSupervisor(
+                self._docker_client,
+                self._event_monitor,
+                container,
+                sampling_interval=_RESOURCE_SAMPLING_INTERVAL,
+                stderr_limit=self._agent_stderr_limit,
+                cpu_time_limit_ns=self._agent_cpu_time_limit_ns,
+                output_limit=self._agent_output_limit,
+            )
+            if role == "agent"
+            else ContainerSupervisor(
+                self._docker_client,
+                self._event_monitor,
+                container,
+                sampling_interval=_RESOURCE_SAMPLING_INTERVAL,
+                stderr_limit=self._game_host_stderr_limit,
+            )
+        )
+        supervisor.start()
+
+        return supervisor
+
+    async def _track_match_files(self, match_id: str) -> None:
+        """Tracks the replay and stderr outputs of a judged match, pinned until delivered.
+
+        Args:
+            match_id: The ID of the match
+        """
+
+        if self._storage_manager is None:
+            return
+
+        paths: List[Tuple[StorageCategory, Path]] = [
+            ("match_replays", path_manager.get_match_replay_path(match_id)),
+            ("match_stderr", path_manager.get_match_stderr_dir_path(match_id)),
+        ]
+
+        for category, path in paths:
+            if path.exists():
+                await asyncio.to_thread(
+                    self._storage_manager.track, category, path, pinned=True
+                )
+
+    async def _wait_game_host_container(
+        self,
+        game_host_container: docker.models.containers.Container,
+        agent_supervisors: List[Optional[ContainerSupervisor]],
+        match_resources: _MatchResources,
+        *,
+        timeout: float,
+    ) -> None:
+        """Waits until the game host container finishes.
+
+        If the host data directory of the game host is mounted and limited in size, the
+        directory is watched while waiting. If early termination is enabled, the wait ends once
+        the quorum of agents has exited and the game host has not finished within the grace
+        period, leaving the game host to be stopped.
+
+        Args:
+            game_host_container: The game host container
+            agent_supervisors: The supervisors of the agent containers
+            match_resources: The resources of the match
+            timeout: The time left until the judge timeout in seconds
+
+        Raises:
+            TimeoutError: If the game host does not finish within the judge timeout
+            ValueError: If the game host data exceeds the size limit
+        """
+
+        # The game host of a resumed match may have exited while the worker was down, even past
+        # the judge timeout, which could not be enforced then. Its result is collected instead of
+        # reporting a timeout.
+        if self._event_monitor.get_exit(game_host_container) is not None:
+            return
+
+        wait_task = asyncio.ensure_future(
+            asyncio.wait_for(
+                self._event_monitor.wait(game_host_container),
+                timeout=timeout,
+            )
+        )
+        quorum_task = asyncio.ensure_future(
+            wait_exit_quorum(
+                [supervisor for supervisor in agent_supervisors if supervisor],
+                self._early_termination_quorum,
+                grace_period=self._early_termination_grace_period,
+            )
+        )
+        watch_task = asyncio.ensure_future(
+            watch_dir_size(
+                match_resources.game_host_data_dir_path,
+                self._game_host_data_size_limit,
+                interval=_GAME_HOST_DATA_SIZE_CHECK_INTERVAL,
+            )
+            if match_resources.game_host_data_dir_path is not None
+            and self._game_host_data_size_limit is not None
+            else asyncio.Future()
+        )
+
+        try:
+            await asyncio.wait(
+                [wait_task, quorum_task, watch_task],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+        finally:
+            # Also cancelled if the wait itself is, lest they are left running.
+            quorum_task.cancel()
+            watch_task.cancel()
+
+            # The game host is left running to be stopped if the wait ends for another reason.
+            if not wait_task.done():
+                wait_task.cancel()
+
+                with contextlib.suppress(asyncio.CancelledError):
+                    await wait_task
+
+        if watch_task.done() and not watch_task.cancelled():
+            watch_task.result()
+
+        if wait_task.cancelled():
+            logging.info(
+                "Terminating match %s early since the agent quorum has exited",
+                match_resources.match_id,
+            )
+
+            return
+
+        try:
+            await wait_task
+        except TimeoutError as exc:
+            logging.error("Game host timeout for match %s", match_resources.match_id)
+
+            raise TimeoutError("Game host timeout") from exc
+
+
+async def _gather_all(*aws: Awaitable[Any]) -> List[Any]:
+    """Runs awaitables concurrently and waits for all of them to settle.
+
+    Unlike a plain asyncio.gather, no awaitable is left running in the background when another
+    one fails, so that resources created by the successful ones can be cleaned up reliably.
+
+    Args:
+        *aws: The awaitables to run
+
+    Returns:
+        The results of the awaitables, in order
+
+    Raises:
+        Exception: The first exception raised by the awaitables, if any
+    """
+
+    results = await asyncio.gather(*aws, return_exceptions=True)
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    return results
+
+
+def _is_unlabelled_legacy_resource(
+    name: Optional[str], labels: Optional[Dict[str, str]]
+) -> bool:
+    """Checks whether a container or network was created by a worker before labelling.
+
+    Args:
+        name: The name of the container or network
+        labels: The labels of the container or network
+
+    Returns:
+        True if it has no worker label and is named like the containers and networks of matches
+    """
+
+    return (
+        name is not None
+        and _WORKER_LABEL not in (labels or {})
+        and name.startswith(
+            (
+                _AGENT_CONTAINER_NAME_PREFIX,
+                _GAME_HOST_CONTAINER_NAME_PREFIX,
+                _NETWORK_NAME_PREFIX,
+            )
+        )
+    )
@@ -0,0 +1,149 @@
+"""The implementation of the pool of pre-created match resources."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import docker.models.containers
+import docker.models.networks
+
+
+class MatchResourcePool:
+    """Keeps created but not started game host containers and pre-created agent networks.
+
+    Taking a resource from the pool is instant, so that creating them is off the critical path of
+    a match. The pool is replenished in the background after resources are taken.
+    """
+
+    _create_game_host_container: Callable[
+        [str], Awaitable[docker.models.containers.Container]
+    ]
+    _create_network: Callable[[], Awaitable[docker.models.networks.Network]]
+    _game_host_containers: Dict[str, List[docker.models.containers.Container]]
+    _game_host_pool_size: int
+    _network_pool_size: int
+    _networks: List[docker.models.networks.Network]
+    _replenishment_task: Optional[asyncio.Task] = None
+
+    def __init__(
+        self,
+        *,
+        create_game_host_container: Callable[
+            [str], Awaitable[docker.models.containers.Container]
+        ],
+        create_network: Callable[[], Awaitable[docker.models.networks.Network]],
+        game_host_pool_size: int,
+        network_pool_size: int,
+    ):
+        """Initializes the pool.
+
+        Args:
+            create_game_host_container: The function creating a game host container to pool for
+                a game host image
+            create_network: The function creating a network to pool
+            game_host_pool_size: The number of game host containers to keep for each game host
+                image
+            network_pool_size: The number of networks to keep
+        """
+
+        self._create_game_host_container = create_game_host_container
+        self._create_network = create_network
+        self._game_host_pool_size = game_host_pool_size
+        self._network_pool_size = network_pool_size
+
+        self._game_host_containers = {}
+        self._networks = []
+
+    @property
+    def replenishment_task(self) -> Optional[asyncio.Task]:
+        """The task replenishing the pool, if any."""
+
+        return self._replenishment_task
+
+    def clear(self) -> None:
+        """Forgets all pooled resources, e.g. after they have been removed."""
+
+        self._game_host_containers.clear()
+        self._networks.clear()
+
+    def schedule_replenishment(self, game_host_image: Optional[str]) -> None:
+        """Replenishes the pool in the background unless it is already being done.
+
+        Args:
+            game_host_image: The game host image to pool containers for, or None to only pool
+                networks
+        """
+
+        if self._game_host_pool_size == 0 and self._network_pool_size == 0:
+            return
+
+        if self._replenishment_task is not None and not self._replenishment_task.done():
+            return
+
+        self._replenishment_task = asyncio.create_task(self._replenish(game_host_image))
+        self._replenishment_task.add_done_callback(_log_replenishment_error)
+
+    def take_game_host_container(
+        self, game_host_image: str
+    ) -> Optional[docker.models.containers.Container]:
+        """Takes a pooled game host container.
+
+        Args:
+            game_host_image: The game host image
+
+        Returns:
+            The game host container, or None if there is none for the image
+        """
+
+        game_host_containers = self._game_host_containers.get(game_host_image, [])
+
+        return game_host_containers.pop() if game_host_containers else None
+
+    def take_networks(self, count: int) -> List[docker.models.networks.Network]:
+        """Takes as many pooled networks as possible, up to a count.
+
+        Args:
+            count: The maximum number of networks to take
+
+        Returns:
+            The networks
+        """
+
+        networks: List[docker.models.networks.Network] = []
+
+        while self._networks and len(networks) < count:
+            networks.append(self._networks.pop())
+
+        return networks
+
+    async def _replenish(self, game_host_image: Optional[str]) -> None:
+        """Fills the game host containers and the networks up to their pool sizes.
+
+        Args:
+            game_host_image: The game host image to pool containers for, or None to only pool
+                networks
+        """
+
+        if game_host_image is not None:
+            game_host_containers = self._game_host_containers.setdefault(
+                game_host_image, []
+            )
+
+            while len(game_host_containers) < self._game_host_pool_size:
+                game_host_containers.append(
+                    await self._create_game_host_container(game_host_image)
+                )
+
+        while len(self._networks) < self._network_pool_size:
+            self._networks.append(await self._create_network())
+
+
+def _log_replenishment_error(task: asyncio.Task) -> None:
+    """Logs the error of a finished pool replenishment task, if any.
+
+    Args:
+        task: The pool replenishment task
+    """
+
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Failed to replenish pools: %s", task.exception())
@@ -4,7 +4,7 @@
 from typing import List, Literal, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class MatchResult:
     """Match result.
 
@@ -14,9 +14,33 @@ class MatchResult:
         error_message: The error message of the match result
         success: Whether the match was successful
         replay_file_path: The path to the replay file
+        stderr_output: The stderr output of the game host, empty if stored in a file
+        resource_usage: The resource usage of the game host, if sampled
+        replay_encoding: The encoding the replay file is compressed with, if any
+        stderr_file_path: The path to the file the stderr output of the game host is stored in
     """
 
-    @dataclass
+    @dataclass(slots=True)
+    class ResourceUsage:
+        """Resource usage of a container during a match.
+
+        Attributes:
+            cpu_ns: The CPU time used in nanoseconds
+            network_rx_bytes: The number of bytes received over the network
+            network_tx_bytes: The number of bytes sent over the network
+            peak_memory_bytes: The peak memory usage in bytes
+            throttled_periods: The number of CPU periods in which the container was throttled
+            wall_time_ns: The wall time from the start to the exit in nanoseconds
+        """
+
+        cpu_ns: int
+        network_rx_bytes: int
+        network_tx_bytes: int
+        peak_memory_bytes: int
+        throttled_periods: int
+        wall_time_ns: int
+
+    @dataclass(slots=True)
     class AgentResult:
         """Match result for an agent.
 
@@ -24,7 +48,9 @@ class AgentResult:
             exit_code: The exit code of the agent
             score: The score of the agent
             status: The status of the agent
-            stderr_output: The stderr output of the agent
+            stderr_output: The stderr output of the agent, empty if stored in a file
+            resource_usage: The resource usage of the agent, if sampled
+            stderr_file_path: The path to the file the stderr output of the agent is stored in
         """
 
         exit_code: int
@@ -33,6 +59,8 @@ class AgentResult:
             "OK", "RE", "TLE", "MLE", "OLE", "STLE", "EXIT", "UE", "CANCEL", "IA"
         ]
         stderr_output: str
+        resource_usage: Optional["MatchResult.ResourceUsage"] = None
+        stderr_file_path: Optional[str] = None
 
     match_id: str
 
@@ -40,3 +68,6 @@ class AgentResult:
     error_message: str
     replay_file_path: Optional[str]
     stderr_output: str
+    resource_usage: Optional[ResourceUsage] = None
+    replay_encoding: Optional[Literal["gzip"]] = None
+    stderr_file_path: Optional[str] = None
@@ -1,11 +1,17 @@
 """The immplementation of the match result reporter."""
 
+import asyncio
 import base64
+import dataclasses
+import gzip
 import json
 import logging
+from typing import BinaryIO, Optional
 
 import aiohttp
 
+import saiblo_worker.metrics as metrics
+import saiblo_worker.tracing as tracing
 from saiblo_worker.base_match_result_reporter import BaseMatchResultReporter
 from saiblo_worker.match_result import MatchResult
 
@@ -23,53 +29,166 @@ def __init__(self, session: aiohttp.ClientSession):
     async def report(self, result: MatchResult) -> None:
         logging.debug("Reporting match result for match %s", result.match_id)
 
-        form_data = aiohttp.FormData(
-            {
-                "message": json.dumps({}),
-                "state": (
-                    "评测成功" if result.replay_file_path is not None else "评测失败"
-                ),
-                "states": json.dumps(
-                    [
-                        {
-                            "position": i,
-                            "status": agent_result.status,
-                            "code": agent_result.exit_code,
-                            "stderr": base64.b64encode(
-                                agent_result.stderr_output.encode()
-                            ).decode(),
-                        }
-                        for i, agent_result in enumerate(result.agent_results)
-                    ]
-                ),
-            }
-        )
+        with (
+            metrics.REPORT_DURATION.time(type="match"),
+            metrics.REPORT_FAILURES.count_exceptions(type="match"),
+        ):
+            # Stderr outputs stored in files are only loaded while the result is reported.
+            result = await asyncio.to_thread(_load_stderr_outputs, result)
+
+            # The replay file is streamed from disk. Failed uploads are retried by the caller,
+            # e.g. the report outbox, which reopens it.
+            replay_file = await asyncio.to_thread(_open_replay_file, result)
+
+            try:
+                with tracing.span(
+                    "upload", trace_key=tracing.get_match_trace_key(result.match_id)
+                ):
+                    async with self._session.put(
+                        f"/judger/matches/{result.match_id}/",
+                        data=_make_form_data(result, replay_file),
+                    ) as response:
+                        response.raise_for_status()
+
+            finally:
+                if replay_file is not None:
+                    replay_file.close()
+
+        logging.info("Match result reported for match %s", result.match_id)
+
+
+def _load_stderr_outputs(result: MatchResult) -> MatchResult:
+    """Loads the stderr outputs of a match result stored in files.
+
+    A missing file is read as an empty output, so that the rest of the result is still reported.
 
-        replay_file_name = f"{REPLAY_FILE_NAME_PREFIX}-{result.match_id}.dat"
+    This function blocks on file I/O, so it must not be run on the event loop.
 
-        if result.replay_file_path is not None:  # If success.
-            with open(result.replay_file_path, "rb") as replay_file:
-                replay_file_bytes = replay_file.read()
+    Args:
+        result: The match result
 
-            form_data.add_field("file", replay_file_bytes, filename=replay_file_name)
+    Returns:
+        A copy of the match result with the stderr outputs loaded
+    """
 
-            form_data.add_field(
-                "scores",
-                json.dumps(
-                    [agent_result.score for agent_result in result.agent_results]
+    return dataclasses.replace(
+        result,
+        agent_results=[
+            dataclasses.replace(
+                agent_result,
+                stderr_output=_read_stderr_output(
+                    agent_result.stderr_output, agent_result.stderr_file_path
                 ),
+                stderr_file_path=None,
             )
+            for agent_result in result.agent_results
+        ],
+        stderr_output=_read_stderr_output(
+            result.stderr_output, result.stderr_file_path
+        ),
+        stderr_file_path=None,
+    )
+
+
+def _make_form_data(
+    result: MatchResult, replay_file: Optional[BinaryIO]
+) -> aiohttp.FormData:
+    """Makes the multipart form of a match result.
+
+    Args:
+        result: The match result
+        replay_file: The opened replay file if the match succeeded. It is streamed into the
+            request body in chunks, so that memory usage does not depend on its size.
+
+    Returns:
+        The form
+    """
+
+    form_data = aiohttp.FormData(
+        {
+            "message": json.dumps({}),
+            "state": ("评测成功" if replay_file is not None else "评测失败"),
+            "states": json.dumps(
+                [
+                    {
+                        "position": i,
+                        "status": agent_result.status,
+                        "code": agent_result.exit_code,
+                        "stderr": base64.b64encode(
+                            agent_result.stderr_output.encode()
+                        ).decode(),
+                    }
+                    for i, agent_result in enumerate(result.agent_results)
+                ]
+            ),
+        }
+    )
+
+    replay_file_name = f"{REPLAY_FILE_NAME_PREFIX}-{result.match_id}.dat"
+
+    if replay_file is not None:  # If success.
+        form_data.add_field("file", replay_file, filename=replay_file_name)
+
+        form_data.add_field(
+            "scores",
+            json.dumps([agent_result.score for agent_result in result.agent_results]),
+        )
 
-        else:
-            form_data.add_field(
-                "err", base64.b64encode(result.stderr_output.encode()).decode()
-            )
-            form_data.add_field("error", result.error_message)
-            form_data.add_field("file", b"", filename=replay_file_name)
+    else:
+        form_data.add_field(
+            "err", base64.b64encode(result.stderr_output.encode()).decode()
+        )
+        form_data.add_field("error", result.error_message)
+        form_data.add_field("file", b"", filename=replay_file_name)
 
-        async with self._session.put(
-            f"/judger/matches/{result.match_id}/", data=form_data
-        ) as response:
-            response.raise_for_status()
+    return form_data
 
-        logging.info("Match result reported for match %s", result.match_id)
+
+def _open_replay_file(result: MatchResult) -> Optional[BinaryIO]:
+    """Opens the replay file of a match result to be uploaded.
+
+    Replay files compressed on disk are decompressed while they are read, since Saiblo only
+    accepts uncompressed replays.
+
+    This function blocks on file I/O, so it must not be run on the event loop.
+
+    Args:
+        result: The match result
+
+    Returns:
+        The opened replay file, or None if the match failed
+    """
+
+    if result.replay_file_path is None:
+        return None
+
+    if result.replay_encoding == "gzip":
+        return gzip.open(result.replay_file_path, "rb")
+
+    return open(result.replay_file_path, "rb")
+
+
+def _read_stderr_output(stderr_output: str, stderr_file_path: Optional[str]) -> str:
+    """Reads a stderr output, either inline or stored in a file.
+
+    This function blocks on file I/O, so it must not be run on the event loop.
+
+    Args:
+        stderr_output: The inline stderr output
+        stderr_file_path: The path to the file the stderr output is stored in, if any
+
+    Returns:
+        The stderr output
+    """
+
+    if stderr_file_path is None:
+        return stderr_output
+
+    try:
+        with open(stderr_file_path, "rb") as f:
+            return f.read().decode("utf-8", errors="replace")
+
+    except FileNotFoundError:
+        logging.warning("Stderr output file %s not found", stderr_file_path)
+
+        return ""
@@ -0,0 +1,211 @@
+"""The implementation of the indexed store of match results."""
+
+import dataclasses
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import dacite
+
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.match_result import MatchResult
+
+
+class MatchResultStore:
+    """A store of match results in an SQLite database, indexed by match ID.
+
+    The database is opened on first use. Results saved as JSON files under data/match_results by
+    earlier versions are imported into it then, and the files are removed.
+
+    All methods block on the database, so they must not be run on the event loop. They may be
+    called from any thread.
+    """
+
+    _connection: Optional[sqlite3.Connection] = None
+    _lock: threading.Lock
+    _path: Path
+
+    def __init__(self, *, path: Optional[Path] = None):
+        """Initializes the store.
+
+        Args:
+            path: The path to the database. Defaults to the one given by path_manager.
+        """
+
+        self._path = path or path_manager.get_match_result_store_path()
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Removes all results and compacts the database."""
+
+        with self._lock:
+            connection = self._connect()
+
+            with connection:
+                connection.execute("DELETE FROM match_results")
+
+            self._compact(connection)
+
+    def close(self) -> None:
+        """Closes the database. It is opened again on next use."""
+
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def compact(self) -> None:
+        """Reclaims the space of removed results and truncates the write-ahead log."""
+
+        with self._lock:
+            self._compact(self._connect())
+
+    def get(self, match_id: str) -> Optional[MatchResult]:
+        """Gets the result of a match.
+
+        Args:
+            match_id: The ID of the match
+
+        Returns:
+            The result, or None if the match has no result
+        """
+
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT result FROM match_results WHERE match_id = ?", (match_id,)
+                )
+                .fetchone()
+            )
+
+        return _parse_result(row[0]) if row is not None else None
+
+    def list(
+        self, *, after: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[MatchResult]:
+        """Lists results in the order of their match IDs.
+
+        Args:
+            after: The match ID to list results after, e.g. the last one of the previous page.
+                Results are listed from the first one if not given.
+            limit: The maximum number of results. All results are listed if not given.
+
+        Returns:
+            The results
+        """
+
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT result FROM match_results WHERE match_id > ? "
+                    "ORDER BY match_id LIMIT ?",
+                    (after or "", limit if limit is not None else -1),
+                )
+                .fetchall()
+            )
+
+        return [_parse_result(row[0]) for row in rows]
+
+    def put(self, result: MatchResult) -> None:
+        """Saves the result of a match, replacing the previous one if any.
+
+        Args:
+            result: The result
+        """
+
+        with self._lock:
+            connection = self._connect()
+
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO match_results (match_id, result) VALUES (?, ?)",
+                    (result.match_id, json.dumps(dataclasses.asdict(result))),
+                )
+
+    def _compact(self, connection: sqlite3.Connection) -> None:
+        """Reclaims the space of removed results and truncates the write-ahead log.
+
+        Args:
+            connection: The open connection
+        """
+
+        connection.execute("VACUUM")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens the database if needed, importing results saved as JSON files.
+
+        Must be called with the lock held.
+
+        Returns:
+            The open connection
+        """
+
+        if self._connection is not None:
+            return self._connection
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(self._path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS match_results "
+            "(match_id TEXT PRIMARY KEY, result TEXT NOT NULL) WITHOUT ROWID"
+        )
+
+        self._connection = connection
+
+        self._import_json_files(connection)
+
+        return connection
+
+    def _import_json_files(self, connection: sqlite3.Connection) -> None:
+        """Imports results saved as JSON files and removes the files.
+
+        Unreadable files are left in place.
+
+        Args:
+            connection: The open connection
+        """
+
+        paths: List[Path] = []
+
+        with connection:
+            for path in path_manager.get_match_result_paths():
+                try:
+                    result = _parse_result(path.read_text(encoding="utf-8"))
+
+                except (OSError, ValueError, dacite.DaciteError) as e:
+                    logging.warning("Skipping unreadable match result %s: %s", path, e)
+                    continue
+
+                connection.execute(
+                    "INSERT OR REPLACE INTO match_results (match_id, result) VALUES (?, ?)",
+                    (path.stem, json.dumps(dataclasses.asdict(result))),
+                )
+                paths.append(path)
+
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+        if len(paths) > 0:
+            logging.info("Imported %d match results from JSON files", len(paths))
+
+
+def _parse_result(result_json: str) -> MatchResult:
+    """Parses a result serialized as JSON.
+
+    Args:
+        result_json: The serialized result
+
+    Returns:
+        The result
+    """
+
+    return dacite.from_dict(MatchResult, json.loads(result_json))
@@ -0,0 +1,520 @@
+"""Contains the metrics of the worker and the HTTP server exposing them.
+
+Metrics are exposed in the Prometheus text format. They are only updated on the event loop
+thread, so they need no locking.
+"""
+
+import contextlib
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import aiohttp.web
+
+_DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600)
+
+_metrics: List["_Metric"] = []
+
+
+class _Metric(ABC):
+    """Base class for metrics, registered for exposition on creation."""
+
+    _documentation: str
+    _label_names: Tuple[str, ...]
+    _name: str
+    _type: str
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        """Initializes the metric and registers it.
+
+        Args:
+            name: The name of the metric
+            documentation: The help text of the metric
+            label_names: The names of the labels of the metric
+        """
+
+        self._documentation = documentation
+        self._label_names = tuple(label_names)
+        self._name = name
+
+        _metrics.append(self)
+
+    def collect(self) -> List[str]:
+        """Collects the lines exposing the metric.
+
+        Returns:
+            The lines, with the help and type lines first
+        """
+
+        return [
+            f"# HELP {self._name} {self._documentation}",
+            f"# TYPE {self._name} {self._type}",
+            *self._collect_samples(),
+        ]
+
+    @abstractmethod
+    def _collect_samples(self) -> List[str]:
+        """Collects the lines of the samples of the metric.
+
+        Returns:
+            The lines
+        """
+
+    def _get_label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Gets the values of the labels of a sample in order.
+
+        Args:
+            labels: The labels of the sample
+
+        Returns:
+            The label values
+        """
+
+        if set(labels) != set(self._label_names):
+            raise ValueError(
+                f"Metric {self._name} has labels {self._label_names}, got {tuple(labels)}"
+            )
+
+        return tuple(str(labels[label_name]) for label_name in self._label_names)
+
+    def _format_sample(
+        self,
+        suffix: str,
+        label_values: Tuple[str, ...],
+        value: float,
+        extra_labels: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Formats the line of a sample.
+
+        Args:
+            suffix: The suffix of the sample name, e.g. _bucket
+            label_values: The label values of the sample
+            value: The value of the sample
+            extra_labels: The labels specific to the sample, e.g. le
+
+        Returns:
+            The line
+        """
+
+        labels = {
+            **dict(zip(self._label_names, label_values)),
+            **(extra_labels or {}),
+        }
+        formatted_labels = ",".join(
+            f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()
+        )
+
+        return (
+            f"{self._name}{suffix}"
+            + (f"{{{formatted_labels}}}" if formatted_labels else "")
+            + f" {_format_value(value)}"
+        )
+
+
+class Counter(_Metric):
+    """A counter, which only goes up."""
+
+    _type = "counter"
+    _values: Dict[Tuple[str, ...], float]
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """Initializes the counter and registers it.
+
+        Args:
+            name: The name of the counter, ending with _total
+            documentation: The help text of the counter
+            label_names: The names of the labels of the counter
+        """
+
+        super().__init__(name, documentation, label_names)
+
+        self._values = {}
+
+        # Unlabeled counters are exposed from the start.
+        if len(self._label_names) == 0:
+            self._values[()] = 0
+
+    @contextlib.contextmanager
+    def count_exceptions(self, **labels: str) -> Iterator[None]:
+        """Increments the counter if the block raises an exception.
+
+        Args:
+            **labels: The labels of the sample to increment
+        """
+
+        try:
+            yield
+
+        except Exception:
+            self.inc(**labels)
+
+            raise
+
+    def get(self, **labels: str) -> float:
+        """Gets the value of a sample.
+
+        Args:
+            **labels: The labels of the sample
+
+        Returns:
+            The value, 0 if never incremented
+        """
+
+        return self._values.get(self._get_label_values(labels), 0)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increments a sample.
+
+        Args:
+            amount: The non-negative amount to increment by
+            **labels: The labels of the sample
+        """
+
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts")
+
+        label_values = self._get_label_values(labels)
+
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def _collect_samples(self) -> List[str]:
+        return [
+            self._format_sample("", label_values, value)
+            for label_values, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """A gauge, which can go up and down."""
+
+    _type = "gauge"
+    _values: Dict[Tuple[str, ...], float]
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """Initializes the gauge and registers it.
+
+        Args:
+            name: The name of the gauge
+            documentation: The help text of the gauge
+            label_names: The names of the labels of the gauge
+        """
+
+        super().__init__(name, documentation, label_names)
+
+        self._values = {}
+
+        if len(self._label_names) == 0:
+            self._values[()] = 0
+
+    def get(self, **labels: str) -> float:
+        """Gets the value of a sample.
+
+        Args:
+            **labels: The labels of the sample
+
+        Returns:
+            The value, 0 if never set
+        """
+
+        return self._values.get(self._get_label_values(labels), 0)
+
+    def set(self, value: float, **labels: str) -> None:
+        """Sets a sample.
+
+        Args:
+            value: The value
+            **labels: The labels of the sample
+        """
+
+        self._values[self._get_label_values(labels)] = value
+
+    def _collect_samples(self) -> List[str]:
+        return [
+            self._format_sample("", label_values, value)
+            for label_values, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    """A histogram, counting observations in cumulative buckets."""
+
+    _buckets: Tuple[float, ...]
+    _type = "histogram"
+    _values: Dict[Tuple[str, ...], Tuple[List[int], float]]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = _DEFAULT_BUCKETS,
+    ):
+        """Initializes the histogram and registers it.
+
+        Args:
+            name: The name of the histogram
+            documentation: The help text of the histogram
+            label_names: The names of the labels of the histogram
+            buckets: The upper bounds of the buckets in ascending order, without +Inf
+        """
+
+        super().__init__(name, documentation, label_names)
+
+        self._buckets = (*buckets, math.inf)
+        self._values = {}
+
+    def get_count(self, **labels: str) -> int:
+        """Gets the number of observations of a sample.
+
+        Args:
+            **labels: The labels of the sample
+
+        Returns:
+            The number of observations
+        """
+
+        bucket_counts, _ = self._values.get(
+            self._get_label_values(labels), ([0] * len(self._buckets), 0)
+        )
+
+        return bucket_counts[-1]
+
+    def get_sum(self, **labels: str) -> float:
+        """Gets the sum of the observations of a sample.
+
+        Args:
+            **labels: The labels of the sample
+
+        Returns:
+            The sum of the observations
+        """
+
+        _, total = self._values.get(self._get_label_values(labels), ([], 0))
+
+        return total
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Observes a value.
+
+        Args:
+            value: The value
+            **labels: The labels of the sample
+        """
+
+        label_values = self._get_label_values(labels)
+        bucket_counts, total = self._values.get(
+            label_values, ([0] * len(self._buckets), 0)
+        )
+
+        for i, upper_bound in enumerate(self._buckets):
+            if value <= upper_bound:
+                bucket_counts[i] += 1
+
+        self._values[label_values] = (bucket_counts, total + value)
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the duration in seconds of the block, even if it raises an exception.
+
+        Args:
+            **labels: The labels of the sample
+        """
+
+        start_time = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def _collect_samples(self) -> List[str]:
+        lines: List[str] = []
+
+        for label_values, (bucket_counts, total) in self._values.items():
+            lines += [
+                self._format_sample(
+                    "_bucket",
+                    label_values,
+                    bucket_count,
+                    {"le": _format_value(upper_bound)},
+                )
+                for upper_bound, bucket_count in zip(self._buckets, bucket_counts)
+            ]
+            lines.append(self._format_sample("_sum", label_values, total))
+            lines.append(self._format_sample("_count", label_values, bucket_counts[-1]))
+
+        return lines
+
+
+class MetricsServer:
+    """An HTTP server exposing the metrics at /metrics."""
+
+    _host: str
+    _port: int
+    _runner: Optional[aiohttp.web.AppRunner] = None
+
+    def __init__(self, *, host: str = "127.0.0.1", port: int = 9090):
+        """Initializes the server.
+
+        Args:
+            host: The host to listen on
+            port: The port to listen on, or 0 for a free port
+        """
+
+        self._host = host
+        self._port = port
+
+    @property
+    def port(self) -> int:
+        """The port the server listens on, once started."""
+
+        assert self._runner is not None, "The server is not started"
+
+        return self._runner.addresses[0][1]
+
+    async def start(self) -> None:
+        """Starts listening."""
+
+        app = aiohttp.web.Application()
+        app.add_routes([aiohttp.web.get("/metrics", self._handle_metrics)])
+
+        self._runner = aiohttp.web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+
+        site = aiohttp.web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+
+        logging.info("Metrics exposed at http://%s:%d/metrics", self._host, self.port)
+
+    async def stop(self) -> None:
+        """Stops listening."""
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_metrics(
+        self, request: aiohttp.web.Request
+    ) -> aiohttp.web.Response:
+        """Handles a scrape of the metrics.
+
+        Args:
+            request: The request
+
+        Returns:
+            The response with the metrics in the Prometheus text format
+        """
+
+        del request
+
+        return aiohttp.web.Response(
+            text=render(),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+
+def render() -> str:
+    """Renders all metrics in the Prometheus text format.
+
+    Returns:
+        The metrics
+    """
+
+    return "".join(f"{line}\n" for metric in _metrics for line in metric.collect())
+
+
+def _escape_label_value(value: str) -> str:
+    """Escapes a label value for the Prometheus text format.
+
+    Args:
+        value: The label value
+
+    Returns:
+        The escaped label value
+    """
+
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    """Formats a sample value or bucket bound for the Prometheus text format.
+
+    Args:
+        value: The value
+
+    Returns:
+        The formatted value
+    """
+
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+ARTIFACT_BYTES = Counter(
+    "saiblo_worker_artifact_bytes_total",
+    "Total size in bytes of replay files extracted from game hosts.",
+)
+BUILD_CACHE_LOOKUPS = Counter(
+    "saiblo_worker_build_cache_lookups_total",
+    "Lookups of built agent images, by whether the image was built already.",
+    ["result"],
+)
+BUILD_DURATION = Histogram(
+    "saiblo_worker_build_duration_seconds",
+    "Duration of agent image builds, by status.",
+    ["status"],
+)
+EVENT_LOOP_LAG = Histogram(
+    "saiblo_worker_event_loop_lag_seconds",
+    "Delay of the event loop in running scheduled callbacks.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+EVENT_LOOP_STALLS = Counter(
+    "saiblo_worker_event_loop_stalls_total",
+    "Times the event loop lagged more than the watchdog threshold.",
+)
+MATCH_DURATION = Histogram(
+    "saiblo_worker_match_duration_seconds",
+    "Duration of judging matches, by status.",
+    ["status"],
+)
+REPORT_DURATION = Histogram(
+    "saiblo_worker_report_duration_seconds",
+    "Duration of uploading results to Saiblo, by type.",
+    ["type"],
+)
+REPORT_FAILURES = Counter(
+    "saiblo_worker_report_failures_total",
+    "Failed uploads of results to Saiblo, by type.",
+    ["type"],
+)
+TASK_QUEUE_DEPTH = Gauge(
+    "saiblo_worker_task_queue_depth",
+    "Number of tasks waiting to be executed.",
+)
+TASKS_COMPLETED = Counter(
+    "saiblo_worker_tasks_completed_total",
+    "Tasks executed with a successful result, by type.",
+    ["type"],
+)
+TASKS_FAILED = Counter(
+    "saiblo_worker_tasks_failed_total",
+    "Tasks failed with an exception or a failed result, by type.",
+    ["type"],
+)
+TASKS_SCHEDULED = Counter(
+    "saiblo_worker_tasks_scheduled_total",
+    "Tasks scheduled, by type.",
+    ["type"],
+)
+WEBSOCKET_RECONNECTS = Counter(
+    "saiblo_worker_websocket_reconnects_total",
+    "Reconnections to the Saiblo websocket after the connection closed.",
+)
@@ -1,8 +1,17 @@
-"""Manages paths for different components of the application."""
+"""Manages paths for different components of the application.
 
+Agent code, replays and stderr outputs are spread over shard subdirectories named after a hash
+prefix of their ID, so that no directory grows to hundreds of thousands of entries.
+"""
+
+import hashlib
 from pathlib import Path
 from typing import List
 
+_SHARD_NAME_LENGTH = 2
+
+_data_dir_path = Path("data")
+
 
 def get_agent_code_base_dir_path() -> Path:
     """Gets the base directory for agent code.
@@ -11,7 +20,7 @@ def get_agent_code_base_dir_path() -> Path:
         The base directory for agent code
     """
 
-    return Path("data/agent_code")
+    return get_data_dir_path() / "agent_code"
 
 
 def get_agent_code_tarball_path(code_id: str) -> Path:
@@ -23,7 +32,7 @@ def get_agent_code_tarball_path(code_id: str) -> Path:
     Returns:
         The path to the tarball for the agent code with the given ID
     """
-    return get_agent_code_base_dir_path() / f"{code_id}.tar"
+    return get_agent_code_base_dir_path() / _get_shard_name(code_id) / f"{code_id}.tar"
 
 
 def get_agent_code_tarball_paths() -> List[Path]:
@@ -32,7 +41,67 @@ def get_agent_code_tarball_paths() -> List[Path]:
     Returns:
         The paths to all agent code tarballs
     """
-    return list(get_agent_code_base_dir_path().glob("*.tar"))
+    return list(get_agent_code_base_dir_path().glob("*/*.tar"))
+
+
+def get_data_dir_path() -> Path:
+    """Gets the root directory of all data of the worker.
+
+    Returns:
+        The data root directory
+    """
+    return _data_dir_path
+
+
+def get_game_host_data_base_dir_path() -> Path:
+    """Gets the base directory for host data directories mounted into game host containers.
+
+    Returns:
+        The base directory for game host data directories
+    """
+    return get_data_dir_path() / "game_host_data"
+
+
+def get_game_host_data_dir_path(name: str) -> Path:
+    """Gets the host data directory mounted into the game host container with the given name.
+
+    Args:
+        name: The name the game host container was created with
+
+    Returns:
+        The host data directory for the game host container
+    """
+    return get_game_host_data_base_dir_path() / name
+
+
+def get_match_journal_base_dir_path() -> Path:
+    """Gets the base directory for journal entries of running matches.
+
+    Returns:
+        The base directory for match journal entries
+    """
+    return get_data_dir_path() / "match_journal"
+
+
+def get_match_journal_path(match_id: str) -> Path:
+    """Gets the path to the journal entry for the running match with the given match ID.
+
+    Args:
+        match_id: The ID of the match
+
+    Returns:
+        The path to the journal entry for the match with the given match ID
+    """
+    return get_match_journal_base_dir_path() / f"{match_id}.json"
+
+
+def get_match_journal_paths() -> List[Path]:
+    """Gets the paths to all match journal entries.
+
+    Returns:
+        The paths to all match journal entries
+    """
+    return list(get_match_journal_base_dir_path().glob("*.json"))
 
 
 def get_match_replay_base_dir_path() -> Path:
@@ -41,7 +110,7 @@ def get_match_replay_base_dir_path() -> Path:
     Returns:
         The base directory for match replays
     """
-    return Path("data/match_replays")
+    return get_data_dir_path() / "match_replays"
 
 
 def get_match_replay_path(match_id: str) -> Path:
@@ -53,7 +122,9 @@ def get_match_replay_path(match_id: str) -> Path:
     Returns:
         The path to the replay for the match with the given match ID
     """
-    return get_match_replay_base_dir_path() / f"{match_id}.dat"
+    return (
+        get_match_replay_base_dir_path() / _get_shard_name(match_id) / f"{match_id}.dat"
+    )
 
 
 def get_match_result_base_dir_path() -> Path:
@@ -62,7 +133,7 @@ def get_match_result_base_dir_path() -> Path:
     Returns:
         The base directory for match results
     """
-    return Path("data/match_results")
+    return get_data_dir_path() / "match_results"
 
 
 def get_match_result_path(match_id: str) -> Path:
@@ -84,3 +155,109 @@ def get_match_result_paths() -> List[Path]:
         The paths to all match result files
     """
     return list(get_match_result_base_dir_path().glob("*.json"))
+
+
+def get_match_result_store_path() -> Path:
+    """Gets the path to the database storing match results.
+
+    Returns:
+        The path to the match result database
+    """
+    return get_data_dir_path() / "match_results.sqlite3"
+
+
+def get_match_stderr_base_dir_path() -> Path:
+    """Gets the base directory for stderr outputs of match containers.
+
+    Returns:
+        The base directory for stderr outputs
+    """
+    return get_data_dir_path() / "match_stderr"
+
+
+def get_match_stderr_dir_path(match_id: str) -> Path:
+    """Gets the directory for stderr outputs of the containers of the match with the given ID.
+
+    Args:
+        match_id: The ID of the match
+
+    Returns:
+        The directory for stderr outputs of the match
+    """
+    return get_match_stderr_base_dir_path() / _get_shard_name(match_id) / match_id
+
+
+def get_match_stderr_path(match_id: str, role: str) -> Path:
+    """Gets the path to the stderr output of a container of the match with the given match ID.
+
+    Args:
+        match_id: The ID of the match
+        role: The role of the container in the match, like game-host or agent-0
+
+    Returns:
+        The path to the stderr output of the container
+    """
+    return get_match_stderr_dir_path(match_id) / f"{role}.log"
+
+
+def get_report_outbox_base_dir_path() -> Path:
+    """Gets the base directory for reports waiting to be delivered.
+
+    Returns:
+        The base directory for the report outbox
+    """
+    return get_data_dir_path() / "report_outbox"
+
+
+def get_report_outbox_path(report_id: str) -> Path:
+    """Gets the path to the report with the given ID in the outbox.
+
+    Args:
+        report_id: The ID of the report
+
+    Returns:
+        The path to the report with the given ID
+    """
+    return get_report_outbox_base_dir_path() / f"{report_id}.json"
+
+
+def get_report_outbox_paths() -> List[Path]:
+    """Gets the paths to all reports in the outbox.
+
+    Returns:
+        The paths to all reports in the outbox
+    """
+    return list(get_report_outbox_base_dir_path().glob("*.json"))
+
+
+def get_trash_dir_path() -> Path:
+    """Gets the directory files and directories are moved to before they are removed.
+
+    Returns:
+        The trash directory
+    """
+    return get_data_dir_path() / "trash"
+
+
+def set_data_dir_path(path: Path) -> None:
+    """Sets the root directory of all data of the worker.
+
+    Must be called before any other path is got.
+
+    Args:
+        path: The data root directory
+    """
+    global _data_dir_path  # pylint: disable=global-statement
+    _data_dir_path = path
+
+
+def _get_shard_name(name: str) -> str:
+    """Gets the name of the shard subdirectory of an entry.
+
+    Args:
+        name: The ID the entry is named after
+
+    Returns:
+        The shard name, a hash prefix of the ID
+    """
+    return hashlib.sha1(name.encode()).hexdigest()[:_SHARD_NAME_LENGTH]
@@ -0,0 +1,459 @@
+"""The implementation of the durable outbox of build and match results to report."""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Set
+
+import aiohttp
+import dacite
+
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.base_build_result_reporter import BaseBuildResultReporter
+from saiblo_worker.base_match_result_reporter import BaseMatchResultReporter
+from saiblo_worker.build_result import BuildResult
+from saiblo_worker.match_result import MatchResult
+from saiblo_worker.storage_manager import StorageManager
+
+# Client errors that may go away when retried.
+_RETRYABLE_CLIENT_ERROR_STATUSES = {408, 429}
+
+
+class ReportOutbox:
+    """A durable outbox of build and match results, delivered in the background.
+
+    Results are written to disk under data/report_outbox before enqueue returns, so that tasks do
+    not wait for uploads and no result is lost across restarts. A background sender delivers them
+    with the wrapped reporters, retrying failed deliveries with exponential backoff. Results of
+    the same agent code or match are delivered one at a time in the order they were enqueued.
+    """
+
+    _build_result_reporter: BaseBuildResultReporter
+    _concurrency: int
+    _delivered_futures: Dict[str, asyncio.Future[None]]
+    _delivering_keys: Set[str]
+    _last_report_id: int = 0
+    _loaded: bool = False
+    _match_result_reporter: BaseMatchResultReporter
+    _max_retry_interval: float
+    _pending_paths: Dict[str, List[Path]]
+    _ready_keys: asyncio.Queue[str]
+    _retry_interval: float
+    _storage_manager: Optional[StorageManager]
+
+    def __init__(
+        self,
+        build_result_reporter: BaseBuildResultReporter,
+        match_result_reporter: BaseMatchResultReporter,
+        *,
+        concurrency: int = 4,
+        max_retry_interval: float = 60,
+        retry_interval: float = 1,
+        storage_manager: Optional[StorageManager] = None,
+    ):
+        """Initializes the outbox.
+
+        Args:
+            build_result_reporter: The reporter to deliver build results with
+            match_result_reporter: The reporter to deliver match results with
+            concurrency: The maximum number of deliveries in flight
+            max_retry_interval: The maximum time in seconds between retries of a delivery
+            retry_interval: The time in seconds before the first retry of a delivery, doubled
+                after every failed retry
+            storage_manager: The storage manager to unpin the replays and stderr outputs of
+                matches with once all their results are delivered
+        """
+
+        self._build_result_reporter = build_result_reporter
+        self._match_result_reporter = match_result_reporter
+        self._concurrency = concurrency
+        self._max_retry_interval = max_retry_interval
+        self._retry_interval = retry_interval
+        self._storage_manager = storage_manager
+
+        self._delivered_futures = {}
+        self._delivering_keys = set()
+        self._pending_paths = {}
+        self._ready_keys = asyncio.Queue()
+
+    @property
+    def build_result_reporter(self) -> BaseBuildResultReporter:
+        """A build result reporter enqueuing results into the outbox."""
+
+        return _OutboxBuildResultReporter(self)
+
+    @property
+    def match_result_reporter(self) -> BaseMatchResultReporter:
+        """A match result reporter enqueuing results into the outbox."""
+
+        return _OutboxMatchResultReporter(self)
+
+    async def enqueue(self, result: BuildResult | MatchResult) -> None:
+        """Writes a result to the outbox to be delivered by the background sender.
+
+        Args:
+            result: The build or match result
+        """
+
+        # Report IDs are increasing across restarts, so that sorting by them gives the order
+        # results were enqueued in.
+        self._last_report_id = max(time.time_ns(), self._last_report_id + 1)
+
+        path = path_manager.get_report_outbox_path(f"{self._last_report_id:020d}")
+
+        await asyncio.to_thread(_write_report, path, result)
+
+        logging.debug("Enqueued report %s", path.stem)
+
+        self._add_pending_path(_get_key(result), path)
+
+    async def load(self) -> None:
+        """Loads the results left in the outbox by a previous run to be delivered.
+
+        The replays and stderr outputs of their matches are pinned, so this must be called before
+        the storage manager scans the data directory, lest they are evicted before delivery.
+        Loading more than once has no effect.
+        """
+
+        if self._loaded:
+            return
+
+        self._loaded = True
+
+        for path in sorted(
+            await asyncio.to_thread(path_manager.get_report_outbox_paths),
+            key=lambda path: path.stem,
+        ):
+            # Skip reports enqueued since the start.
+            if any(path in paths for paths in self._pending_paths.values()):
+                continue
+
+            try:
+                result = await asyncio.to_thread(_read_report, path)
+
+            except (OSError, ValueError, dacite.DaciteError) as e:
+                logging.error("Skipping unreadable report %s: %s", path.stem, e)
+                continue
+
+            self._last_report_id = max(self._last_report_id, int(path.stem))
+            self._add_pending_path(_get_key(result), path)
+
+            # Files of matches with undelivered results must survive until delivered.
+            if isinstance(result, MatchResult) and self._storage_manager is not None:
+                self._storage_manager.pin(_get_match_file_paths(result.match_id))
+
+    async def start(self) -> None:
+        """Delivers the results in the outbox, including those left by a previous run.
+
+        Runs forever.
+        """
+
+        await self.load()
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+        delivery_tasks: Set[asyncio.Task] = set()
+
+        while True:
+            key = await self._ready_keys.get()
+
+            delivery_task = asyncio.create_task(self._deliver_key(key, semaphore))
+            delivery_tasks.add(delivery_task)
+            delivery_task.add_done_callback(delivery_tasks.discard)
+
+    async def wait_match_delivered(self, match_id: str) -> None:
+        """Waits until the results of a match in the outbox are delivered or rejected.
+
+        Args:
+            match_id: The ID of the match
+        """
+
+        key = _get_match_key(match_id)
+
+        if key not in self._pending_paths:
+            return
+
+        if key not in self._delivered_futures:
+            self._delivered_futures[key] = asyncio.get_running_loop().create_future()
+
+        # Shielded, so that a cancelled waiter does not cancel the others.
+        await asyncio.shield(self._delivered_futures[key])
+
+    def _add_pending_path(self, key: str, path: Path) -> None:
+        """Adds a report to be delivered after the earlier reports with the same key.
+
+        Args:
+            key: The key of the report
+            path: The path to the report
+        """
+
+        self._pending_paths.setdefault(key, []).append(path)
+        self._schedule_key(key)
+
+    async def _deliver(self, result: BuildResult | MatchResult) -> None:
+        """Delivers a result with the wrapped reporters.
+
+        Args:
+            result: The build or match result
+        """
+
+        if isinstance(result, BuildResult):
+            await self._build_result_reporter.report(result)
+
+        else:
+            await self._match_result_reporter.report(result)
+
+    async def _deliver_key(self, key: str, semaphore: asyncio.Semaphore) -> None:
+        """Delivers the reports with a key in order until there are none left.
+
+        Args:
+            key: The key of the reports
+            semaphore: The semaphore limiting the number of deliveries in flight
+        """
+
+        pending_paths = self._pending_paths[key]
+        result: Optional[BuildResult | MatchResult] = None
+
+        try:
+            while len(pending_paths) > 0:
+                result = (
+                    await self._deliver_report(pending_paths[0], semaphore) or result
+                )
+                pending_paths.pop(0)
+
+            if isinstance(result, MatchResult) and self._storage_manager is not None:
+                await asyncio.to_thread(
+                    self._storage_manager.unpin, _get_match_file_paths(result.match_id)
+                )
+
+        except Exception:  # pylint: disable=broad-except
+            logging.exception(
+                "Failed to deliver reports for %s, retrying in %.1f s",
+                key,
+                self._max_retry_interval,
+            )
+
+            asyncio.get_running_loop().call_later(
+                self._max_retry_interval, self._schedule_key, key
+            )
+
+        finally:
+            self._delivering_keys.discard(key)
+
+            if len(pending_paths) == 0:
+                del self._pending_paths[key]
+
+                if key in self._delivered_futures:
+                    self._delivered_futures.pop(key).set_result(None)
+
+    async def _deliver_report(
+        self, path: Path, semaphore: asyncio.Semaphore
+    ) -> Optional[BuildResult | MatchResult]:
+        """Delivers a report, retrying until it succeeds or is rejected, and removes it.
+
+        A report rejected by a client error is kept with the .rejected suffix for inspection.
+        The semaphore is only held during each attempt, not while backing off.
+
+        Args:
+            path: The path to the report
+            semaphore: The semaphore limiting the number of deliveries in flight
+
+        Returns:
+            The delivered or rejected result, or None if the report is unreadable
+        """
+
+        try:
+            result = await asyncio.to_thread(_read_report, path)
+
+        except (OSError, ValueError, dacite.DaciteError) as e:
+            logging.error("Skipping unreadable report %s: %s", path.stem, e)
+            return None
+
+        attempt = 0
+
+        while True:
+            attempt += 1
+
+            try:
+                async with semaphore:
+                    await self._deliver(result)
+
+                await asyncio.to_thread(path.unlink, missing_ok=True)
+
+                logging.debug("Delivered report %s", path.stem)
+
+                return result
+
+            except (aiohttp.ClientResponseError, FileNotFoundError) as e:
+                if isinstance(e, FileNotFoundError) or (
+                    400 <= e.status < 500
+                    and e.status not in _RETRYABLE_CLIENT_ERROR_STATUSES
+                ):
+                    logging.error(
+                        "Report %s for %s rejected: (%s) %s",
+                        path.stem,
+                        _get_key(result),
+                        type(e),
+                        e,
+                    )
+
+                    await asyncio.to_thread(
+                        os.replace, path, path.with_suffix(".rejected")
+                    )
+
+                    return result
+
+                error: Exception = e
+
+            except Exception as e:  # pylint: disable=broad-except
+                error = e
+
+            retry_interval = min(
+                self._retry_interval * 2 ** (attempt - 1), self._max_retry_interval
+            )
+
+            logging.warning(
+                "Failed to deliver report %s for %s (attempt %d), retrying in %.1f s: (%s) %s",
+                path.stem,
+                _get_key(result),
+                attempt,
+                retry_interval,
+                type(error),
+                error,
+            )
+
+            await asyncio.sleep(retry_interval)
+
+    def _schedule_key(self, key: str) -> None:
+        """Schedules the delivery of the pending reports with a key unless already scheduled.
+
+        Args:
+            key: The key of the reports
+        """
+
+        if key in self._pending_paths and key not in self._delivering_keys:
+            self._delivering_keys.add(key)
+            self._ready_keys.put_nowait(key)
+
+
+class _OutboxBuildResultReporter(BaseBuildResultReporter):
+    """A build result reporter enqueuing results into an outbox."""
+
+    _outbox: ReportOutbox
+
+    def __init__(self, outbox: ReportOutbox):
+        self._outbox = outbox
+
+    async def report(self, result: BuildResult) -> None:
+        await self._outbox.enqueue(result)
+
+
+class _OutboxMatchResultReporter(BaseMatchResultReporter):
+    """A match result reporter enqueuing results into an outbox."""
+
+    _outbox: ReportOutbox
+
+    def __init__(self, outbox: ReportOutbox):
+        self._outbox = outbox
+
+    async def report(self, result: MatchResult) -> None:
+        await self._outbox.enqueue(result)
+
+
+def _get_key(result: BuildResult | MatchResult) -> str:
+    """Gets the key ordering the reports of the same agent code or match.
+
+    Args:
+        result: The build or match result
+
+    Returns:
+        The key
+    """
+
+    if isinstance(result, BuildResult):
+        return f"build/{result.code_id}"
+
+    return _get_match_key(result.match_id)
+
+
+def _get_match_key(match_id: str) -> str:
+    """Gets the key ordering the reports of a match.
+
+    Args:
+        match_id: The ID of the match
+
+    Returns:
+        The key
+    """
+
+    return f"match/{match_id}"
+
+
+def _get_match_file_paths(match_id: str) -> List[Path]:
+    """Gets the paths to the replay and stderr outputs of a match.
+
+    Args:
+        match_id: The ID of the match
+
+    Returns:
+        The paths
+    """
+
+    return [
+        path_manager.get_match_replay_path(match_id),
+        path_manager.get_match_stderr_dir_path(match_id),
+    ]
+
+
+def _read_report(path: Path) -> BuildResult | MatchResult:
+    """Reads a report written by _write_report.
+
+    This function blocks on file I/O, so it must not be run on the event loop.
+
+    Args:
+        path: The path to the report
+
+    Returns:
+        The build or match result
+    """
+
+    report = json.loads(path.read_text(encoding="utf-8"))
+    kind: Literal["build", "match"] = report["kind"]
+
+    return dacite.from_dict(
+        BuildResult if kind == "build" else MatchResult, report["result"]
+    )
+
+
+def _write_report(path: Path, result: BuildResult | MatchResult) -> None:
+    """Writes a report durably.
+
+    The report is written to a temporary file first and then moved in place, so that a crash
+    never leaves a partially written report.
+
+    This function blocks on file I/O, so it must not be run on the event loop.
+
+    Args:
+        path: The path to the report
+        result: The build or match result
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    temp_path = path.with_name(f"{path.name}.tmp")
+
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "kind": "build" if isinstance(result, BuildResult) else "match",
+                "result": dataclasses.asdict(result),
+            },
+            f,
+        )
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, path)
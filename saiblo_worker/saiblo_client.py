@@ -3,14 +3,19 @@
 import asyncio
 import json
 import logging
+import time
+from typing import Optional
 
 import websockets.asyncio.client
 from websockets import ClientConnection, ConnectionClosed
 
+import saiblo_worker.metrics as metrics
+import saiblo_worker.tracing as tracing
 from saiblo_worker.base_saiblo_client import BaseSaibloClient
 from saiblo_worker.base_task_scheduler import BaseTaskScheduler
 from saiblo_worker.build_task import BuildTaskFactory
 from saiblo_worker.judge_task import JudgeTask, JudgeTaskFactory
+from saiblo_worker.report_outbox import ReportOutbox
 
 _CHECK_TASK_SCHEDULER_IDLE_INTERVAL = 1
 _SEND_HEART_BEAT_INTERVAL = 3
@@ -21,9 +26,12 @@ class SaibloClient(BaseSaibloClient):
 
     _build_task_factory: BuildTaskFactory
     _judge_task_factory: JudgeTaskFactory
+    _judge_task_requested_at: Optional[int] = None
     _name: str
-    _request_judge_task_condition: asyncio.Condition = asyncio.Condition()
+    _report_outbox: Optional[ReportOutbox]
+    _request_judge_task_condition: asyncio.Condition
     _task_scheduler: BaseTaskScheduler
+    _unfinished_judge_task: Optional[JudgeTask] = None
     _websocket_url: str
 
     def __init__(
@@ -33,12 +41,29 @@ def __init__(
         task_scheduler: BaseTaskScheduler,
         build_task_factory: BuildTaskFactory,
         judge_task_factory: JudgeTaskFactory,
+        *,
+        report_outbox: Optional[ReportOutbox] = None,
     ):
+        """Initializes the client.
+
+        Args:
+            name: The name of the worker
+            websocket_url: The URL of the Saiblo WebSocket server
+            task_scheduler: The task scheduler to schedule tasks with
+            build_task_factory: The factory of build tasks
+            judge_task_factory: The factory of judge tasks
+            report_outbox: The outbox delivering the results of judge tasks, if any, so that
+                they are only finished once their match results are delivered
+        """
+
         self._name = name
         self._websocket_url = websocket_url
         self._task_scheduler = task_scheduler
         self._build_task_factory = build_task_factory
         self._judge_task_factory = judge_task_factory
+        self._report_outbox = report_outbox
+
+        self._request_judge_task_condition = asyncio.Condition()
 
     async def start(self) -> None:
         async for connection in websockets.asyncio.client.connect(self._websocket_url):
@@ -67,24 +92,42 @@ async def start(self) -> None:
             except ConnectionClosed as e:
                 logging.error("Connection closed: %s", e)
                 logging.debug("Reconnecting to %s", self._websocket_url)
+
+                metrics.WEBSOCKET_RECONNECTS.inc()
+
                 continue
 
     async def _keep_finish_judge_task(self, connection: ClientConnection) -> None:
         while True:
-            done_task = await self._task_scheduler.pop_done_task()
+            # A judge task left unfinished by a closed connection is finished first.
+            if self._unfinished_judge_task is None:
+                done_task = await self._task_scheduler.pop_done_task()
+
+                if not isinstance(done_task, JudgeTask):
+                    continue
+
+                self._unfinished_judge_task = done_task
+
+            judge_task = self._unfinished_judge_task
+
+            with tracing.span("finish_notification", trace_key=judge_task.trace_key):
+                # Saiblo expects the results of a match before it is finished.
+                if self._report_outbox is not None:
+                    await self._report_outbox.wait_match_delivered(judge_task.match_id)
 
-            if isinstance(done_task, JudgeTask):
                 await connection.send(
                     json.dumps(
                         {
                             "type": "finish_judge_task",
                             "data": {
-                                "match_id": int(done_task.match_id),
+                                "match_id": int(judge_task.match_id),
                             },
                         }
                     )
                 )
 
+            self._unfinished_judge_task = None
+
     async def _keep_heart_beat(self, connection: ClientConnection) -> None:
         while True:
             await connection.send(
@@ -113,6 +156,16 @@ async def _keep_receive_message(self, connection: ClientConnection) -> None:
                         [x["code_id"] for x in message["data"]["players"]],
                     )
 
+                    # Trace the latency from requesting a judge task to receiving one.
+                    if self._judge_task_requested_at is not None:
+                        tracing.record_span(
+                            "receive",
+                            self._judge_task_requested_at,
+                            trace_key=task.trace_key,
+                        )
+
+                        self._judge_task_requested_at = None
+
                     await self._task_scheduler.schedule(task)
 
                     async with self._request_judge_task_condition:
@@ -124,6 +177,8 @@ async def _keep_request_judge_task(self, connection: ClientConnection) -> None:
                 await asyncio.sleep(_CHECK_TASK_SCHEDULER_IDLE_INTERVAL)
                 continue
 
+            self._judge_task_requested_at = time.time_ns()
+
             await connection.send(
                 json.dumps(
                     {
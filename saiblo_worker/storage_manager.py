@@ -0,0 +1,244 @@
+"""The implementation of the manager of the disk usage of the data directory."""
+
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Set
+
+import saiblo_worker.path_manager as path_manager
+
+StorageCategory = Literal["agent_code", "match_replays", "match_stderr"]
+
+
+class StorageManager:
+    """Tracks the disk usage of the data directory by category and evicts files over budget.
+
+    Usage is tracked incrementally: the data directory is only walked once by scan, and every
+    file written afterwards is reported with track. When a category exceeds its budget, its
+    entries are evicted starting from the least recently tracked one. Replays and stderr outputs
+    of matches are pinned until their results have been delivered and are never evicted before.
+
+    All methods block on file I/O, so they must not be run on the event loop, except for the
+    properties. They may be called from any thread.
+    """
+
+    _budgets: Dict[StorageCategory, Optional[int]]
+    _entries: Dict[StorageCategory, OrderedDict[Path, int]]
+    _free_space_floor: int
+    _lock: threading.Lock
+    _pinned_paths: Set[Path]
+    _usage: Dict[StorageCategory, int]
+
+    def __init__(
+        self,
+        *,
+        agent_code_budget: Optional[int] = None,
+        free_space_floor: int = 0,
+        match_replay_budget: Optional[int] = None,
+        match_stderr_budget: Optional[int] = None,
+    ):
+        """Initializes the storage manager.
+
+        Args:
+            agent_code_budget: The maximum size in bytes of agent code tarballs. The least
+                recently used ones are evicted first. Unlimited if not given.
+            free_space_floor: The minimum free space in bytes on the file system of the data
+                directory for the worker to accept new tasks
+            match_replay_budget: The maximum size in bytes of match replays. The oldest delivered
+                ones are evicted first. Unlimited if not given.
+            match_stderr_budget: The maximum size in bytes of stderr outputs of matches. The
+                oldest delivered ones are evicted first. Unlimited if not given.
+        """
+
+        self._budgets = {
+            "agent_code": agent_code_budget,
+            "match_replays": match_replay_budget,
+            "match_stderr": match_stderr_budget,
+        }
+        self._free_space_floor = free_space_floor
+
+        self._entries = {category: OrderedDict() for category in self._budgets}
+        self._lock = threading.Lock()
+        self._pinned_paths = set()
+        self._usage = {category: 0 for category in self._budgets}
+
+    @property
+    def has_free_space(self) -> bool:
+        """Whether the file system of the data directory has more free space than the floor."""
+
+        if self._free_space_floor <= 0:
+            return True
+
+        # The data directory may not have been created yet.
+        path = path_manager.get_data_dir_path().absolute()
+
+        while not path.exists() and path != path.parent:
+            path = path.parent
+
+        return shutil.disk_usage(path).free >= self._free_space_floor
+
+    def get_usage(self, category: StorageCategory) -> int:
+        """Gets the tracked size of a category.
+
+        Args:
+            category: The category
+
+        Returns:
+            The size in bytes
+        """
+
+        return self._usage[category]
+
+    def pin(self, paths: List[Path]) -> None:
+        """Protects tracked or not yet tracked entries from eviction.
+
+        Args:
+            paths: The paths to the entries
+        """
+
+        with self._lock:
+            self._pinned_paths.update(paths)
+
+    def scan(self) -> None:
+        """Tracks the entries already in the shards of the data directory, oldest first.
+
+        Entries over budget are evicted right away, so entries to keep, e.g. the files of matches
+        with results left in the report outbox, must be pinned before.
+        """
+
+        base_dir_paths: Dict[StorageCategory, Path] = {
+            "agent_code": path_manager.get_agent_code_base_dir_path(),
+            "match_replays": path_manager.get_match_replay_base_dir_path(),
+            "match_stderr": path_manager.get_match_stderr_base_dir_path(),
+        }
+
+        with self._lock:
+            for category, base_dir_path in base_dir_paths.items():
+                if not base_dir_path.is_dir():
+                    continue
+
+                paths = sorted(
+                    base_dir_path.glob("*/*"), key=lambda path: path.stat().st_mtime
+                )
+
+                for path in paths:
+                    self._add_entry(category, path)
+
+                logging.info(
+                    "Tracking %d entries of %d bytes in %s",
+                    len(paths),
+                    self._usage[category],
+                    base_dir_path,
+                )
+
+            self._evict()
+
+    def track(
+        self, category: StorageCategory, path: Path, *, pinned: bool = False
+    ) -> None:
+        """Tracks a written or used entry as the most recent one of its category.
+
+        Entries of the category are evicted if it is over budget afterwards.
+
+        Args:
+            category: The category of the entry
+            path: The path to the file or directory
+            pinned: Whether to protect the entry from eviction until it is unpinned
+        """
+
+        with self._lock:
+            if pinned:
+                self._pinned_paths.add(path)
+
+            self._add_entry(category, path)
+
+            self._evict()
+
+    def unpin(self, paths: List[Path]) -> None:
+        """Allows entries to be evicted, e.g. once the result of their match is delivered.
+
+        Args:
+            paths: The paths to the entries
+        """
+
+        with self._lock:
+            self._pinned_paths.difference_update(paths)
+
+            self._evict()
+
+    def _add_entry(self, category: StorageCategory, path: Path) -> None:
+        """Adds or updates an entry as the most recent one of its category.
+
+        Must be called with the lock held.
+
+        Args:
+            category: The category of the entry
+            path: The path to the file or directory
+        """
+
+        entries = self._entries[category]
+        size = _get_size(path)
+
+        self._usage[category] += size - entries.pop(path, 0)
+        entries[path] = size
+
+    def _evict(self) -> None:
+        """Evicts unpinned entries of categories over budget, oldest first.
+
+        Must be called with the lock held.
+        """
+
+        for category, entries in self._entries.items():
+            budget = self._budgets[category]
+
+            if budget is None or self._usage[category] <= budget:
+                continue
+
+            evicted_paths: List[Path] = []
+            excess = self._usage[category] - budget
+
+            for path, size in entries.items():
+                if excess <= 0:
+                    break
+
+                if path not in self._pinned_paths:
+                    evicted_paths.append(path)
+                    excess -= size
+
+            for path in evicted_paths:
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+
+                else:
+                    path.unlink(missing_ok=True)
+
+                self._usage[category] -= entries.pop(path)
+
+                logging.debug("Evicted %s from %s", path, category)
+
+
+def _get_size(path: Path) -> int:
+    """Gets the size of a file or the total size of the files in a directory.
+
+    Args:
+        path: The path to the file or directory
+
+    Returns:
+        The size in bytes, or 0 if the path does not exist
+    """
+
+    if path.is_dir():
+        return sum(
+            os.path.getsize(os.path.join(dir_path, file_name))
+            for dir_path, _, file_names in os.walk(path)
+            for file_name in file_names
+        )
+
+    try:
+        return path.stat().st_size
+
+    except FileNotFoundError:
+        return 0
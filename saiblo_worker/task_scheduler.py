@@ -2,26 +2,63 @@
 
 import asyncio
 import logging
+import time
+from typing import Any, Optional, Tuple
 
+import saiblo_worker.metrics as metrics
+import saiblo_worker.tracing as tracing
 from saiblo_worker.base_task import BaseTask
 from saiblo_worker.base_task_scheduler import BaseTaskScheduler
+from saiblo_worker.build_result import BuildResult
+from saiblo_worker.cpu_allocator import CpuAllocator
+from saiblo_worker.match_result import MatchResult
+from saiblo_worker.storage_manager import StorageManager
 
 
 class TaskScheduler(BaseTaskScheduler):
     """The task scheduler"""
 
-    _done_tasks: asyncio.Queue[BaseTask] = asyncio.Queue()
-    _pending_tasks: asyncio.Queue[BaseTask] = asyncio.Queue()
+    _cpu_allocator: Optional[CpuAllocator]
+    _done_tasks: asyncio.Queue[BaseTask]
+    _pending_tasks: asyncio.Queue[Tuple[BaseTask, int]]
+    _storage_manager: Optional[StorageManager]
+
+    def __init__(
+        self,
+        *,
+        cpu_allocator: Optional[CpuAllocator] = None,
+        storage_manager: Optional[StorageManager] = None,
+    ):
+        """Initializes the task scheduler.
+
+        Args:
+            cpu_allocator: The allocator of CPUs to matches. If given, the scheduler is only idle
+                while another match can get its CPUs without waiting.
+            storage_manager: The storage manager of the data directory. If given, the scheduler
+                is only idle while there is enough free disk space.
+        """
+
+        self._cpu_allocator = cpu_allocator
+        self._storage_manager = storage_manager
+
+        self._done_tasks = asyncio.Queue()
+        self._pending_tasks = asyncio.Queue()
 
     @property
     def idle(self) -> bool:
-        return self._pending_tasks.empty()
+        return (
+            self._pending_tasks.empty()
+            and (self._cpu_allocator is None or self._cpu_allocator.can_admit)
+            and (self._storage_manager is None or self._storage_manager.has_free_space)
+        )
 
     async def clean(self) -> None:
         while not self._pending_tasks.empty():
             self._pending_tasks.get_nowait()
             self._pending_tasks.task_done()
 
+        metrics.TASK_QUEUE_DEPTH.set(0)
+
         while not self._done_tasks.empty():
             self._done_tasks.get_nowait()
             self._done_tasks.task_done()
@@ -34,22 +71,66 @@ async def pop_done_task(self) -> BaseTask:
         return task
 
     async def schedule(self, task: BaseTask) -> None:
-        await self._pending_tasks.put(task)
+        # The time is kept along with the task to trace how long it waits in the queue.
+        await self._pending_tasks.put((task, time.time_ns()))
+
+        metrics.TASKS_SCHEDULED.inc(type=type(task).__name__)
+        metrics.TASK_QUEUE_DEPTH.set(self._pending_tasks.qsize())
 
     async def start(self) -> None:
         while True:
-            task = await self._pending_tasks.get()
+            task, scheduled_at = await self._pending_tasks.get()
+
+            metrics.TASK_QUEUE_DEPTH.set(self._pending_tasks.qsize())
+
+            tracing.record_span(
+                "queue_wait", scheduled_at, trace_key=task.trace_key, task=str(task)
+            )
 
             try:
                 logging.debug("Executing task %s", task)
 
-                await task.execute()
+                with tracing.span("task", trace_key=task.trace_key, task=str(task)):
+                    result = await task.execute()
+
+                # Tasks report most failures in their results instead of raising.
+                if _is_failed_result(result):
+                    logging.warning("Task %s done with a failed result", task)
+
+                    metrics.TASKS_FAILED.inc(type=type(task).__name__)
 
-                logging.info("Task %s done", task)
+                else:
+                    logging.info("Task %s done", task)
+
+                    metrics.TASKS_COMPLETED.inc(type=type(task).__name__)
 
             except Exception as e:  # pylint: disable=broad-except
                 logging.error("Task %s failed: (%s) %s", task, type(e), e)
 
+                metrics.TASKS_FAILED.inc(type=type(task).__name__)
+
             self._pending_tasks.task_done()
 
             await self._done_tasks.put(task)
+
+
+def _is_failed_result(result: Any) -> bool:
+    """Checks whether the result of a task reports a failure.
+
+    Args:
+        result: The task execution result
+
+    Returns:
+        True if a build produced no image, or a match failed to be judged or has an agent not
+        finishing normally
+    """
+
+    if isinstance(result, BuildResult):
+        return result.image is None
+
+    if isinstance(result, MatchResult):
+        return result.error_message != "" or any(
+            agent_result.status != "OK" for agent_result in result.agent_results
+        )
+
+    return False
@@ -0,0 +1,271 @@
+"""Records trace spans around the phases of tasks and exports them.
+
+Spans are nested through a context variable, so that spans opened while another one is open,
+including in tasks created meanwhile, become its children. The trace ID of a span opened with a
+trace key is derived from the key, e.g. match/<match_id>, so that all spans of a match share one
+trace even if they are recorded by different components, e.g. after a restart.
+
+Nothing is exported until an exporter is set with set_exporter.
+"""
+
+import contextlib
+import contextvars
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Literal, Optional
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "saiblo_worker_current_span", default=None
+)
+_exporter: Optional["JsonlSpanExporter"] = None
+
+
+@dataclass(slots=True)
+class Span:
+    """A timed operation.
+
+    Attributes:
+        trace_id: The ID of the trace, 32 hex digits
+        span_id: The ID of the span, 16 hex digits
+        parent_span_id: The ID of the parent span, or None for a root span
+        name: The name of the operation, e.g. wait
+        start_time_unix_nano: The start time in nanoseconds since the epoch
+        end_time_unix_nano: The end time in nanoseconds since the epoch, or None if still open
+        attributes: The attributes of the operation, e.g. the match ID
+        status: Whether the operation succeeded
+        error_message: The error the operation failed with, empty if it succeeded
+    """
+
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    name: str
+    start_time_unix_nano: int
+    end_time_unix_nano: Optional[int] = None
+    attributes: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    status: Literal["ok", "error"] = "ok"
+    error_message: str = ""
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a file as JSON lines.
+
+    Spans are written by a dedicated thread, so that exporting never blocks the event loop.
+    """
+
+    _path: Path
+    _queue: "queue.SimpleQueue[Optional[Span]]"
+    _thread: threading.Thread
+
+    def __init__(self, path: Path):
+        """Initializes the exporter and starts its thread.
+
+        Args:
+            path: The path to the file to append spans to
+        """
+
+        self._path = path
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write_spans, daemon=True, name="saiblo-worker-tracing"
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Writes the spans exported so far and stops the thread."""
+
+        self._queue.put(None)
+        self._thread.join()
+
+    def export(self, finished_span: Span) -> None:
+        """Exports a finished span.
+
+        Args:
+            finished_span: The span
+        """
+
+        self._queue.put(finished_span)
+
+    def _write_spans(self) -> None:
+        """Writes exported spans until the exporter is closed."""
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(self._path, "a", encoding="utf-8") as file:
+            while True:
+                finished_span = self._queue.get()
+
+                if finished_span is None:
+                    return
+
+                try:
+                    file.write(json.dumps(dataclasses.asdict(finished_span)) + "\n")
+
+                    # Write out the spans in the queue at once.
+                    if self._queue.empty():
+                        file.flush()
+
+                except (OSError, TypeError, ValueError) as e:
+                    logging.error("Failed to export span %s: %s", finished_span.name, e)
+
+
+def get_build_trace_key(code_id: str) -> str:
+    """Gets the key of the trace of building an agent code.
+
+    Args:
+        code_id: The ID of the agent code
+
+    Returns:
+        The trace key
+    """
+
+    return f"build/{code_id}"
+
+
+def get_match_trace_key(match_id: str) -> str:
+    """Gets the key of the trace of a match.
+
+    Args:
+        match_id: The ID of the match
+
+    Returns:
+        The trace key
+    """
+
+    return f"match/{match_id}"
+
+
+def get_trace_id(trace_key: str) -> str:
+    """Gets the ID of the trace of a key.
+
+    Args:
+        trace_key: The key, e.g. from get_match_trace_key
+
+    Returns:
+        The trace ID, 32 hex digits
+    """
+
+    return hashlib.sha256(trace_key.encode()).hexdigest()[:32]
+
+
+def record_span(
+    name: str,
+    start_time_unix_nano: int,
+    *,
+    trace_key: Optional[str] = None,
+    **attributes: Any,
+) -> None:
+    """Records a span ending now that was not opened when it started, e.g. a wait in a queue.
+
+    Args:
+        name: The name of the operation
+        start_time_unix_nano: The start time in nanoseconds since the epoch
+        trace_key: The key of the trace of the span, e.g. match/<match_id>. The span belongs to
+            the trace of the current span if not given.
+        **attributes: The attributes of the operation
+    """
+
+    if _exporter is None:
+        return
+
+    recorded_span = _make_span(name, trace_key, attributes)
+    recorded_span.start_time_unix_nano = start_time_unix_nano
+    recorded_span.end_time_unix_nano = time.time_ns()
+
+    _exporter.export(recorded_span)
+
+
+def set_exporter(exporter: Optional[JsonlSpanExporter]) -> None:
+    """Sets the exporter of finished spans.
+
+    Args:
+        exporter: The exporter, or None to stop exporting spans
+    """
+
+    global _exporter  # pylint: disable=global-statement
+
+    _exporter = exporter
+
+
+@contextlib.contextmanager
+def span(
+    name: str, *, trace_key: Optional[str] = None, **attributes: Any
+) -> Iterator[Span]:
+    """Opens a span as the current one until the block exits.
+
+    The span is marked as failed if the block raises an exception.
+
+    Args:
+        name: The name of the operation
+        trace_key: The key of the trace of the span, e.g. match/<match_id>. The span belongs to
+            the trace of the current span if not given.
+        **attributes: The attributes of the operation
+
+    Returns:
+        The span, whose attributes may be added to in the block
+    """
+
+    opened_span = _make_span(name, trace_key, attributes)
+    token = _current_span.set(opened_span)
+
+    try:
+        yield opened_span
+
+    except BaseException as e:
+        opened_span.status = "error"
+        opened_span.error_message = f"({type(e).__name__}) {e}"
+
+        raise
+
+    finally:
+        _current_span.reset(token)
+
+        opened_span.end_time_unix_nano = time.time_ns()
+
+        if _exporter is not None:
+            _exporter.export(opened_span)
+
+
+def _make_span(name: str, trace_key: Optional[str], attributes: Dict[str, Any]) -> Span:
+    """Makes a span starting now as a child of the current span if in the same trace.
+
+    Args:
+        name: The name of the operation
+        trace_key: The key of the trace of the span, if any
+        attributes: The attributes of the operation
+
+    Returns:
+        The span
+    """
+
+    parent_span = _current_span.get()
+
+    if trace_key is not None:
+        trace_id = get_trace_id(trace_key)
+
+    elif parent_span is not None:
+        trace_id = parent_span.trace_id
+
+    else:
+        trace_id = os.urandom(16).hex()
+
+    return Span(
+        trace_id=trace_id,
+        span_id=os.urandom(8).hex(),
+        parent_span_id=(
+            parent_span.span_id
+            if parent_span is not None and parent_span.trace_id == trace_id
+            else None
+        ),
+        name=name,
+        start_time_unix_nano=time.time_ns(),
+        attributes=attributes,
+    )
@@ -1,12 +1,16 @@
 """Tests for the agent_code_fetcher module."""
 
+import io
 import shutil
+import tarfile
+import zipfile
 from pathlib import Path
-from unittest import IsolatedAsyncioTestCase
+from unittest import IsolatedAsyncioTestCase, TestCase
 
 import aiohttp
 
-from saiblo_worker.agent_code_fetcher import AgentCodeFetcher
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.agent_code_fetcher import AgentCodeFetcher, convert_zip_to_tarball
 
 CODE_ID = "7c562b10-287f-44c0-8fc4-0cf853a1859b"
 HTTP_BASE_URL = "https://api.dev.saiblo.net"
@@ -36,7 +40,7 @@ async def asyncTearDown(self) -> None:
     async def test_clean_file_exists(self):
         """Test clean() when target file exists."""
         # Arrange.
-        path = Path(f"data/agent_code/{CODE_ID}.tar")
+        path = path_manager.get_agent_code_tarball_path(CODE_ID)
         path.parent.mkdir(parents=True, exist_ok=True)
         path.touch()
         fetcher = AgentCodeFetcher(self._session)
@@ -61,7 +65,7 @@ async def test_clean_no_dir(self):
     async def test_fetch_file_exists(self):
         """Test fetch() when target file already exists."""
         # Arrange.
-        path = Path(f"data/agent_code/{CODE_ID}.tar")
+        path = path_manager.get_agent_code_tarball_path(CODE_ID)
         path.parent.mkdir(parents=True, exist_ok=True)
         path.touch()
         fetcher = AgentCodeFetcher(self._session)
@@ -75,7 +79,7 @@ async def test_fetch_file_exists(self):
     async def test_fetch_no_file(self):
         """Test fetch() when file needs to be downloaded."""
         # Arrange.
-        path = Path(f"data/agent_code/{CODE_ID}.tar")
+        path = path_manager.get_agent_code_tarball_path(CODE_ID)
         fetcher = AgentCodeFetcher(self._session)
 
         # Act.
@@ -89,8 +93,8 @@ async def test_fetch_no_file(self):
     async def test_list(self):
         """Test list() returns correct dictionary of code IDs and paths."""
         # Arrange.
-        Path("data/agent_code").mkdir(parents=True, exist_ok=True)
-        path = Path(f"data/agent_code/{CODE_ID}.tar")
+        path = path_manager.get_agent_code_tarball_path(CODE_ID)
+        path.parent.mkdir(parents=True, exist_ok=True)
         path.touch()
         fetcher = AgentCodeFetcher(self._session)
 
@@ -104,3 +108,33 @@ async def test_list(self):
             },
             result,
         )
+
+
+class TestConvertZipToTarball(TestCase):
+    """Tests for the convert_zip_to_tarball function."""
+
+    def setUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def test_convert_zip_to_tarball(self):
+        """Test converting files and skipping directories."""
+        # Arrange.
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zip_file:
+            zip_file.writestr("src/", b"")
+            zip_file.writestr("src/main.py", b"main")
+        path = Path("data/code.tar")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Act.
+        convert_zip_to_tarball(buffer.getvalue(), path)
+
+        # Assert.
+        with tarfile.open(path) as tar_file:
+            self.assertEqual(tar_file.getnames(), ["src/main.py"])
+            extracted_file = tar_file.extractfile("src/main.py")
+            assert extracted_file is not None
+            self.assertEqual(extracted_file.read(), b"main")
@@ -0,0 +1,107 @@
+"""Tests for the async_docker_client module."""
+
+import asyncio
+import time
+import unittest
+from typing import List
+from unittest.mock import MagicMock
+
+from saiblo_worker.async_docker_client import AsyncDockerClient
+
+MAX_LOOP_LAG = 0.1
+
+
+async def _measure_loop_lag(stop: asyncio.Event) -> float:
+    """Measures the maximum event loop lag until stop is set.
+
+    Args:
+        stop: The event to stop measuring
+
+    Returns:
+        The maximum event loop lag in seconds
+    """
+
+    max_lag = 0.0
+
+    while not stop.is_set():
+        start = time.monotonic()
+        await asyncio.sleep(0.01)
+        max_lag = max(max_lag, time.monotonic() - start - 0.01)
+
+    return max_lag
+
+
+class TestAsyncDockerClient(unittest.IsolatedAsyncioTestCase):
+    """Tests for the AsyncDockerClient class."""
+
+    async def test_call(self):
+        """Test call() returns the value of the function."""
+        # Arrange.
+        docker_client = AsyncDockerClient(client_factory=MagicMock)
+
+        # Act.
+        result = await docker_client.call(lambda x, *, y: x + y, 1, y=2)
+
+        # Assert.
+        self.assertEqual(result, 3)
+
+        await docker_client.close()
+
+    async def test_call_raises(self):
+        """Test call() when the function raises."""
+        # Arrange.
+        docker_client = AsyncDockerClient(client_factory=MagicMock)
+
+        def _raise() -> None:
+            raise RuntimeError()
+
+        # Act & Assert.
+        with self.assertRaises(RuntimeError):
+            await docker_client.call(_raise)
+
+        await docker_client.close()
+
+    async def test_call_with_client_creates_client_once(self):
+        """Test call_with_client() creates the underlying client once."""
+        # Arrange.
+        client_factory = MagicMock()
+        docker_client = AsyncDockerClient(client_factory=client_factory)
+
+        # Act.
+        await asyncio.gather(
+            *[docker_client.list_containers(all=True) for _ in range(8)]
+        )
+
+        # Assert.
+        client_factory.assert_called_once_with()
+        self.assertEqual(
+            client_factory.return_value.containers.list.call_count,
+            8,
+        )
+
+        await docker_client.close()
+
+    async def test_blocking_calls_keep_loop_lag_bounded(self):
+        """Test that blocking daemon calls do not block the event loop."""
+        # Arrange.
+        client_factory = MagicMock()
+        client_factory.return_value.containers.list.side_effect = (
+            lambda **_: time.sleep(0.5) or []
+        )
+        docker_client = AsyncDockerClient(client_factory=client_factory)
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(_measure_loop_lag(stop))
+
+        # Act.
+        results: List[List] = await asyncio.gather(
+            *[docker_client.list_containers(all=True) for _ in range(4)],
+            docker_client.call(time.sleep, 0.5),
+        )
+        stop.set()
+        max_lag = await lag_task
+
+        # Assert.
+        self.assertEqual(results[:4], [[], [], [], []])
+        self.assertLess(max_lag, MAX_LOOP_LAG)
+
+        await docker_client.close()
@@ -8,6 +8,7 @@
 import docker
 import docker.models.containers
 
+import saiblo_worker.path_manager as path_manager
 from saiblo_worker.agent_code_fetcher import AgentCodeFetcher
 from saiblo_worker.build_result_reporter import BuildResultReporter
 from saiblo_worker.build_task import BuildTaskFactory
@@ -44,7 +45,7 @@ async def asyncTearDown(self) -> None:
     async def test_execute(self):
         """Test execute()."""
         # Arrange.
-        agent_code_tarball_path = pathlib.Path(f"data/agent_code/{CODE_ID}.tar")
+        agent_code_tarball_path = path_manager.get_agent_code_tarball_path(CODE_ID)
         agent_code_tarball_path.parent.mkdir(parents=True, exist_ok=True)
         agent_code_tarball_path.touch()
 
@@ -0,0 +1,115 @@
+"""Tests for the container_logs module."""
+
+import json
+import shutil
+import unittest
+from pathlib import Path
+from typing import List
+from unittest.mock import MagicMock
+
+from saiblo_worker.container_logs import (
+    LogOutputCounter,
+    make_log_config,
+    read_log_tail,
+)
+
+
+def _write_log_lines(path: Path, lines: List[str]) -> None:
+    """Appends lines of output to a log file in the format of the json-file logging driver.
+
+    Args:
+        path: The path to the log file
+        lines: The lines of output
+    """
+
+    with path.open("a", encoding="utf-8") as file:
+        for line in lines:
+            file.write(
+                json.dumps(
+                    {"log": line, "stream": "stdout", "time": "2025-01-01T00:00:00Z"}
+                )
+                + "\n"
+            )
+
+
+class TestContainerLogs(unittest.TestCase):
+    """Tests for the container_logs module functions."""
+
+    def setUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def test_count_output(self):
+        """Test counting the output in log files as they are appended to and rotated."""
+        # Arrange.
+        log_file_path = Path("data/logs/container-json.log")
+        log_file_path.parent.mkdir(parents=True)
+        container = MagicMock()
+        container.attrs = {"LogPath": str(log_file_path)}
+        counter = LogOutputCounter(container)
+        _write_log_lines(log_file_path, ["out\n", "err\n"])
+        with log_file_path.open("ab") as file:
+            file.write(b'{"log":"incomplete')
+
+        # Act.
+        first_size = counter.count()
+        with log_file_path.open("ab") as file:
+            file.write(b'\\n","stream":"stderr","time":"2025-01-01T00:00:00Z"}\n')
+        log_file_path.rename(f"{log_file_path}.1")
+        _write_log_lines(log_file_path, ["\u00e9\n"])
+        second_size = counter.count()
+
+        # Assert.
+        self.assertEqual(first_size, 8)
+        self.assertEqual(second_size, 8 + 11 + 3)
+
+    def test_count_output_invisible(self):
+        """Test counting the output in log files the worker cannot see."""
+        # Arrange.
+        container = MagicMock()
+        container.attrs = {"LogPath": "data/logs/missing-json.log"}
+
+        # Act.
+        size = LogOutputCounter(container).count()
+
+        # Assert.
+        self.assertEqual(size, 0)
+
+    def test_make_log_config(self):
+        """Test making the log config of a container."""
+        # Act.
+        log_config = make_log_config(1024)
+
+        # Assert.
+        self.assertEqual(log_config.type, "json-file")
+        self.assertEqual(log_config.config, {"max-file": "2", "max-size": "4096"})
+
+    def test_read_log_tail(self):
+        """Test reading the tail of a long stderr output."""
+        # Arrange.
+        chunks = [bytes([i % 256]) * 1000 for i in range(100)]
+        container = MagicMock()
+        container.logs.return_value = iter(chunks)
+
+        # Act.
+        tail = read_log_tail(container, 2500)
+
+        # Assert.
+        self.assertEqual(tail, b"".join(chunks)[-2500:])
+        container.logs.assert_called_once_with(
+            stdout=False, stderr=True, stream=True, follow=False
+        )
+
+    def test_read_log_tail_short(self):
+        """Test reading the tail of a stderr output shorter than the limit."""
+        # Arrange.
+        container = MagicMock()
+        container.logs.return_value = iter([b"error\n"])
+
+        # Act.
+        tail = read_log_tail(container, 2500)
+
+        # Assert.
+        self.assertEqual(tail, b"error\n")
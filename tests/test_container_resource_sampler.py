@@ -0,0 +1,154 @@
+"""Tests for the container_resource_sampler module."""
+
+import asyncio
+import shutil
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from saiblo_worker.async_docker_client import AsyncDockerClient
+from saiblo_worker.container_resource_sampler import sample_resource_usage
+
+_CONTAINER_ID = "container_id"
+_PID = 42
+
+
+def _make_container() -> MagicMock:
+    """Makes a fake running container.
+
+    Returns:
+        The fake container
+    """
+
+    container = MagicMock()
+    container.id = _CONTAINER_ID
+    container.name = "container"
+    container.attrs = {"State": {"Pid": _PID}}
+
+    return container
+
+
+class TestContainerResourceSampler(unittest.IsolatedAsyncioTestCase):
+    """Tests for the sample_resource_usage function."""
+
+    _docker_client: AsyncDockerClient
+
+    async def asyncSetUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+        self._docker_client = AsyncDockerClient(client_factory=MagicMock)
+
+    async def asyncTearDown(self) -> None:
+        await self._docker_client.close()
+
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    async def test_sample_cgroup(self):
+        """Test sampling from the cgroup v2 files of a container."""
+        # Arrange.
+        cgroup_root_path = Path("data/cgroup")
+        cgroup_dir_path = cgroup_root_path / "docker" / _CONTAINER_ID
+        cgroup_dir_path.mkdir(parents=True)
+        (cgroup_dir_path / "cpu.stat").write_text(
+            "usage_usec 1500\nuser_usec 1000\nsystem_usec 500\n"
+            "nr_periods 10\nnr_throttled 3\nthrottled_usec 200\n"
+        )
+        (cgroup_dir_path / "memory.peak").write_text("1048576\n")
+
+        proc_root_path = Path("data/proc")
+        (proc_root_path / str(_PID) / "net").mkdir(parents=True)
+        (proc_root_path / str(_PID) / "net" / "dev").write_text(
+            "Inter-|   Receive                            |  Transmit\n"
+            " face |bytes    packets errs drop fifo frame compressed multicast|"
+            "bytes    packets errs drop fifo colls carrier compressed\n"
+            "    lo:     100       1    0    0    0     0          0         0"
+            "      100       1    0    0    0     0       0          0\n"
+            "  eth0:     300       3    0    0    0     0          0         0"
+            "      400       4    0    0    0     0       0          0\n"
+        )
+
+        exited = asyncio.get_running_loop().create_future()
+        exited.set_result(None)
+
+        # Act.
+        with (
+            patch(
+                "saiblo_worker.container_resource_sampler._CGROUP_ROOT_PATH",
+                cgroup_root_path,
+            ),
+            patch(
+                "saiblo_worker.container_resource_sampler._PROC_ROOT_PATH",
+                proc_root_path,
+            ),
+        ):
+            resource_usage = await sample_resource_usage(
+                self._docker_client, _make_container(), exited, interval=0.01
+            )
+
+        # Assert.
+        assert resource_usage is not None
+        self.assertEqual(resource_usage.cpu_ns, 1500000)
+        self.assertEqual(resource_usage.network_rx_bytes, 300)
+        self.assertEqual(resource_usage.network_tx_bytes, 400)
+        self.assertEqual(resource_usage.peak_memory_bytes, 1048576)
+        self.assertEqual(resource_usage.throttled_periods, 3)
+        self.assertGreater(resource_usage.wall_time_ns, 0)
+
+    async def test_sample_docker_stats(self):
+        """Test sampling from Docker stats until the container is gone."""
+        # Arrange.
+        container = _make_container()
+        container.stats.side_effect = [
+            {
+                "cpu_stats": {
+                    "cpu_usage": {"total_usage": 1000},
+                    "throttling_data": {"throttled_periods": 1},
+                },
+                "memory_stats": {"usage": 200},
+                "networks": {"eth0": {"rx_bytes": 10, "tx_bytes": 20}},
+            },
+            {
+                "cpu_stats": {
+                    "cpu_usage": {"total_usage": 3000},
+                    "throttling_data": {"throttled_periods": 2},
+                },
+                "memory_stats": {"usage": 100},
+                "networks": {"eth0": {"rx_bytes": 30, "tx_bytes": 40}},
+            },
+            {"cpu_stats": {}, "memory_stats": {}},
+        ]
+
+        exited = asyncio.get_running_loop().create_future()
+
+        # Act.
+        with patch(
+            "saiblo_worker.container_resource_sampler._CGROUP_ROOT_PATH",
+            Path("data/cgroup"),
+        ):
+            resource_usage = await sample_resource_usage(
+                self._docker_client, container, exited, interval=0.01
+            )
+
+        # Assert.
+        assert resource_usage is not None
+        self.assertEqual(resource_usage.cpu_ns, 3000)
+        self.assertEqual(resource_usage.network_rx_bytes, 30)
+        self.assertEqual(resource_usage.network_tx_bytes, 40)
+        self.assertEqual(resource_usage.peak_memory_bytes, 200)
+        self.assertEqual(resource_usage.throttled_periods, 2)
+
+    async def test_sample_unavailable(self):
+        """Test sampling when no sample can be taken."""
+        # Arrange.
+        container = _make_container()
+        container.reload.side_effect = RuntimeError()
+
+        exited = asyncio.get_running_loop().create_future()
+
+        # Act.
+        resource_usage = await sample_resource_usage(
+            self._docker_client, container, exited, interval=0.01
+        )
+
+        # Assert.
+        self.assertIsNone(resource_usage)
@@ -0,0 +1,282 @@
+"""Tests for the container_supervisor module."""
+
+import asyncio
+import json
+import shutil
+import unittest
+from pathlib import Path
+from typing import List
+from unittest.mock import MagicMock
+
+from saiblo_worker.async_docker_client import AsyncDockerClient
+from saiblo_worker.container_supervisor import ContainerSupervisor, wait_exit_quorum
+from saiblo_worker.docker_event_monitor import ContainerExit
+
+
+def _make_container() -> MagicMock:
+    """Makes a fake running container whose usage is sampled from Docker stats.
+
+    Returns:
+        The fake container
+    """
+
+    container = MagicMock()
+    container.id = "container_id"
+    container.name = "container"
+    container.attrs = {"State": {"Pid": 0}}
+    container.stats.return_value = {
+        "cpu_stats": {"cpu_usage": {"total_usage": 2_000_000_000}},
+        "memory_stats": {"usage": 100},
+    }
+    container.logs.return_value = iter([b"error\n"])
+
+    return container
+
+
+def _write_log_file(lines: List[str]) -> Path:
+    """Writes lines of output to a log file in the format of the json-file logging driver.
+
+    Args:
+        lines: The lines of output
+
+    Returns:
+        The path to the log file
+    """
+
+    log_file_path = Path("data/logs/container-json.log")
+    log_file_path.parent.mkdir(parents=True, exist_ok=True)
+    log_file_path.write_text(
+        "".join(
+            json.dumps(
+                {"log": line, "stream": "stderr", "time": "2025-01-01T00:00:00Z"}
+            )
+            + "\n"
+            for line in lines
+        ),
+        encoding="utf-8",
+    )
+
+    return log_file_path
+
+
+class TestContainerSupervisor(unittest.IsolatedAsyncioTestCase):
+    """Tests for the ContainerSupervisor class."""
+
+    _docker_client: AsyncDockerClient
+    _event_monitor: MagicMock
+    _exit: asyncio.Future
+
+    async def asyncSetUp(self) -> None:
+        self._docker_client = AsyncDockerClient(client_factory=MagicMock)
+
+        self._exit = asyncio.get_running_loop().create_future()
+
+        async def wait(_):
+            return await asyncio.shield(self._exit)
+
+        self._event_monitor = MagicMock()
+        self._event_monitor.wait.side_effect = wait
+
+    async def asyncTearDown(self) -> None:
+        await self._docker_client.close()
+
+    async def test_finish_exited(self):
+        """Test finishing when the container has exited by itself."""
+        # Arrange.
+        container = _make_container()
+        supervisor = ContainerSupervisor(
+            self._docker_client,
+            self._event_monitor,
+            container,
+            sampling_interval=0.01,
+            stderr_limit=1024,
+        )
+        supervisor.start()
+        await asyncio.sleep(0.05)
+        self._exit.set_result(ContainerExit(exit_code=1, oom_killed=True))
+        await asyncio.wait_for(supervisor.exit_task, timeout=1)
+
+        # Act.
+        outcome = await supervisor.finish()
+
+        # Assert.
+        self.assertEqual(outcome.exit_code, 1)
+        self.assertIsNone(outcome.limit_status)
+        self.assertTrue(outcome.oom_killed)
+        self.assertEqual(outcome.stderr_output, "error\n")
+        container.stop.assert_not_called()
+
+    async def test_finish_stderr_file(self):
+        """Test finishing with the stderr output stored in a file."""
+        # Arrange.
+        container = _make_container()
+        supervisor = ContainerSupervisor(
+            self._docker_client,
+            self._event_monitor,
+            container,
+            sampling_interval=0.01,
+            stderr_limit=1024,
+        )
+        supervisor.start()
+        self._exit.set_result(ContainerExit(exit_code=0, oom_killed=False))
+        await asyncio.wait_for(supervisor.exit_task, timeout=1)
+        stderr_file_path = Path("data/match_stderr/match_id/agent-0.log")
+
+        # Act.
+        try:
+            outcome = await supervisor.finish(stderr_file_path=stderr_file_path)
+            stderr_file_content = stderr_file_path.read_bytes()
+
+        finally:
+            shutil.rmtree(Path("data"), ignore_errors=True)
+
+        # Assert.
+        self.assertEqual(outcome.stderr_output, "")
+        self.assertEqual(outcome.stderr_file_path, str(stderr_file_path))
+        self.assertEqual(stderr_file_content, b"error\n")
+
+    async def test_finish_running(self):
+        """Test finishing when the container is still running."""
+        # Arrange.
+        container = _make_container()
+        container.stop.side_effect = (
+            lambda **_: self._exit.get_loop().call_soon_threadsafe(
+                self._exit.set_result, ContainerExit(exit_code=137, oom_killed=False)
+            )
+        )
+        supervisor = ContainerSupervisor(
+            self._docker_client,
+            self._event_monitor,
+            container,
+            sampling_interval=0.01,
+            stderr_limit=1024,
+        )
+        supervisor.start()
+
+        # Act.
+        outcome = await supervisor.finish()
+
+        # Assert.
+        self.assertEqual(outcome.exit_code, 0)
+        self.assertFalse(outcome.oom_killed)
+        container.stop.assert_called_once_with(timeout=0)
+
+    async def test_cpu_time_limit(self):
+        """Test killing the container when it exceeds its CPU time limit."""
+        # Arrange.
+        container = _make_container()
+        container.kill.side_effect = lambda: self._exit.get_loop().call_soon_threadsafe(
+            self._exit.set_result, ContainerExit(exit_code=137, oom_killed=False)
+        )
+        supervisor = ContainerSupervisor(
+            self._docker_client,
+            self._event_monitor,
+            container,
+            sampling_interval=0.01,
+            stderr_limit=1024,
+            cpu_time_limit_ns=1_000_000_000,
+        )
+        supervisor.start()
+
+        # Act.
+        await asyncio.wait_for(supervisor.exit_task, timeout=1)
+        outcome = await supervisor.finish()
+
+        # Assert.
+        self.assertEqual(outcome.exit_code, 137)
+        self.assertEqual(outcome.limit_status, "TLE")
+        container.kill.assert_called_once_with()
+
+    async def test_output_limit(self):
+        """Test killing the container when its output exceeds its output limit."""
+        # Arrange.
+        container = _make_container()
+        container.attrs["LogPath"] = str(_write_log_file(["x" * 99 + "\n"] * 3))
+        container.kill.side_effect = lambda: self._exit.get_loop().call_soon_threadsafe(
+            self._exit.set_result, ContainerExit(exit_code=137, oom_killed=False)
+        )
+        supervisor = ContainerSupervisor(
+            self._docker_client,
+            self._event_monitor,
+            container,
+            sampling_interval=0.01,
+            stderr_limit=1024,
+            output_limit=250,
+        )
+        supervisor.start()
+
+        # Act.
+        try:
+            await asyncio.wait_for(supervisor.exit_task, timeout=1)
+            outcome = await supervisor.finish()
+
+        finally:
+            shutil.rmtree(Path("data"), ignore_errors=True)
+
+        # Assert.
+        self.assertEqual(outcome.exit_code, 137)
+        self.assertEqual(outcome.limit_status, "OLE")
+        container.kill.assert_called_once_with()
+
+    async def test_output_limit_not_exceeded(self):
+        """Test not counting the JSON wrapping of the log files against the output limit."""
+        # Arrange.
+        container = _make_container()
+        log_file_path = _write_log_file(["x\n"] * 10)
+        container.attrs["LogPath"] = str(log_file_path)
+        container.stop.side_effect = (
+            lambda **_: self._exit.get_loop().call_soon_threadsafe(
+                self._exit.set_result, ContainerExit(exit_code=137, oom_killed=False)
+            )
+        )
+        supervisor = ContainerSupervisor(
+            self._docker_client,
+            self._event_monitor,
+            container,
+            sampling_interval=0.01,
+            stderr_limit=1024,
+            output_limit=100,
+        )
+        supervisor.start()
+
+        # Act.
+        try:
+            await asyncio.sleep(0.05)
+            outcome = await supervisor.finish()
+            log_file_size = log_file_path.stat().st_size
+
+        finally:
+            shutil.rmtree(Path("data"), ignore_errors=True)
+
+        # Assert.
+        self.assertGreater(log_file_size, 100)
+        self.assertIsNone(outcome.limit_status)
+        container.kill.assert_not_called()
+
+
+class TestWaitExitQuorum(unittest.IsolatedAsyncioTestCase):
+    """Tests for the wait_exit_quorum function."""
+
+    async def test_quorum(self):
+        """Test waiting until a quorum of containers has exited."""
+        # Arrange.
+        supervisors = [MagicMock() for _ in range(3)]
+        for supervisor in supervisors:
+            supervisor.exit_task = asyncio.get_running_loop().create_future()
+        wait_task = asyncio.ensure_future(
+            wait_exit_quorum(supervisors, 2, grace_period=0)
+        )
+
+        # Act.
+        supervisors[0].exit_task.set_result(
+            ContainerExit(exit_code=0, oom_killed=False)
+        )
+        await asyncio.sleep(0.01)
+        done_after_one = wait_task.done()
+        supervisors[2].exit_task.set_result(
+            ContainerExit(exit_code=0, oom_killed=False)
+        )
+        await asyncio.wait_for(wait_task, timeout=1)
+
+        # Assert.
+        self.assertFalse(done_after_one)
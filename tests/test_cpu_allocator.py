@@ -0,0 +1,106 @@
+"""Tests for the cpu_allocator module."""
+
+import asyncio
+import unittest
+
+from saiblo_worker.cpu_allocator import (
+    CpuAllocator,
+    format_cpu_list,
+    parse_cpu_list,
+    split_cpus,
+)
+
+
+class TestCpuAllocator(unittest.IsolatedAsyncioTestCase):
+    """Tests for the CpuAllocator class."""
+
+    async def test_allocate_single_node(self):
+        """Test allocating CPUs that fit in a NUMA node."""
+        # Arrange.
+        cpu_allocator = CpuAllocator(nodes=[[0, 1, 2, 3], [4, 5]])
+
+        # Act.
+        cpus = await cpu_allocator.allocate(2)
+        other_cpus = await cpu_allocator.allocate(3)
+
+        # Assert.
+        self.assertEqual(cpus, [4, 5])
+        self.assertEqual(other_cpus, [0, 1, 2])
+        self.assertEqual(cpu_allocator.available_count, 1)
+
+    async def test_allocate_across_nodes(self):
+        """Test allocating more CPUs than any NUMA node has free."""
+        # Arrange.
+        cpu_allocator = CpuAllocator(nodes=[[0, 1], [2, 3, 4]])
+
+        # Act.
+        cpus = await cpu_allocator.allocate(4)
+
+        # Assert.
+        self.assertEqual(cpus, [0, 2, 3, 4])
+
+    async def test_allocate_wait(self):
+        """Test waiting for CPUs to be released."""
+        # Arrange.
+        cpu_allocator = CpuAllocator(nodes=[[0, 1]])
+        cpus = await cpu_allocator.allocate(2)
+        allocate_task = asyncio.ensure_future(cpu_allocator.allocate(1))
+        await asyncio.sleep(0.01)
+
+        # Act.
+        done_before_release = allocate_task.done()
+        await cpu_allocator.release(cpus)
+        other_cpus = await asyncio.wait_for(allocate_task, timeout=1)
+
+        # Assert.
+        self.assertFalse(done_before_release)
+        self.assertEqual(other_cpus, [0])
+
+    async def test_reserve(self):
+        """Test reserving CPUs allocated before a restart."""
+        # Arrange.
+        cpu_allocator = CpuAllocator(nodes=[[0, 1, 2]])
+
+        # Act.
+        await cpu_allocator.reserve([1])
+        cpus = await cpu_allocator.allocate(2)
+
+        # Assert.
+        self.assertEqual(cpus, [0, 2])
+
+    async def test_allocate_too_many(self):
+        """Test allocating more CPUs than the allocator manages."""
+        # Arrange.
+        cpu_allocator = CpuAllocator(nodes=[[0, 1]])
+
+        # Act & Assert.
+        with self.assertRaises(ValueError):
+            await cpu_allocator.allocate(3)
+
+
+class TestCpuList(unittest.TestCase):
+    """Tests for the CPU list functions."""
+
+    def test_format_cpu_list(self):
+        """Test formatting CPUs as a CPU list."""
+        # Act.
+        cpu_list = format_cpu_list([8, 0, 1, 2, 3, 10])
+
+        # Assert.
+        self.assertEqual(cpu_list, "0-3,8,10")
+
+    def test_parse_cpu_list(self):
+        """Test parsing a CPU list from sysfs."""
+        # Act.
+        cpus = parse_cpu_list("0-3,8\n")
+
+        # Assert.
+        self.assertEqual(cpus, [0, 1, 2, 3, 8])
+
+    def test_split_cpus(self):
+        """Test splitting CPUs between containers."""
+        # Act.
+        parts = split_cpus([0, 1, 2, 3, 4], [1, 2, 2])
+
+        # Assert.
+        self.assertEqual(parts, [[0], [1, 2], [3, 4]])
@@ -0,0 +1,91 @@
+"""Tests for the data_layout module."""
+
+import asyncio
+import shutil
+import unittest
+from pathlib import Path
+
+import saiblo_worker.data_layout as data_layout
+import saiblo_worker.path_manager as path_manager
+
+
+class TestDataLayout(unittest.IsolatedAsyncioTestCase):
+    """Tests for the data_layout module functions."""
+
+    def setUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def test_migrate_to_sharded_layout(self):
+        """Test moving flat agent code, replays and stderr outputs into shards."""
+        # Arrange.
+        flat_paths = [
+            Path("data/agent_code/code_id.tar"),
+            Path("data/match_replays/match_id.dat"),
+            Path("data/match_stderr/match_id/game-host.log"),
+        ]
+        for path in flat_paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"data")
+
+        # Act.
+        data_layout.migrate_to_sharded_layout()
+
+        # Assert.
+        for path in flat_paths:
+            self.assertFalse(path.exists())
+        self.assertEqual(
+            path_manager.get_agent_code_tarball_path("code_id").read_bytes(), b"data"
+        )
+        self.assertEqual(
+            path_manager.get_match_replay_path("match_id").read_bytes(), b"data"
+        )
+        self.assertEqual(
+            path_manager.get_match_stderr_path("match_id", "game-host").read_bytes(),
+            b"data",
+        )
+
+    def test_migrate_to_sharded_layout_already_sharded(self):
+        """Test leaving entries already in shards as is."""
+        # Arrange.
+        path = path_manager.get_match_stderr_path("match_id", "game-host")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"data")
+
+        # Act.
+        data_layout.migrate_to_sharded_layout()
+
+        # Assert.
+        self.assertEqual(path.read_bytes(), b"data")
+
+    async def test_remove_in_background(self):
+        """Test removing a directory in the background."""
+        # Arrange.
+        path = path_manager.get_match_stderr_path("match_id", "game-host")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"data")
+
+        # Act.
+        data_layout.remove_in_background(path.parent)
+        removed_at_once = not path.parent.exists()
+        await asyncio.sleep(0.1)
+
+        # Assert.
+        self.assertTrue(removed_at_once)
+        self.assertEqual(list(path_manager.get_trash_dir_path().iterdir()), [])
+
+    async def test_empty_trash_in_background(self):
+        """Test removing entries left in the trash directory."""
+        # Arrange.
+        path = path_manager.get_trash_dir_path() / "entry"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"data")
+
+        # Act.
+        data_layout.empty_trash_in_background()
+        await asyncio.sleep(0.1)
+
+        # Assert.
+        self.assertFalse(path.exists())
@@ -0,0 +1,185 @@
+"""Tests for the docker_event_monitor module."""
+
+import asyncio
+import queue
+import unittest
+from typing import Any, Dict, Optional
+from unittest.mock import MagicMock
+
+from saiblo_worker.async_docker_client import AsyncDockerClient
+from saiblo_worker.docker_event_monitor import ContainerExit, DockerEventMonitor
+
+
+class _EventStream:
+    """A fake stream of decoded Docker events."""
+
+    _events: queue.Queue
+
+    def __init__(self):
+        self._events = queue.Queue()
+
+    def __iter__(self):
+        while True:
+            event: Optional[Dict[str, Any]] = self._events.get()
+
+            if event is None:
+                return
+
+            yield event
+
+    def close(self) -> None:
+        """Ends the stream."""
+
+        self._events.put(None)
+
+    def put(self, action: str, container_id: str, exit_code: int = 0) -> None:
+        """Puts an event into the stream.
+
+        Args:
+            action: The action of the event
+            container_id: The ID of the container
+            exit_code: The exit code of the container
+        """
+
+        self._events.put(
+            {
+                "Action": action,
+                "Actor": {
+                    "ID": container_id,
+                    "Attributes": {"exitCode": str(exit_code)},
+                },
+            }
+        )
+
+
+def _make_container(container_id: str) -> MagicMock:
+    """Makes a fake container.
+
+    Args:
+        container_id: The ID of the container
+
+    Returns:
+        The fake container
+    """
+
+    container = MagicMock()
+    container.id = container_id
+
+    return container
+
+
+class TestDockerEventMonitor(unittest.IsolatedAsyncioTestCase):
+    """Tests for the DockerEventMonitor class."""
+
+    _docker_client: AsyncDockerClient
+    _stream: _EventStream
+
+    async def asyncSetUp(self) -> None:
+        self._stream = _EventStream()
+
+        client = MagicMock()
+        client.events.return_value = self._stream
+
+        self._docker_client = AsyncDockerClient(client_factory=lambda: client)
+
+    async def asyncTearDown(self) -> None:
+        await self._docker_client.close()
+
+    async def test_wait(self):
+        """Test wait() returns the exit of the container."""
+        # Arrange.
+        monitor = DockerEventMonitor(self._docker_client, labels=["key=value"])
+        await monitor.start()
+        wait_task = asyncio.ensure_future(monitor.wait(_make_container("a")))
+        await asyncio.sleep(0)
+
+        # Act.
+        self._stream.put("die", "b", exit_code=2)
+        self._stream.put("die", "a", exit_code=1)
+        container_exit = await asyncio.wait_for(wait_task, timeout=1)
+
+        # Assert.
+        self.assertEqual(container_exit, ContainerExit(exit_code=1, oom_killed=False))
+
+        await monitor.close()
+
+    async def test_wait_after_exit(self):
+        """Test wait() when the container has exited before waiting."""
+        # Arrange.
+        monitor = DockerEventMonitor(self._docker_client, labels=["key=value"])
+        await monitor.start()
+        self._stream.put("oom", "a")
+        self._stream.put("die", "a", exit_code=137)
+        await asyncio.sleep(0.1)
+
+        # Act.
+        container_exit = await asyncio.wait_for(
+            monitor.wait(_make_container("a")), timeout=1
+        )
+
+        # Assert.
+        self.assertEqual(container_exit, ContainerExit(exit_code=137, oom_killed=True))
+
+        await monitor.close()
+
+    async def test_record_exited(self):
+        """Test wait() for a container recorded as exited from its state."""
+        # Arrange.
+        monitor = DockerEventMonitor(self._docker_client, labels=["key=value"])
+        await monitor.start()
+        container = _make_container("a")
+        container.attrs = {
+            "State": {"Status": "exited", "ExitCode": 3, "OOMKilled": False}
+        }
+
+        # Act.
+        monitor.record_exited(container)
+        container_exit = await asyncio.wait_for(monitor.wait(container), timeout=1)
+
+        # Assert.
+        self.assertEqual(container_exit, ContainerExit(exit_code=3, oom_killed=False))
+
+        await monitor.close()
+
+    async def test_get_exit(self):
+        """Test get_exit() before and after the container exits."""
+        # Arrange.
+        monitor = DockerEventMonitor(self._docker_client, labels=["key=value"])
+        await monitor.start()
+        container = _make_container("a")
+
+        # Act.
+        running_exit = monitor.get_exit(container)
+        container.attrs = {
+            "State": {"Status": "exited", "ExitCode": 3, "OOMKilled": False}
+        }
+        monitor.record_exited(container)
+        exited_exit = monitor.get_exit(container)
+
+        # Assert.
+        self.assertIsNone(running_exit)
+        self.assertEqual(exited_exit, ContainerExit(exit_code=3, oom_killed=False))
+
+        await monitor.close()
+
+    async def test_wait_many(self):
+        """Test waiting for many containers at once."""
+        # Arrange.
+        monitor = DockerEventMonitor(self._docker_client, labels=["key=value"])
+        await monitor.start()
+        wait_tasks = [
+            asyncio.ensure_future(monitor.wait(_make_container(str(i))))
+            for i in range(256)
+        ]
+        await asyncio.sleep(0)
+
+        # Act.
+        for i in range(256):
+            self._stream.put("die", str(i), exit_code=i)
+
+        container_exits = await asyncio.wait_for(asyncio.gather(*wait_tasks), timeout=5)
+
+        # Assert.
+        self.assertEqual([e.exit_code for e in container_exits], list(range(256)))
+
+        await monitor.close()
@@ -0,0 +1,35 @@
+"""Tests for the end-to-end benchmark."""
+
+import unittest
+
+from benchmarks.end_to_end import parse_args, run_benchmark
+
+
+class TestEndToEndBenchmark(unittest.IsolatedAsyncioTestCase):
+    """Tests for the end_to_end benchmark module."""
+
+    async def test_run_benchmark(self):
+        """Test running a short benchmark with builds and matches."""
+        # Arrange.
+        args = parse_args(
+            [
+                "--matches=3",
+                "--builds=2",
+                "--game-duration=0.1",
+                "--image-build-latency=0.01",
+                "--replay-size=1024",
+                "--timeout=60",
+            ]
+        )
+
+        # Act.
+        report = await run_benchmark(args)
+
+        # Assert.
+        self.assertEqual(report["matches"], 3)
+        self.assertEqual(report["builds"], 2)
+        self.assertEqual(report["failed_matches"], 0)
+        self.assertEqual(report["replay_bytes"], 3 * 1024)
+        self.assertEqual(report["phase_latencies_seconds"]["match_run"]["count"], 3)
+        self.assertGreater(report["matches_per_minute"], 0)
+        self.assertGreater(report["peak_rss_bytes"], 0)
@@ -0,0 +1,75 @@
+"""Tests for event_loop_watchdog module."""
+
+import asyncio
+import time
+import unittest
+
+import saiblo_worker.metrics as metrics
+from saiblo_worker.event_loop_watchdog import EventLoopWatchdog
+
+
+def _block_event_loop(duration: float) -> None:
+    time.sleep(duration)
+
+
+class TestEventLoopWatchdog(unittest.IsolatedAsyncioTestCase):
+    """Tests for EventLoopWatchdog class."""
+
+    async def test_start_blocked(self):
+        """Test start() when the event loop is blocked."""
+        # Arrange.
+        watchdog = EventLoopWatchdog(interval=0.05, threshold=0.2)
+        stalls = metrics.EVENT_LOOP_STALLS.get()
+        watchdog_task = asyncio.create_task(watchdog.start())
+        await asyncio.sleep(0.1)
+
+        # Act.
+        with self.assertLogs(level="WARNING") as logs:
+            _block_event_loop(0.5)
+            await asyncio.sleep(0.1)
+
+        watchdog_task.cancel()
+
+        # Assert.
+        self.assertTrue(
+            any(
+                "Event loop blocked" in output and "_block_event_loop" in output
+                for output in logs.output
+            )
+        )
+        self.assertTrue(any("Event loop lagged" in output for output in logs.output))
+        self.assertEqual(metrics.EVENT_LOOP_STALLS.get(), stalls + 1)
+
+    async def test_start_debug(self):
+        """Test start() in debug mode."""
+        # Arrange.
+        watchdog = EventLoopWatchdog(debug=True, threshold=0.2)
+
+        # Act.
+        watchdog_task = asyncio.create_task(watchdog.start())
+        await asyncio.sleep(0.1)
+        watchdog_task.cancel()
+
+        # Assert.
+        loop = asyncio.get_running_loop()
+        self.assertTrue(loop.get_debug())
+        self.assertEqual(loop.slow_callback_duration, 0.2)
+
+    async def test_start_not_blocked(self):
+        """Test start() when the event loop is not blocked."""
+        # Arrange.
+        watchdog = EventLoopWatchdog(interval=0.05, threshold=0.2)
+        lag_count = metrics.EVENT_LOOP_LAG.get_count()
+
+        # Act.
+        with self.assertNoLogs(level="WARNING"):
+            watchdog_task = asyncio.create_task(watchdog.start())
+            await asyncio.sleep(0.3)
+            watchdog_task.cancel()
+
+        # Assert.
+        self.assertGreater(metrics.EVENT_LOOP_LAG.get_count(), lag_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
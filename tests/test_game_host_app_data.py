@@ -0,0 +1,228 @@
+"""Tests for the game_host_app_data module."""
+
+import gzip
+import io
+import json
+import shutil
+import tarfile
+from pathlib import Path
+from typing import Dict, List
+from unittest import TestCase
+
+from saiblo_worker.game_host_app_data import (
+    check_dir_size,
+    collect_game_host_app_data,
+    extract_game_host_app_data,
+    get_dir_size,
+)
+
+
+def _make_tarball_chunks(files: Dict[str, bytes], chunk_size: int) -> List[bytes]:
+    """Makes a tarball like the one returned by get_archive, split into chunks.
+
+    Args:
+        files: The mapping from member names to contents
+        chunk_size: The size of each chunk
+
+    Returns:
+        The chunks of the tarball
+    """
+
+    tarball_bytesio = io.BytesIO()
+
+    with tarfile.open(fileobj=tarball_bytesio, mode="w") as tar_file:
+        dir_tar_info = tarfile.TarInfo("data")
+        dir_tar_info.type = tarfile.DIRTYPE
+        tar_file.addfile(dir_tar_info)
+
+        for name, data in files.items():
+            tar_info = tarfile.TarInfo(name)
+            tar_info.size = len(data)
+            tar_file.addfile(tar_info, io.BytesIO(data))
+
+    tarball_bytes = tarball_bytesio.getvalue()
+
+    return [
+        tarball_bytes[i : i + chunk_size]
+        for i in range(0, len(tarball_bytes), chunk_size)
+    ]
+
+
+class TestGameHostAppData(TestCase):
+    """Tests for the game_host_app_data module functions."""
+
+    def setUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+        Path("data/match_replays").mkdir(parents=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def test_extract(self):
+        """Test extracting the result and the replay file."""
+        # Arrange.
+        replay_bytes = bytes(range(256)) * 4099
+        chunks = _make_tarball_chunks(
+            {
+                "data/log.txt": b"irrelevant",
+                "data/replay.dat": replay_bytes,
+                "data/result.json": json.dumps({"scores": {"token": 1.5}}).encode(),
+            },
+            chunk_size=1000,
+        )
+        replay_file_path = Path("data/match_replays/match_id.dat")
+
+        # Act.
+        result = extract_game_host_app_data(chunks, replay_file_path)
+
+        # Assert.
+        self.assertEqual(result, {"scores": {"token": 1.5}})
+        self.assertEqual(replay_file_path.read_bytes(), replay_bytes)
+
+    def test_extract_compressed(self):
+        """Test extracting the replay file compressed with gzip."""
+        # Arrange.
+        replay_bytes = bytes(range(256)) * 4099
+        chunks = _make_tarball_chunks(
+            {
+                "data/replay.dat": replay_bytes,
+                "data/result.json": json.dumps({"scores": {}}).encode(),
+            },
+            chunk_size=1000,
+        )
+        replay_file_path = Path("data/match_replays/match_id.dat")
+
+        # Act.
+        extract_game_host_app_data(chunks, replay_file_path, replay_compression_level=1)
+
+        # Assert.
+        self.assertEqual(gzip.decompress(replay_file_path.read_bytes()), replay_bytes)
+
+    def test_extract_no_replay(self):
+        """Test extracting when there is no replay file."""
+        # Arrange.
+        chunks = _make_tarball_chunks(
+            {"data/result.json": json.dumps({"scores": {}}).encode()},
+            chunk_size=1000,
+        )
+
+        # Act & Assert.
+        with self.assertRaises(FileNotFoundError):
+            extract_game_host_app_data(chunks, Path("data/match_replays/match_id.dat"))
+
+    def test_extract_replay_not_file(self):
+        """Test extracting when the replay path is not a regular file."""
+        # Arrange.
+        result_bytes = json.dumps({"scores": {}}).encode()
+        tarball_bytesio = io.BytesIO()
+        with tarfile.open(fileobj=tarball_bytesio, mode="w") as tar_file:
+            replay_tar_info = tarfile.TarInfo("data/replay.dat")
+            replay_tar_info.type = tarfile.DIRTYPE
+            tar_file.addfile(replay_tar_info)
+            result_tar_info = tarfile.TarInfo("data/result.json")
+            result_tar_info.size = len(result_bytes)
+            tar_file.addfile(result_tar_info, io.BytesIO(result_bytes))
+        replay_file_path = Path("data/match_replays/match_id.dat")
+
+        # Act.
+        result = extract_game_host_app_data(
+            [tarball_bytesio.getvalue()], replay_file_path
+        )
+
+        # Assert.
+        self.assertEqual(result, {"scores": {}})
+        self.assertEqual(replay_file_path.read_bytes(), b"")
+
+    def test_extract_no_result(self):
+        """Test extracting when there is no result file."""
+        # Arrange.
+        chunks = _make_tarball_chunks({"data/replay.dat": b"replay"}, chunk_size=1000)
+
+        # Act & Assert.
+        with self.assertRaises(FileNotFoundError):
+            extract_game_host_app_data(chunks, Path("data/match_replays/match_id.dat"))
+
+    def test_collect(self):
+        """Test collecting the result and the replay file from a data directory."""
+        # Arrange.
+        data_dir_path = Path("data/game_host_data/game_host")
+        data_dir_path.mkdir(parents=True)
+        (data_dir_path / "result.json").write_text(
+            json.dumps({"scores": {"token": 1.5}}), encoding="utf-8"
+        )
+        (data_dir_path / "replay.dat").write_bytes(b"replay")
+        replay_file_path = Path("data/match_replays/match_id.dat")
+
+        # Act.
+        result = collect_game_host_app_data(data_dir_path, replay_file_path)
+
+        # Assert.
+        self.assertEqual(result, {"scores": {"token": 1.5}})
+        self.assertEqual(replay_file_path.read_bytes(), b"replay")
+        self.assertFalse((data_dir_path / "replay.dat").exists())
+
+    def test_collect_symlink(self):
+        """Test collecting when the replay file is a symbolic link."""
+        # Arrange.
+        data_dir_path = Path("data/game_host_data/game_host")
+        data_dir_path.mkdir(parents=True)
+        (data_dir_path / "result.json").write_text(
+            json.dumps({"scores": {}}), encoding="utf-8"
+        )
+        (data_dir_path / "replay.dat").symlink_to(Path("/etc/hostname"))
+
+        # Act & Assert.
+        with self.assertRaises(FileNotFoundError):
+            collect_game_host_app_data(
+                data_dir_path, Path("data/match_replays/match_id.dat")
+            )
+
+    def test_collect_compressed(self):
+        """Test collecting the replay file compressed with gzip."""
+        # Arrange.
+        data_dir_path = Path("data/game_host_data/game_host")
+        data_dir_path.mkdir(parents=True)
+        (data_dir_path / "result.json").write_text(
+            json.dumps({"scores": {}}), encoding="utf-8"
+        )
+        (data_dir_path / "replay.dat").write_bytes(b"replay" * 1000)
+        replay_file_path = Path("data/match_replays/match_id.dat")
+
+        # Act.
+        collect_game_host_app_data(
+            data_dir_path, replay_file_path, replay_compression_level=6
+        )
+
+        # Assert.
+        self.assertEqual(
+            gzip.decompress(replay_file_path.read_bytes()), b"replay" * 1000
+        )
+        self.assertLess(replay_file_path.stat().st_size, 1000)
+        self.assertFalse((data_dir_path / "replay.dat").exists())
+
+    def test_get_dir_size(self):
+        """Test getting the size of a directory."""
+        # Arrange.
+        dir_path = Path("data/game_host_data/game_host")
+        (dir_path / "sub").mkdir(parents=True)
+        (dir_path / "a").write_bytes(b"a" * 10)
+        (dir_path / "sub" / "b").write_bytes(b"b" * 20)
+
+        # Act.
+        size = get_dir_size(dir_path)
+
+        # Assert.
+        self.assertEqual(size, 30)
+
+    def test_check_dir_size_exceeded(self):
+        """Test checking the size of a directory exceeding the limit."""
+        # Arrange.
+        dir_path = Path("data/game_host_data/game_host")
+        dir_path.mkdir(parents=True)
+        (dir_path / "a").write_bytes(b"a" * 10)
+
+        # Act & Assert.
+        check_dir_size(dir_path, 10)
+        with self.assertRaises(ValueError):
+            check_dir_size(dir_path, 9)
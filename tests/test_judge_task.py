@@ -5,11 +5,14 @@
 import pathlib
 import shutil
 import unittest
+from unittest.mock import AsyncMock, MagicMock
 
 import aiohttp
 import docker
 import docker.models.containers
 
+import saiblo_worker.metrics as metrics
+import saiblo_worker.path_manager as path_manager
 from saiblo_worker.agent_code_fetcher import AgentCodeFetcher
 from saiblo_worker.build_result_reporter import BuildResultReporter
 from saiblo_worker.docker_image_builder import DockerImageBuilder
@@ -59,14 +62,14 @@ async def asyncTearDown(self) -> None:
     async def test_execute(self):
         """Test execute()."""
         # Arrange.
-        agent_code_tarball_path = pathlib.Path(f"data/agent_code/{CODE_ID}.tar")
+        agent_code_tarball_path = path_manager.get_agent_code_tarball_path(CODE_ID)
         agent_code_tarball_path.parent.mkdir(parents=True, exist_ok=True)
         agent_code_tarball_path.touch()
 
         image = self._docker_client.images.pull("hello-world")
         image.tag("saiblo-worker-image", CODE_ID)
 
-        match_replay_path = pathlib.Path(f"data/match_replays/{MATCH_ID}.dat")
+        match_replay_path = path_manager.get_match_replay_path(MATCH_ID)
         match_replay_path.parent.mkdir(parents=True, exist_ok=True)
         match_replay_path.touch()
 
@@ -125,3 +128,37 @@ def _clean(self) -> None:
 
         for image in self._docker_client.images.list("saiblo-worker-image"):
             image.remove(force=True)
+
+
+class TestJudgeTaskBuildCache(unittest.IsolatedAsyncioTestCase):
+    """Tests for the build cache lookups of the JudgeTask class."""
+
+    async def test_execute_cache_hit(self):
+        """Test execute() counting the agents found built as cache hits."""
+        # Arrange.
+        builder = MagicMock()
+        builder.list = AsyncMock(return_value={CODE_ID: f"image:{CODE_ID}"})
+        builder.build = AsyncMock()
+        judger = MagicMock()
+        judger.judge = AsyncMock()
+        match_result_reporter = MagicMock()
+        match_result_reporter.report = AsyncMock()
+        judge_task = JudgeTaskFactory(
+            "game_host",
+            MagicMock(),
+            builder,
+            MagicMock(),
+            judger,
+            match_result_reporter,
+        ).create(MATCH_ID, [CODE_ID, CODE_ID])
+        hits = metrics.BUILD_CACHE_LOOKUPS.get(result="hit")
+
+        # Act.
+        await judge_task.execute()
+
+        # Assert.
+        self.assertEqual(metrics.BUILD_CACHE_LOOKUPS.get(result="hit"), hits + 2)
+        builder.build.assert_not_awaited()
+        judger.judge.assert_awaited_once_with(
+            MATCH_ID, "game_host", [f"image:{CODE_ID}", f"image:{CODE_ID}"]
+        )
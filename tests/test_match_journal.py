@@ -0,0 +1,89 @@
+"""Tests for the match_journal module."""
+
+import shutil
+import unittest
+from pathlib import Path
+
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.match_journal import (
+    MatchJournalEntry,
+    list_match_journal_entries,
+    remove_match_journal_entry,
+    write_match_journal_entry,
+)
+
+
+def _make_entry(match_id: str) -> MatchJournalEntry:
+    """Makes a journal entry of a match with a provided and a missing agent.
+
+    Args:
+        match_id: The ID of the match
+
+    Returns:
+        The journal entry
+    """
+
+    return MatchJournalEntry(
+        match_id=match_id,
+        agents=[
+            MatchJournalEntry.Agent(
+                container_name="agent",
+                image="image",
+                network_name="network",
+                token="token",
+                cpuset_cpus="1",
+            ),
+            None,
+        ],
+        game_host_container_name="game-host",
+        game_host_image="game-host-image",
+        started_at=1.5,
+        cpus=[0, 1],
+        game_host_data_dir_path="data/game_host_data/game-host",
+    )
+
+
+class TestMatchJournal(unittest.TestCase):
+    """Tests for the match_journal module functions."""
+
+    def setUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def test_write_and_list(self):
+        """Test listing written journal entries."""
+        # Arrange.
+        entry = _make_entry("match_id")
+
+        # Act.
+        write_match_journal_entry(entry)
+        entries = list_match_journal_entries()
+
+        # Assert.
+        self.assertEqual(entries, {"match_id": entry})
+
+    def test_list_unreadable(self):
+        """Test listing journal entries when one of them is unreadable."""
+        # Arrange.
+        write_match_journal_entry(_make_entry("match_id"))
+        path_manager.get_match_journal_path("broken").write_text("{", encoding="utf-8")
+
+        # Act.
+        entries = list_match_journal_entries()
+
+        # Assert.
+        self.assertEqual(list(entries), ["match_id"])
+
+    def test_remove(self):
+        """Test removing a journal entry, twice."""
+        # Arrange.
+        write_match_journal_entry(_make_entry("match_id"))
+
+        # Act.
+        remove_match_journal_entry("match_id")
+        remove_match_journal_entry("match_id")
+
+        # Assert.
+        self.assertEqual(list_match_journal_entries(), {})
@@ -1,16 +1,29 @@
 """Tests for the match_judger module."""
 
+import asyncio
 import dataclasses
 import json
 import pathlib
 import shutil
 import tempfile
+import time
 import unittest
+from typing import Any, Dict, List, Literal
+from unittest.mock import AsyncMock, MagicMock
 
 import docker
+import docker.errors
 import docker.models.containers
 
-from saiblo_worker.match_judger import MatchJudger
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.async_docker_client import AsyncDockerClient
+from saiblo_worker.docker_event_monitor import ContainerExit
+from saiblo_worker.match_journal import (
+    MatchJournalEntry,
+    list_match_journal_entries,
+    write_match_journal_entry,
+)
+from saiblo_worker.match_judger import MatchJudger, _gather_all, _MatchResources
 from saiblo_worker.match_result import MatchResult
 
 
@@ -33,14 +46,22 @@ async def test_clean_everything(self):
         """Test clean() when there is everything to clean."""
         # Arrange.
         self._docker_client.containers.run(
-            "hello-world", detach=True, name="saiblo-worker-agent-0"
+            "hello-world",
+            detach=True,
+            labels={"saiblo-worker.worker": "worker"},
+            name="saiblo-worker-agent-0",
         )
         self._docker_client.containers.run(
-            "hello-world", detach=True, name="saiblo-worker-game-host-0"
+            "hello-world",
+            detach=True,
+            labels={"saiblo-worker.worker": "worker"},
+            name="saiblo-worker-game-host-0",
+        )
+        self._docker_client.networks.create(
+            "saiblo-worker-network-0", labels={"saiblo-worker.worker": "worker"}
         )
-        self._docker_client.networks.create("saiblo-worker-network-0")
 
-        replay_file_path = pathlib.Path("data/match_replays/code_id.dat")
+        replay_file_path = path_manager.get_match_replay_path("code_id")
         replay_file_path.parent.mkdir(parents=True, exist_ok=True)
         replay_file_path.touch()
 
@@ -54,6 +75,7 @@ async def test_clean_everything(self):
             game_host_mem_limit="1g",
             game_host_cpus=1,
             judge_timeout=60,
+            name="worker",
         )
 
         # Act.
@@ -62,6 +84,18 @@ async def test_clean_everything(self):
         # Assert.
         self.assertFalse(replay_file_path.exists())
         self.assertFalse(result_file_path.exists())
+        self.assertFalse(
+            any(
+                container.name.startswith("saiblo-worker-")
+                for container in self._docker_client.containers.list(all=True)
+            )
+        )
+        self.assertFalse(
+            any(
+                network.name == "saiblo-worker-network-0"
+                for network in self._docker_client.networks.list()
+            )
+        )
 
     async def test_clean_nothing(self):
         """Test clean() when there is nothing to clean."""
@@ -194,7 +228,9 @@ async def test_judge_agent_still_running(self):
         self.assertEqual(len(result.agent_results), 1)
         self.assertEqual(result.agent_results[0].exit_code, 0)
         self.assertEqual(result.error_message, "")
-        self.assertEqual(result.replay_file_path, "data/match_replays/match_id.dat")
+        self.assertEqual(
+            result.replay_file_path, str(path_manager.get_match_replay_path("match_id"))
+        )
 
     async def test_judge_normal(self):
         """Test judge() when everything is normal."""
@@ -232,7 +268,10 @@ async def test_judge_normal(self):
         # Assert.
         self.assertEqual(result.match_id, "match_id")
         self.assertEqual(
-            result.agent_results,
+            [
+                dataclasses.replace(agent_result, resource_usage=None)
+                for agent_result in result.agent_results
+            ],
             [
                 MatchResult.AgentResult(
                     exit_code=0, score=0.0, status="OK", stderr_output=""
@@ -242,14 +281,66 @@ async def test_judge_normal(self):
                 ),
             ],
         )
+        self.assertIsNone(result.agent_results[1].resource_usage)
         self.assertEqual(result.error_message, "")
-        self.assertEqual(result.replay_file_path, "data/match_replays/match_id.dat")
+        self.assertEqual(
+            result.replay_file_path, str(path_manager.get_match_replay_path("match_id"))
+        )
         self.assertEqual(result.stderr_output, "")
 
+    async def test_judge_pooled(self):
+        """Test judge() when the game host container and networks come from pools."""
+        # Arrange.
+
+        # Build the game host image.
+        with tempfile.TemporaryDirectory("w") as dir_path:
+            with open(f"{dir_path}/Dockerfile", "wb") as file:
+                file.write(
+                    b"FROM hello-world\nCOPY result.json /app/data/result.json\n"
+                    b"COPY replay.dat /app/data/replay.dat\n"
+                )
+            with open(f"{dir_path}/result.json", "w", encoding="utf-8") as file:
+                json.dump({"scores": {}}, file)
+            with open(f"{dir_path}/replay.dat", "wb") as file:
+                file.write(b"")
+            self._docker_client.images.build(
+                path=dir_path,
+                tag="saiblo-worker-test",
+            )
+
+        match_judger = MatchJudger(
+            agent_mem_limit="1g",
+            agent_cpus=1,
+            game_host_mem_limit="1g",
+            game_host_cpus=1,
+            judge_timeout=60,
+            game_host_pool_size=1,
+            network_pool_size=2,
+        )
+        await match_judger.judge("match_id_0", "saiblo-worker-test", ["hello-world"])
+        await match_judger._resource_pool.replenishment_task  # pylint: disable=protected-access
+
+        # Act.
+        result = await match_judger.judge(
+            "match_id_1", "saiblo-worker-test", ["hello-world", "hello-world"]
+        )
+
+        # Assert.
+        self.assertEqual(result.match_id, "match_id_1")
+        self.assertEqual(
+            [agent_result.status for agent_result in result.agent_results],
+            ["OK", "OK"],
+        )
+        self.assertEqual(result.error_message, "")
+        self.assertEqual(
+            result.replay_file_path,
+            str(path_manager.get_match_replay_path("match_id_1")),
+        )
+
     async def test_judge_result_exists(self):
         """Test judge() when the result already exists."""
         # Arrange.
-        match_replay_path = pathlib.Path("data/match_replays/match_id.dat")
+        match_replay_path = path_manager.get_match_replay_path("match_id")
         match_replay_path.parent.mkdir(parents=True, exist_ok=True)
         match_replay_path.touch()
 
@@ -344,3 +435,607 @@ def _clean(self) -> None:
                 tag.startswith("saiblo-worker-") for tag in image.tags
             ):
                 image.remove(force=True)
+
+
+class TestMatchJudgerEarlyTermination(unittest.IsolatedAsyncioTestCase):
+    """Tests for the early termination of matches by the MatchJudger class."""
+
+    _agent_supervisors: List[MagicMock]
+    _docker_client: AsyncDockerClient
+    _game_host_exit: asyncio.Future
+
+    async def asyncSetUp(self) -> None:
+        self._docker_client = AsyncDockerClient(client_factory=MagicMock)
+
+        self._agent_supervisors = [MagicMock() for _ in range(2)]
+        for supervisor in self._agent_supervisors:
+            supervisor.exit_task = asyncio.get_running_loop().create_future()
+
+        self._game_host_exit = asyncio.get_running_loop().create_future()
+
+    async def asyncTearDown(self) -> None:
+        await self._docker_client.close()
+
+    async def test_wait_all(self):
+        """Test waiting for the game host with a quorum of all agents."""
+        # Arrange.
+        match_judger = self._make_match_judger("all", grace_period=0)
+        self._exit_agent(0)
+
+        # Act.
+        with self.assertLogs(level="ERROR"), self.assertRaises(TimeoutError):
+            await self._wait(match_judger, timeout=0.1)
+
+        self._exit_agent(1)
+
+        with self.assertLogs(level="INFO") as logs:
+            await self._wait(match_judger, timeout=1)
+
+        # Assert.
+        self.assertTrue(any("early" in output for output in logs.output))
+
+    async def test_wait_cancelled(self):
+        """Test cancelling the wait for the game host cancels all the waiting tasks."""
+        # Arrange.
+        match_judger = self._make_match_judger("all", grace_period=0)
+        tasks = asyncio.all_tasks()
+        wait_task = asyncio.create_task(self._wait(match_judger, timeout=10))
+        await asyncio.sleep(0.05)
+
+        # Act.
+        wait_task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await wait_task
+        await asyncio.sleep(0)
+
+        # Assert.
+        self.assertEqual(asyncio.all_tasks(), tasks)
+
+    async def test_wait_grace_period_expired(self):
+        """Test waiting for the game host not finishing within the grace period."""
+        # Arrange.
+        match_judger = self._make_match_judger(1, grace_period=0.05)
+        self._exit_agent(0)
+        start_time = time.monotonic()
+
+        # Act.
+        with self.assertLogs(level="INFO") as logs:
+            await self._wait(match_judger, timeout=1)
+
+        # Assert.
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.05)
+        self.assertLess(time.monotonic() - start_time, 1)
+        self.assertTrue(any("early" in output for output in logs.output))
+        self.assertFalse(self._game_host_exit.done())
+
+    async def test_wait_quorum(self):
+        """Test waiting for the game host finishing within the grace period."""
+        # Arrange.
+        match_judger = self._make_match_judger(1, grace_period=1)
+        self._exit_agent(0)
+        asyncio.get_running_loop().call_later(
+            0.05,
+            self._game_host_exit.set_result,
+            ContainerExit(exit_code=0, oom_killed=False),
+        )
+
+        # Act.
+        with self.assertNoLogs(level="INFO"):
+            await self._wait(match_judger, timeout=2)
+
+        # Assert.
+        self.assertTrue(self._game_host_exit.done())
+
+    def _exit_agent(self, index: int) -> None:
+        """Makes an agent container exit.
+
+        Args:
+            index: The index of the agent
+        """
+
+        self._agent_supervisors[index].exit_task.set_result(
+            ContainerExit(exit_code=0, oom_killed=False)
+        )
+
+    def _make_match_judger(
+        self, quorum: int | Literal["all"], *, grace_period: float
+    ) -> MatchJudger:
+        """Makes a match judger waiting for containers through a fake event monitor.
+
+        Args:
+            quorum: The early termination quorum
+            grace_period: The early termination grace period in seconds
+
+        Returns:
+            The match judger
+        """
+
+        async def wait(_):
+            return await asyncio.shield(self._game_host_exit)
+
+        match_judger = MatchJudger(
+            agent_cpus=1,
+            agent_mem_limit="1g",
+            game_host_cpus=1,
+            game_host_mem_limit="1g",
+            judge_timeout=60,
+            docker_client=self._docker_client,
+            early_termination_grace_period=grace_period,
+            early_termination_quorum=quorum,
+        )
+        event_monitor = MagicMock()
+        event_monitor.get_exit.return_value = None
+        event_monitor.wait.side_effect = wait
+        match_judger._event_monitor = event_monitor  # pylint: disable=protected-access
+
+        return match_judger
+
+    async def _wait(self, match_judger: MatchJudger, *, timeout: float) -> None:
+        """Waits for the game host container of a match.
+
+        Args:
+            match_judger: The match judger
+            timeout: The time left until the judge timeout in seconds
+        """
+
+        # pylint: disable-next=protected-access
+        await match_judger._wait_game_host_container(
+            MagicMock(),
+            self._agent_supervisors,
+            _MatchResources(match_id="match_id"),  # pylint: disable=protected-access
+            timeout=timeout,
+        )
+
+
+class TestGatherAll(unittest.IsolatedAsyncioTestCase):
+    """Tests for the _gather_all function."""
+
+    async def test_partial_failure(self):
+        """Test running awaitables of which one fails."""
+        # Arrange.
+        finished: List[int] = []
+
+        async def succeed(index: int) -> int:
+            await asyncio.sleep(0.01 * index)
+            finished.append(index)
+
+            return index
+
+        async def fail() -> None:
+            raise RuntimeError("failed")
+
+        # Act.
+        with self.assertRaisesRegex(RuntimeError, "failed"):
+            await _gather_all(succeed(1), fail(), succeed(2))
+
+        # Assert.
+        self.assertEqual(finished, [1, 2])
+
+
+class TestMatchJudgerFailure(unittest.IsolatedAsyncioTestCase):
+    """Tests for the cleanup of failed matches by the MatchJudger class."""
+
+    _client: MagicMock
+    _docker_client: AsyncDockerClient
+
+    async def asyncSetUp(self) -> None:
+        shutil.rmtree(pathlib.Path("data"), ignore_errors=True)
+
+        self._client = MagicMock()
+        self._client.containers.list.return_value = []
+        self._client.networks.list.return_value = []
+        self._docker_client = AsyncDockerClient(client_factory=lambda: self._client)
+
+    async def asyncTearDown(self) -> None:
+        await self._docker_client.close()
+
+        shutil.rmtree(pathlib.Path("data"), ignore_errors=True)
+
+    async def test_judge_agent_container_creation_failed(self):
+        """Test judge() when running one of the agent containers fails."""
+        # Arrange.
+        game_host_container = MagicMock()
+        game_host_container.id = "game_host_id"
+        self._client.containers.create.return_value = game_host_container
+        agent_containers: List[MagicMock] = []
+
+        def run_container(_: str, *, name: str, **__: Any) -> MagicMock:
+            if name.endswith("-1"):
+                raise docker.errors.APIError("container creation failed")
+
+            agent_container = MagicMock()
+            agent_container.id = f"{name}_id"
+            agent_containers.append(agent_container)
+
+            return agent_container
+
+        self._client.containers.run.side_effect = run_container
+        match_judger = self._make_match_judger()
+        event_monitor = MagicMock()
+        event_monitor.start = AsyncMock()
+        match_judger._event_monitor = event_monitor  # pylint: disable=protected-access
+
+        # Act.
+        with self.assertLogs(level="ERROR"):
+            result = await match_judger.judge(
+                "match_id", "game_host", ["agent", "agent", "agent"]
+            )
+
+        # Assert.
+        self.assertIn("container creation failed", result.error_message)
+        self.assertEqual(len(agent_containers), 2)
+        for agent_container in [game_host_container] + agent_containers:
+            agent_container.remove.assert_called_once_with(v=True, force=True)
+
+    async def test_judge_network_creation_failed(self):
+        """Test judge() when creating one of the agent networks fails."""
+        # Arrange.
+        game_host_container = MagicMock()
+        game_host_container.id = "game_host_id"
+        self._client.containers.create.return_value = game_host_container
+        networks: List[MagicMock] = []
+
+        def create_network(name: str, **_: Any) -> MagicMock:
+            if name.endswith("-1"):
+                raise docker.errors.APIError("network creation failed")
+
+            network = MagicMock()
+            network.id = f"{name}_id"
+            networks.append(network)
+
+            return network
+
+        self._client.networks.create.side_effect = create_network
+        match_judger = self._make_match_judger()
+        event_monitor = MagicMock()
+        event_monitor.start = AsyncMock()
+        match_judger._event_monitor = event_monitor  # pylint: disable=protected-access
+
+        # Act.
+        with self.assertLogs(level="ERROR"):
+            result = await match_judger.judge(
+                "match_id", "game_host", ["agent", "agent", "agent"]
+            )
+
+        # Assert.
+        self.assertIn("network creation failed", result.error_message)
+        game_host_container.logs.assert_called_once_with(
+            stdout=False, stderr=True, stream=True, follow=False
+        )
+        self.assertEqual([agent.status for agent in result.agent_results], ["UE"] * 3)
+        self.assertEqual(len(networks), 2)
+        for network in networks:
+            network.remove.assert_called_once_with()
+        game_host_container.remove.assert_called_once_with(v=True, force=True)
+        game_host_container.start.assert_not_called()
+
+    async def test_judge_pooled_networks_removed(self):
+        """Test judge() removing the pooled networks taken when the match fails to start."""
+        # Arrange.
+        pooled_network = MagicMock()
+        pooled_network.id = "pooled_network_id"
+        pooled_network.name = "pooled_network"
+        self._client.networks.create.return_value = pooled_network
+        match_judger = self._make_match_judger(network_pool_size=1)
+        match_judger.warm_up()
+        await self._wait_replenishment(match_judger)
+        event_monitor = MagicMock()
+        event_monitor.start = AsyncMock(
+            side_effect=RuntimeError("event monitor failed")
+        )
+        match_judger._event_monitor = event_monitor  # pylint: disable=protected-access
+
+        # Act.
+        with self.assertLogs(level="ERROR"):
+            result = await match_judger.judge("match_id", "game_host", ["agent"])
+
+        await self._wait_replenishment(match_judger)
+
+        # Assert.
+        self.assertEqual(result.error_message, "event monitor failed")
+        pooled_network.remove.assert_called_once_with()
+
+    def _make_match_judger(self, **kwargs: Any) -> MatchJudger:
+        """Makes a match judger with a fake Docker client.
+
+        Args:
+            **kwargs: The other keyword arguments of the match judger
+
+        Returns:
+            The match judger
+        """
+
+        return MatchJudger(
+            agent_cpus=1,
+            agent_mem_limit="1g",
+            game_host_cpus=1,
+            game_host_mem_limit="1g",
+            judge_timeout=60,
+            docker_client=self._docker_client,
+            **kwargs,
+        )
+
+    async def _wait_replenishment(self, match_judger: MatchJudger) -> None:
+        """Waits until the pools of a match judger are replenished.
+
+        Args:
+            match_judger: The match judger
+        """
+
+        # pylint: disable-next=protected-access
+        replenishment_task = match_judger._resource_pool.replenishment_task
+
+        if replenishment_task is not None:
+            await replenishment_task
+
+
+class TestMatchJudgerRecovery(unittest.IsolatedAsyncioTestCase):
+    """Tests for resuming matches after a restart by the MatchJudger class."""
+
+    _client: MagicMock
+    _cpu_allocator: MagicMock
+    _docker_client: AsyncDockerClient
+    _event_monitor: MagicMock
+
+    async def asyncSetUp(self) -> None:
+        shutil.rmtree(pathlib.Path("data"), ignore_errors=True)
+
+        self._client = MagicMock()
+        self._client.containers.list.return_value = [
+            self._make_resource(name)
+            for name in ["game-host-1", "agent-1-0", "game-host-orphan"]
+        ]
+        self._client.networks.list.return_value = [
+            self._make_resource(name) for name in ["network-1-0", "network-orphan"]
+        ]
+        self._docker_client = AsyncDockerClient(client_factory=lambda: self._client)
+
+        self._cpu_allocator = MagicMock()
+        self._cpu_allocator.release = AsyncMock()
+        self._cpu_allocator.reserve = AsyncMock()
+
+        self._event_monitor = MagicMock()
+        self._event_monitor.start = AsyncMock()
+
+    async def asyncTearDown(self) -> None:
+        await self._docker_client.close()
+
+        shutil.rmtree(pathlib.Path("data"), ignore_errors=True)
+
+    async def test_recover(self):
+        """Test recover() keeping the resources of journaled matches and reaping the others."""
+        # Arrange.
+        self._write_journal_entry("1", started_at=time.time())
+        self._write_journal_entry("2", started_at=time.time())
+        match_judger = self._make_match_judger()
+
+        # Act.
+        journal_entries = await match_judger.recover()
+
+        # Assert.
+        self.assertEqual([entry.match_id for entry in journal_entries], ["1"])
+        self.assertEqual(list(list_match_journal_entries()), ["1"])
+        self._cpu_allocator.reserve.assert_awaited_once_with([2, 3])
+        for container in self._client.containers.list.return_value:
+            if container.name == "game-host-orphan":
+                container.remove.assert_called_once_with(v=True, force=True)
+            else:
+                container.remove.assert_not_called()
+        for network in self._client.networks.list.return_value:
+            if network.name == "network-orphan":
+                network.remove.assert_called_once_with()
+            else:
+                network.remove.assert_not_called()
+
+    async def test_judge_resumed_exited_while_down(self):
+        """Test judge() for a resumed match whose game host exited past the timeout while down."""
+        # Arrange.
+        game_host_data_dir_path = path_manager.get_game_host_data_dir_path("1")
+        game_host_data_dir_path.mkdir(parents=True)
+        (game_host_data_dir_path / "result.json").write_text(
+            json.dumps({"scores": {"token": 1.0}}), encoding="utf-8"
+        )
+        (game_host_data_dir_path / "replay.dat").write_bytes(b"replay")
+        self._write_journal_entry(
+            "1",
+            started_at=time.time() - 120,
+            game_host_data_dir_path=str(game_host_data_dir_path),
+        )
+        container_exit = ContainerExit(exit_code=0, oom_killed=False)
+        self._event_monitor.get_exit.return_value = container_exit
+        self._event_monitor.wait = AsyncMock(return_value=container_exit)
+        match_judger = self._make_match_judger()
+        await match_judger.recover()
+
+        # Act.
+        result = await asyncio.wait_for(
+            match_judger.judge("1", "game_host", ["agent"]), timeout=10
+        )
+
+        # Assert.
+        self.assertEqual(result.error_message, "")
+        self.assertEqual(result.agent_results[0].score, 1.0)
+        self.assertEqual(result.agent_results[0].status, "OK")
+        self.assertEqual(list_match_journal_entries(), {})
+
+    async def test_judge_resumed_timeout(self):
+        """Test judge() for a resumed match whose game host is still running past the timeout."""
+        # Arrange.
+        self._write_journal_entry("1", started_at=time.time() - 120)
+
+        async def wait(_: docker.models.containers.Container) -> ContainerExit:
+            return await asyncio.get_running_loop().create_future()
+
+        self._event_monitor.get_exit.return_value = None
+        self._event_monitor.wait.side_effect = wait
+        match_judger = self._make_match_judger()
+        await match_judger.recover()
+
+        # Act.
+        with self.assertLogs(level="ERROR"):
+            result = await asyncio.wait_for(
+                match_judger.judge("1", "game_host", ["agent"]), timeout=10
+            )
+
+        # Assert.
+        self.assertEqual(result.error_message, "Game host timeout")
+        self.assertEqual(list_match_journal_entries(), {})
+
+    def _make_match_judger(self) -> MatchJudger:
+        """Makes a match judger with a fake Docker client and event monitor.
+
+        Returns:
+            The match judger
+        """
+
+        match_judger = MatchJudger(
+            agent_cpus=1,
+            agent_mem_limit="1g",
+            game_host_cpus=1,
+            game_host_mem_limit="1g",
+            judge_timeout=60,
+            cpu_allocator=self._cpu_allocator,
+            docker_client=self._docker_client,
+        )
+        # pylint: disable-next=protected-access
+        match_judger._event_monitor = self._event_monitor
+
+        return match_judger
+
+    def _make_resource(self, name: str) -> MagicMock:
+        """Makes a fake container or network.
+
+        Args:
+            name: The name of the resource
+
+        Returns:
+            The fake resource
+        """
+
+        resource = MagicMock()
+        resource.id = f"{name}_id"
+        resource.name = name
+        resource.logs.return_value = iter([])
+
+        return resource
+
+    def _write_journal_entry(
+        self,
+        match_id: str,
+        *,
+        started_at: float,
+        game_host_data_dir_path: str | None = None,
+    ) -> None:
+        """Writes the journal entry of a match with one agent.
+
+        Args:
+            match_id: The ID of the match
+            started_at: The time the match started, in seconds since the epoch
+            game_host_data_dir_path: The host data directory of the game host
+        """
+
+        write_match_journal_entry(
+            MatchJournalEntry(
+                match_id=match_id,
+                agents=[
+                    MatchJournalEntry.Agent(
+                        container_name=f"agent-{match_id}-0",
+                        image="agent",
+                        network_name=f"network-{match_id}-0",
+                        token="token",
+                    )
+                ],
+                game_host_container_name=f"game-host-{match_id}",
+                game_host_image="game_host",
+                started_at=started_at,
+                cpus=[2, 3],
+                game_host_data_dir_path=game_host_data_dir_path,
+            )
+        )
+
+
+class TestMatchJudgerClean(unittest.IsolatedAsyncioTestCase):
+    """Tests for clean() of the MatchJudger class with a fake Docker client."""
+
+    async def asyncSetUp(self) -> None:
+        shutil.rmtree(pathlib.Path("data"), ignore_errors=True)
+
+    async def asyncTearDown(self) -> None:
+        shutil.rmtree(pathlib.Path("data"), ignore_errors=True)
+
+    async def test_clean_unlabelled_legacy(self):
+        """Test clean() removing unlabelled resources named like those of matches."""
+        # Arrange.
+        labels = {"saiblo-worker.worker": "worker"}
+        containers = {
+            name: self._make_resource(name, {"Config": {"Labels": resource_labels}})
+            for name, resource_labels in [
+                ("saiblo-worker-agent-1-0", None),
+                ("saiblo-worker-game-host-1", {}),
+                ("saiblo-worker-game-host-2", labels),
+                ("saiblo-worker-agent-3-0", {"saiblo-worker.worker": "other"}),
+                ("saiblo-worker-test-0", None),
+            ]
+        }
+        networks = {
+            name: self._make_resource(name, {"Labels": resource_labels})
+            for name, resource_labels in [
+                ("saiblo-worker-network-1-0", None),
+                ("saiblo-worker-test-0", None),
+            ]
+        }
+        client = MagicMock()
+        client.containers.list.side_effect = lambda filters=None, **_: (
+            [containers["saiblo-worker-game-host-2"]]
+            if filters is not None
+            else list(containers.values())
+        )
+        client.networks.list.side_effect = lambda filters=None, **_: (
+            [] if filters is not None else list(networks.values())
+        )
+        docker_client = AsyncDockerClient(client_factory=lambda: client)
+        match_judger = MatchJudger(
+            agent_cpus=1,
+            agent_mem_limit="1g",
+            game_host_cpus=1,
+            game_host_mem_limit="1g",
+            judge_timeout=60,
+            docker_client=docker_client,
+            name="worker",
+        )
+
+        # Act.
+        await match_judger.clean()
+        await docker_client.close()
+
+        # Assert.
+        self.assertEqual(
+            {name for name, container in containers.items() if container.remove.called},
+            {
+                "saiblo-worker-agent-1-0",
+                "saiblo-worker-game-host-1",
+                "saiblo-worker-game-host-2",
+            },
+        )
+        self.assertEqual(
+            {name for name, network in networks.items() if network.remove.called},
+            {"saiblo-worker-network-1-0"},
+        )
+
+    def _make_resource(self, name: str, attrs: Dict[str, Any]) -> MagicMock:
+        """Makes a fake container or network.
+
+        Args:
+            name: The name of the resource
+            attrs: The attributes of the resource
+
+        Returns:
+            The fake resource
+        """
+
+        resource = MagicMock()
+        resource.attrs = attrs
+        resource.id = f"{name}_id"
+        resource.name = name
+
+        return resource
@@ -0,0 +1,77 @@
+"""Tests for the match_resource_pool module."""
+
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from saiblo_worker.match_resource_pool import MatchResourcePool
+
+
+class TestMatchResourcePool(unittest.IsolatedAsyncioTestCase):
+    """Tests for the MatchResourcePool class."""
+
+    async def test_replenish_and_take(self):
+        """Test taking resources after replenishing the pool."""
+        # Arrange.
+        create_game_host_container = AsyncMock(side_effect=lambda _: MagicMock())
+        create_network = AsyncMock(side_effect=MagicMock)
+        pool = MatchResourcePool(
+            create_game_host_container=create_game_host_container,
+            create_network=create_network,
+            game_host_pool_size=1,
+            network_pool_size=2,
+        )
+
+        # Act.
+        pool.schedule_replenishment("image")
+        assert pool.replenishment_task is not None
+        await pool.replenishment_task
+
+        game_host_container = pool.take_game_host_container("image")
+        other_game_host_container = pool.take_game_host_container("other_image")
+        networks = pool.take_networks(3)
+
+        # Assert.
+        self.assertIsNotNone(game_host_container)
+        self.assertIsNone(other_game_host_container)
+        self.assertEqual(len(networks), 2)
+        create_game_host_container.assert_awaited_once_with("image")
+        self.assertEqual(create_network.await_count, 2)
+
+    async def test_replenish_networks_only(self):
+        """Test replenishing the pool without a game host image."""
+        # Arrange.
+        create_game_host_container = AsyncMock(side_effect=lambda _: MagicMock())
+        create_network = AsyncMock(side_effect=MagicMock)
+        pool = MatchResourcePool(
+            create_game_host_container=create_game_host_container,
+            create_network=create_network,
+            game_host_pool_size=1,
+            network_pool_size=2,
+        )
+
+        # Act.
+        pool.schedule_replenishment(None)
+        assert pool.replenishment_task is not None
+        await pool.replenishment_task
+
+        # Assert.
+        self.assertEqual(len(pool.take_networks(3)), 2)
+        create_game_host_container.assert_not_awaited()
+
+    async def test_disabled(self):
+        """Test the pool when both pool sizes are zero."""
+        # Arrange.
+        pool = MatchResourcePool(
+            create_game_host_container=AsyncMock(),
+            create_network=AsyncMock(),
+            game_host_pool_size=0,
+            network_pool_size=0,
+        )
+
+        # Act.
+        pool.schedule_replenishment("image")
+
+        # Assert.
+        self.assertIsNone(pool.replenishment_task)
+        self.assertIsNone(pool.take_game_host_container("image"))
+        self.assertEqual(pool.take_networks(1), [])
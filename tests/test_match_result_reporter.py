@@ -1,10 +1,14 @@
 """Tests for the match_reslt_reporter module."""
 
+import base64
+import gzip
 import pathlib
 import shutil
 import unittest
 
 import aiohttp
+import aiohttp.test_utils
+import aiohttp.web
 
 from saiblo_worker.match_result import MatchResult
 from saiblo_worker.match_result_reporter import MatchResultReporter
@@ -93,3 +97,125 @@ async def test_report_success(self):
 
         # Act.
         await reporter.report(result)
+
+    async def test_report_success_gzip(self):
+        """Test report() decompresses a replay file compressed with gzip while uploading it."""
+        # Arrange.
+        replay_bytes = bytes(range(256)) * 1024
+        path = pathlib.Path(f"data/match_replays/{MATCH_ID}.dat")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(gzip.compress(replay_bytes))
+
+        received_replays = []
+
+        async def handle(request: aiohttp.web.Request) -> aiohttp.web.Response:
+            form = await request.post()
+            received_replays.append((form["file"].filename, form["file"].file.read()))
+
+            return aiohttp.web.Response()
+
+        app = aiohttp.web.Application(client_max_size=1024 * 1024)
+        app.router.add_put(f"/judger/matches/{MATCH_ID}/", handle)
+
+        result = MatchResult(
+            match_id=MATCH_ID,
+            agent_results=[],
+            error_message="",
+            replay_file_path=str(path),
+            stderr_output="",
+            replay_encoding="gzip",
+        )
+
+        async with aiohttp.test_utils.TestServer(app) as server:
+            async with aiohttp.ClientSession(server.make_url("/")) as session:
+                reporter = MatchResultReporter(session)
+
+                # Act.
+                await reporter.report(result)
+
+        # Assert.
+        self.assertEqual(
+            received_replays,
+            [(f"saiblo-worker-replay-{MATCH_ID}.dat", replay_bytes)],
+        )
+
+    async def test_report_server_error(self):
+        """Test report() sends the result once and raises on a server error."""
+        # Arrange.
+        path = pathlib.Path(f"data/match_replays/{MATCH_ID}.dat")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes(range(256)) * 1024)
+
+        received_replays = []
+
+        async def handle(request: aiohttp.web.Request) -> aiohttp.web.Response:
+            form = await request.post()
+            received_replays.append(form["file"].file.read())
+
+            return aiohttp.web.Response(status=503)
+
+        app = aiohttp.web.Application(client_max_size=1024 * 1024)
+        app.router.add_put(f"/judger/matches/{MATCH_ID}/", handle)
+
+        result = MatchResult(
+            match_id=MATCH_ID,
+            agent_results=[
+                MatchResult.AgentResult(
+                    exit_code=0,
+                    score=1,
+                    status="OK",
+                    stderr_output="",
+                ),
+            ],
+            error_message="",
+            replay_file_path=str(path),
+            stderr_output="",
+        )
+
+        async with aiohttp.test_utils.TestServer(app) as server:
+            async with aiohttp.ClientSession(server.make_url("/")) as session:
+                reporter = MatchResultReporter(session)
+
+                # Act.
+                with self.assertRaises(aiohttp.ClientResponseError):
+                    await reporter.report(result)
+
+        # Assert.
+        self.assertEqual(received_replays, [path.read_bytes()])
+
+    async def test_report_failed_stderr_file(self):
+        """Test report() loads stderr outputs stored in files."""
+        # Arrange.
+        path = pathlib.Path(f"data/match_stderr/{MATCH_ID}/game-host.log")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"game host error")
+
+        received_errs = []
+
+        async def handle(request: aiohttp.web.Request) -> aiohttp.web.Response:
+            form = await request.post()
+            received_errs.append(base64.b64decode(form["err"]))
+
+            return aiohttp.web.Response()
+
+        app = aiohttp.web.Application()
+        app.router.add_put(f"/judger/matches/{MATCH_ID}/", handle)
+
+        result = MatchResult(
+            match_id=MATCH_ID,
+            agent_results=[],
+            error_message="error_message",
+            replay_file_path=None,
+            stderr_output="",
+            stderr_file_path=str(path),
+        )
+
+        async with aiohttp.test_utils.TestServer(app) as server:
+            async with aiohttp.ClientSession(server.make_url("/")) as session:
+                reporter = MatchResultReporter(session)
+
+                # Act.
+                await reporter.report(result)
+
+        # Assert.
+        self.assertEqual(received_errs, [b"game host error"])
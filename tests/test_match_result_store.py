@@ -0,0 +1,107 @@
+"""Tests for the match_result_store module."""
+
+import dataclasses
+import json
+import shutil
+import unittest
+from pathlib import Path
+
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.match_result import MatchResult
+from saiblo_worker.match_result_store import MatchResultStore
+
+
+def _make_match_result(match_id: str) -> MatchResult:
+    """Makes a match result.
+
+    Args:
+        match_id: The ID of the match
+
+    Returns:
+        The match result
+    """
+
+    return MatchResult(
+        match_id=match_id,
+        agent_results=[
+            MatchResult.AgentResult(
+                exit_code=0,
+                score=1.0,
+                status="OK",
+                stderr_output="stderr_output",
+            )
+        ],
+        error_message="",
+        replay_file_path=f"data/match_replays/{match_id}.dat",
+        stderr_output="stderr_output",
+        replay_encoding="gzip",
+    )
+
+
+class TestMatchResultStore(unittest.TestCase):
+    """Tests for the MatchResultStore class."""
+
+    _store: MatchResultStore
+
+    def setUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+        self._store = MatchResultStore()
+
+    def tearDown(self) -> None:
+        self._store.close()
+
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def test_put_and_get(self):
+        """Test getting a saved result and a missing one."""
+        # Arrange.
+        match_result = _make_match_result("match_id")
+
+        # Act.
+        self._store.put(match_result)
+
+        # Assert.
+        self.assertEqual(self._store.get("match_id"), match_result)
+        self.assertIsNone(self._store.get("missing"))
+
+    def test_list_paginated(self):
+        """Test listing results page by page."""
+        # Arrange.
+        for match_id in ["3", "1", "2"]:
+            self._store.put(_make_match_result(match_id))
+
+        # Act.
+        first_page = self._store.list(limit=2)
+        second_page = self._store.list(after=first_page[-1].match_id, limit=2)
+
+        # Assert.
+        self.assertEqual([x.match_id for x in first_page], ["1", "2"])
+        self.assertEqual([x.match_id for x in second_page], ["3"])
+
+    def test_import_json_files(self):
+        """Test importing results saved as JSON files."""
+        # Arrange.
+        match_result = _make_match_result("match_id")
+        path = path_manager.get_match_result_path("match_id")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(dataclasses.asdict(match_result)), encoding="utf-8")
+
+        # Act.
+        stored_match_result = self._store.get("match_id")
+
+        # Assert.
+        self.assertEqual(stored_match_result, match_result)
+        self.assertEqual(path_manager.get_match_result_paths(), [])
+
+    def test_clear(self):
+        """Test clearing the store and reopening it."""
+        # Arrange.
+        self._store.put(_make_match_result("match_id"))
+
+        # Act.
+        self._store.clear()
+        self._store.close()
+
+        # Assert.
+        self.assertEqual(self._store.list(), [])
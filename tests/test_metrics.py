@@ -0,0 +1,181 @@
+"""Tests for metrics module."""
+
+import unittest
+
+import aiohttp
+
+import saiblo_worker.metrics as metrics
+
+
+class TestCounter(unittest.TestCase):
+    """Tests for Counter class."""
+
+    _counter: metrics.Counter
+
+    def setUp(self) -> None:
+        self._counter = metrics.Counter("test_tasks_total", "Tasks by type.", ["type"])
+
+    def tearDown(self) -> None:
+        metrics._metrics.remove(self._counter)  # pylint: disable=protected-access
+
+    def test_collect(self):
+        """Test collect()."""
+        # Arrange.
+        self._counter.inc(type="BuildTask")
+        self._counter.inc(2, type='Judge"Task')
+
+        # Act.
+        result = self._counter.collect()
+
+        # Assert.
+        self.assertEqual(
+            result,
+            [
+                "# HELP test_tasks_total Tasks by type.",
+                "# TYPE test_tasks_total counter",
+                'test_tasks_total{type="BuildTask"} 1',
+                'test_tasks_total{type="Judge\\"Task"} 2',
+            ],
+        )
+
+    def test_count_exceptions(self):
+        """Test count_exceptions()."""
+        # Arrange.
+
+        # Act.
+        with self._counter.count_exceptions(type="BuildTask"):
+            pass
+
+        with self.assertRaises(RuntimeError):
+            with self._counter.count_exceptions(type="BuildTask"):
+                raise RuntimeError()
+
+        # Assert.
+        self.assertEqual(self._counter.get(type="BuildTask"), 1)
+
+    def test_inc_negative(self):
+        """Test inc() with a negative amount."""
+        # Arrange.
+
+        # Act & Assert.
+        with self.assertRaises(ValueError):
+            self._counter.inc(-1, type="BuildTask")
+
+    def test_inc_wrong_labels(self):
+        """Test inc() with labels the counter does not have."""
+        # Arrange.
+
+        # Act & Assert.
+        with self.assertRaises(ValueError):
+            self._counter.inc(status="ok")
+
+
+class TestGauge(unittest.TestCase):
+    """Tests for Gauge class."""
+
+    _gauge: metrics.Gauge
+
+    def setUp(self) -> None:
+        self._gauge = metrics.Gauge("test_queue_depth", "Queued tasks.")
+
+    def tearDown(self) -> None:
+        metrics._metrics.remove(self._gauge)  # pylint: disable=protected-access
+
+    def test_set(self):
+        """Test set()."""
+        # Arrange.
+
+        # Act.
+        self._gauge.set(3)
+        self._gauge.set(1.5)
+
+        # Assert.
+        self.assertEqual(self._gauge.get(), 1.5)
+        self.assertEqual(self._gauge.collect()[-1], "test_queue_depth 1.5")
+
+
+class TestHistogram(unittest.TestCase):
+    """Tests for Histogram class."""
+
+    _histogram: metrics.Histogram
+
+    def setUp(self) -> None:
+        self._histogram = metrics.Histogram(
+            "test_duration_seconds", "Durations.", ["status"], buckets=(1, 10)
+        )
+
+    def tearDown(self) -> None:
+        metrics._metrics.remove(self._histogram)  # pylint: disable=protected-access
+
+    def test_observe(self):
+        """Test observe()."""
+        # Arrange.
+
+        # Act.
+        self._histogram.observe(0.5, status="success")
+        self._histogram.observe(5, status="success")
+        self._histogram.observe(50, status="success")
+        result = self._histogram.collect()
+
+        # Assert.
+        self.assertEqual(self._histogram.get_count(status="success"), 3)
+        self.assertEqual(self._histogram.get_sum(status="success"), 55.5)
+        self.assertEqual(self._histogram.get_count(status="failure"), 0)
+        self.assertEqual(
+            result[2:],
+            [
+                'test_duration_seconds_bucket{status="success",le="1"} 1',
+                'test_duration_seconds_bucket{status="success",le="10"} 2',
+                'test_duration_seconds_bucket{status="success",le="+Inf"} 3',
+                'test_duration_seconds_sum{status="success"} 55.5',
+                'test_duration_seconds_count{status="success"} 3',
+            ],
+        )
+
+    def test_time(self):
+        """Test time() when the block raises an exception."""
+        # Arrange.
+
+        # Act.
+        with self.assertRaises(RuntimeError):
+            with self._histogram.time(status="failure"):
+                raise RuntimeError()
+
+        # Assert.
+        self.assertEqual(self._histogram.get_count(status="failure"), 1)
+        self.assertLess(self._histogram.get_sum(status="failure"), 1)
+
+
+class TestMetricsServer(unittest.IsolatedAsyncioTestCase):
+    """Tests for MetricsServer class."""
+
+    async def test_metrics(self):
+        """Test scraping the metrics."""
+        # Arrange.
+        server = metrics.MetricsServer(port=0)
+        await server.start()
+
+        metrics.TASKS_SCHEDULED.inc(type="TestTask")
+
+        # Act.
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    f"http://127.0.0.1:{server.port}/metrics"
+                ) as response:
+                    status = response.status
+                    content_type = response.content_type
+                    body = await response.text()
+
+        finally:
+            await server.stop()
+
+        # Assert.
+        self.assertEqual(status, 200)
+        self.assertEqual(content_type, "text/plain")
+        self.assertIn('saiblo_worker_tasks_scheduled_total{type="TestTask"} 1\n', body)
+        self.assertIn("# TYPE saiblo_worker_event_loop_lag_seconds histogram\n", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+"""Tests for the micro-benchmarks."""
+
+import unittest
+from pathlib import Path
+
+from benchmarks.micro import run_micro_benchmark
+
+
+class TestMicroBenchmark(unittest.TestCase):
+    """Tests for the micro benchmark module."""
+
+    def test_run_micro_benchmark(self):
+        """Test measuring a benchmark writing a file."""
+
+        # Arrange.
+        def benchmark(dir_path: Path):
+            return lambda: (dir_path / "file").write_bytes(b"x" * 1024 * 1024)
+
+        # Act.
+        result = run_micro_benchmark("write[1MiB]", benchmark, min_rounds=3, min_time=0)
+
+        # Assert.
+        self.assertEqual(result.name, "write[1MiB]")
+        self.assertEqual(result.rounds, 3)
+        self.assertLessEqual(result.min_seconds, result.median_seconds)
+        self.assertGreaterEqual(result.peak_memory_bytes, 1024 * 1024)
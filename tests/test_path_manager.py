@@ -22,6 +22,21 @@ def tearDown(self) -> None:
             ignore_errors=True,
         )
 
+    def test_set_data_dir_path(self):
+        """Test getting paths under a configured data root directory."""
+        # Arrange.
+        path_manager.set_data_dir_path(Path("/tmp/data"))
+
+        # Act.
+        try:
+            path = path_manager.get_match_replay_path("match_id")
+
+        finally:
+            path_manager.set_data_dir_path(Path("data"))
+
+        # Assert.
+        self.assertEqual(Path("/tmp/data/match_replays/92/match_id.dat"), path)
+
     def test_get_agent_code_base_dir_path(self):
         """Test getting the base directory path for agent code."""
         # Act.
@@ -39,7 +54,7 @@ def test_get_agent_code_tarball_path(self):
         path = path_manager.get_agent_code_tarball_path(code_id)
 
         # Assert.
-        self.assertEqual(Path(f"data/agent_code/{code_id}.tar"), path)
+        self.assertEqual(Path(f"data/agent_code/36/{code_id}.tar"), path)
 
     def test_get_agent_code_tarball_paths_no_dir(self):
         """Test getting agent code tarball paths when directory doesn't exist."""
@@ -52,7 +67,7 @@ def test_get_agent_code_tarball_paths_no_dir(self):
     def test_get_agent_code_tarball_paths_file_exists(self):
         """Test getting agent code tarball paths when files exist."""
         # Arrange.
-        path = Path("data/agent_code/code_id.tar")
+        path = Path("data/agent_code/36/code_id.tar")
         path.parent.mkdir(parents=True, exist_ok=True)
         path.touch()
 
@@ -62,6 +77,42 @@ def test_get_agent_code_tarball_paths_file_exists(self):
         # Assert.
         self.assertEqual([path], paths)
 
+    def test_get_game_host_data_base_dir_path(self):
+        """Test getting the base directory path for game host data directories."""
+        self.assertEqual(
+            Path("data/game_host_data"),
+            path_manager.get_game_host_data_base_dir_path(),
+        )
+
+    def test_get_game_host_data_dir_path(self):
+        """Test getting the data directory path for a specific game host container."""
+        # Arrange.
+        name = "name"
+
+        # Act.
+        path = path_manager.get_game_host_data_dir_path(name)
+
+        # Assert.
+        self.assertEqual(Path(f"data/game_host_data/{name}"), path)
+
+    def test_get_match_journal_base_dir_path(self):
+        """Test getting the base directory path for match journal entries."""
+        self.assertEqual(
+            Path("data/match_journal"),
+            path_manager.get_match_journal_base_dir_path(),
+        )
+
+    def test_get_match_journal_path(self):
+        """Test getting the path for a specific match journal entry."""
+        # Arrange.
+        match_id = "match_id"
+
+        # Act.
+        path = path_manager.get_match_journal_path(match_id)
+
+        # Assert.
+        self.assertEqual(Path(f"data/match_journal/{match_id}.json"), path)
+
     def test_get_match_replay_base_dir_path(self):
         """Test getting the base directory path for match replays."""
         self.assertEqual(
@@ -78,7 +129,7 @@ def test_get_match_replay_path(self):
         path = path_manager.get_match_replay_path(match_id)
 
         # Assert.
-        self.assertEqual(Path(f"data/match_replays/{match_id}.dat"), path)
+        self.assertEqual(Path(f"data/match_replays/92/{match_id}.dat"), path)
 
     def test_get_match_result_base_dir_path(self):
         """Test getting the base directory path for match results."""
@@ -118,3 +169,51 @@ def test_get_match_result_paths_file_exists(self):
 
         # Assert.
         self.assertEqual([path], paths)
+
+    def test_get_match_result_store_path(self):
+        """Test getting the path for the match result database."""
+        # Act.
+        path = path_manager.get_match_result_store_path()
+
+        # Assert.
+        self.assertEqual(Path("data/match_results.sqlite3"), path)
+
+    def test_get_match_stderr_path(self):
+        """Test getting the path for the stderr output of a match container."""
+        # Act.
+        path = path_manager.get_match_stderr_path("match_id", "agent-0")
+
+        # Assert.
+        self.assertEqual(Path("data/match_stderr/92/match_id/agent-0.log"), path)
+
+    def test_get_report_outbox_path(self):
+        """Test getting the path for a specific report in the outbox."""
+        # Arrange.
+        report_id = "report_id"
+
+        # Act.
+        path = path_manager.get_report_outbox_path(report_id)
+
+        # Assert.
+        self.assertEqual(Path(f"data/report_outbox/{report_id}.json"), path)
+
+    def test_get_report_outbox_paths_file_exists(self):
+        """Test getting report outbox paths when files exist."""
+        # Arrange.
+        path = Path("data/report_outbox/report_id.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+        # Act.
+        paths = path_manager.get_report_outbox_paths()
+
+        # Assert.
+        self.assertEqual([path], paths)
+
+    def test_get_trash_dir_path(self):
+        """Test getting the trash directory path."""
+        # Act.
+        path = path_manager.get_trash_dir_path()
+
+        # Assert.
+        self.assertEqual(Path("data/trash"), path)
@@ -0,0 +1,246 @@
+"""Tests for the report_outbox module."""
+
+import asyncio
+import os
+import shutil
+import unittest
+from pathlib import Path
+from typing import List
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiohttp
+
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.build_result import BuildResult
+from saiblo_worker.match_result import MatchResult
+from saiblo_worker.report_outbox import ReportOutbox
+from saiblo_worker.storage_manager import StorageManager
+
+
+def _make_match_result(match_id: str, error_message: str) -> MatchResult:
+    """Makes a failed match result.
+
+    Args:
+        match_id: The ID of the match
+        error_message: The error message
+
+    Returns:
+        The match result
+    """
+
+    return MatchResult(
+        match_id=match_id,
+        agent_results=[
+            MatchResult.AgentResult(
+                exit_code=0,
+                score=0.0,
+                status="UE",
+                stderr_output="",
+            )
+        ],
+        error_message=error_message,
+        replay_file_path=None,
+        stderr_output="",
+    )
+
+
+class TestReportOutbox(unittest.IsolatedAsyncioTestCase):
+    """Tests for the ReportOutbox class."""
+
+    _build_result_reporter: MagicMock
+    _match_result_reporter: MagicMock
+
+    async def asyncSetUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+        self._build_result_reporter = MagicMock()
+        self._build_result_reporter.report = AsyncMock()
+        self._match_result_reporter = MagicMock()
+        self._match_result_reporter.report = AsyncMock()
+
+    async def asyncTearDown(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    async def test_deliver_in_order_with_retry(self):
+        """Test delivering the results of a match in order when the first delivery fails."""
+        # Arrange.
+        delivered_error_messages: List[str] = []
+
+        async def report(result: MatchResult) -> None:
+            if self._match_result_reporter.report.await_count == 1:
+                raise aiohttp.ClientConnectionError()
+
+            delivered_error_messages.append(result.error_message)
+
+        self._match_result_reporter.report.side_effect = report
+        outbox = ReportOutbox(
+            self._build_result_reporter,
+            self._match_result_reporter,
+            retry_interval=0.01,
+        )
+        start_task = asyncio.create_task(outbox.start())
+
+        # Act.
+        await outbox.match_result_reporter.report(_make_match_result("1", "first"))
+        await outbox.match_result_reporter.report(_make_match_result("1", "second"))
+        await outbox.build_result_reporter.report(
+            BuildResult(code_id="code", image="image", message="")
+        )
+        await asyncio.sleep(0.2)
+        start_task.cancel()
+
+        # Assert.
+        self.assertEqual(delivered_error_messages, ["first", "second"])
+        self._build_result_reporter.report.assert_awaited_once()
+        self.assertEqual(path_manager.get_report_outbox_paths(), [])
+
+    async def test_deliver_after_restart(self):
+        """Test delivering results enqueued before a restart."""
+        # Arrange.
+        await ReportOutbox(
+            self._build_result_reporter, self._match_result_reporter
+        ).enqueue(_make_match_result("1", "error"))
+        outbox = ReportOutbox(self._build_result_reporter, self._match_result_reporter)
+
+        # Act.
+        start_task = asyncio.create_task(outbox.start())
+        await asyncio.sleep(0.1)
+        start_task.cancel()
+
+        # Assert.
+        self._match_result_reporter.report.assert_awaited_once_with(
+            _make_match_result("1", "error")
+        )
+        self.assertEqual(path_manager.get_report_outbox_paths(), [])
+
+    async def test_load_pins_before_scan_after_restart(self):
+        """Test keeping the replay of a result enqueued before a restart over the budget."""
+        # Arrange.
+        replay_file_path = path_manager.get_match_replay_path("1")
+        replay_file_path.parent.mkdir(parents=True)
+        replay_file_path.write_bytes(b"0" * 100)
+        await ReportOutbox(
+            self._build_result_reporter, self._match_result_reporter
+        ).enqueue(_make_match_result("1", "error"))
+        storage_manager = StorageManager(match_replay_budget=50)
+        outbox = ReportOutbox(
+            self._build_result_reporter,
+            self._match_result_reporter,
+            storage_manager=storage_manager,
+        )
+
+        # Act.
+        await outbox.load()
+        storage_manager.scan()
+        replay_kept = replay_file_path.exists()
+        start_task = asyncio.create_task(outbox.start())
+        await asyncio.sleep(0.1)
+        start_task.cancel()
+
+        # Assert.
+        self.assertTrue(replay_kept)
+        self._match_result_reporter.report.assert_awaited_once()
+        self.assertFalse(replay_file_path.exists())
+
+    async def test_deliver_rejected(self):
+        """Test keeping a result rejected by a client error aside."""
+        # Arrange.
+        self._build_result_reporter.report.side_effect = aiohttp.ClientResponseError(
+            MagicMock(), (), status=404
+        )
+        outbox = ReportOutbox(self._build_result_reporter, self._match_result_reporter)
+        start_task = asyncio.create_task(outbox.start())
+
+        # Act.
+        await outbox.enqueue(BuildResult(code_id="code", image=None, message=""))
+        await asyncio.sleep(0.1)
+        start_task.cancel()
+
+        # Assert.
+        self._build_result_reporter.report.assert_awaited_once()
+        self.assertEqual(path_manager.get_report_outbox_paths(), [])
+        self.assertEqual(
+            len(
+                list(path_manager.get_report_outbox_base_dir_path().glob("*.rejected"))
+            ),
+            1,
+        )
+
+    async def test_deliver_while_backing_off(self):
+        """Test delivering a result while the delivery of another one backs off."""
+        # Arrange.
+        self._build_result_reporter.report.side_effect = aiohttp.ClientConnectionError()
+        outbox = ReportOutbox(
+            self._build_result_reporter,
+            self._match_result_reporter,
+            concurrency=1,
+            retry_interval=10,
+        )
+        start_task = asyncio.create_task(outbox.start())
+
+        # Act.
+        await outbox.enqueue(BuildResult(code_id="code", image=None, message=""))
+        await outbox.enqueue(_make_match_result("1", "error"))
+        await asyncio.sleep(0.1)
+        start_task.cancel()
+
+        # Assert.
+        self._build_result_reporter.report.assert_awaited_once()
+        self._match_result_reporter.report.assert_awaited_once()
+
+    async def test_deliver_after_unexpected_error(self):
+        """Test retrying the reports of a key after an unexpected error."""
+        # Arrange.
+        self._build_result_reporter.report.side_effect = aiohttp.ClientResponseError(
+            MagicMock(), (), status=404
+        )
+        outbox = ReportOutbox(
+            self._build_result_reporter,
+            self._match_result_reporter,
+            max_retry_interval=0.01,
+        )
+        replace = os.replace
+
+        def replace_once_failing(src: Path, dst: Path) -> None:
+            # The first call writes the report and the second one sets it aside.
+            if replace_mock.call_count == 2:
+                raise OSError()
+
+            replace(src, dst)
+
+        start_task = asyncio.create_task(outbox.start())
+
+        # Act.
+        with patch("os.replace", side_effect=replace_once_failing) as replace_mock:
+            with self.assertLogs(level="ERROR"):
+                await outbox.enqueue(
+                    BuildResult(code_id="code", image=None, message="")
+                )
+                await asyncio.sleep(0.1)
+        start_task.cancel()
+
+        # Assert.
+        self.assertEqual(self._build_result_reporter.report.await_count, 2)
+        self.assertEqual(path_manager.get_report_outbox_paths(), [])
+
+    async def test_wait_match_delivered(self):
+        """Test waiting for the results of a match to be delivered."""
+        # Arrange.
+        delivered = asyncio.Event()
+
+        async def report(_: MatchResult) -> None:
+            await asyncio.sleep(0.05)
+            delivered.set()
+
+        self._match_result_reporter.report.side_effect = report
+        outbox = ReportOutbox(self._build_result_reporter, self._match_result_reporter)
+        await outbox.enqueue(_make_match_result("1", "error"))
+        start_task = asyncio.create_task(outbox.start())
+
+        # Act.
+        await asyncio.wait_for(outbox.wait_match_delivered("1"), 1)
+        await asyncio.wait_for(outbox.wait_match_delivered("2"), 1)
+        start_task.cancel()
+
+        # Assert.
+        self.assertTrue(delivered.is_set())
@@ -0,0 +1,59 @@
+"""Tests for the saiblo_client module."""
+
+import asyncio
+import json
+import unittest
+from typing import List
+from unittest.mock import AsyncMock, MagicMock
+
+from saiblo_worker.judge_task import JudgeTask
+from saiblo_worker.saiblo_client import SaibloClient
+
+
+class TestSaibloClient(unittest.IsolatedAsyncioTestCase):
+    """Tests for the SaibloClient class."""
+
+    async def test_finish_judge_task_after_delivery(self):
+        """Test finishing a judge task only after its match results are delivered."""
+        # Arrange.
+        events: List[str] = []
+
+        judge_task = MagicMock(spec=JudgeTask)
+        judge_task.match_id = "42"
+        judge_task.trace_key = "match/42"
+
+        task_scheduler = MagicMock()
+        task_scheduler.pop_done_task = AsyncMock(
+            side_effect=[judge_task, asyncio.CancelledError()]
+        )
+
+        async def wait_match_delivered(match_id: str) -> None:
+            await asyncio.sleep(0.05)
+            events.append(f"delivered {match_id}")
+
+        report_outbox = MagicMock()
+        report_outbox.wait_match_delivered = AsyncMock(side_effect=wait_match_delivered)
+
+        async def send(message: str) -> None:
+            events.append(f"finished {json.loads(message)['data']['match_id']}")
+
+        connection = MagicMock()
+        connection.send = AsyncMock(side_effect=send)
+
+        saiblo_client = SaibloClient(
+            "worker",
+            "ws://localhost",
+            task_scheduler,
+            MagicMock(),
+            MagicMock(),
+            report_outbox=report_outbox,
+        )
+
+        # Act.
+        with self.assertRaises(asyncio.CancelledError):
+            await saiblo_client._keep_finish_judge_task(  # pylint: disable=protected-access
+                connection
+            )
+
+        # Assert.
+        self.assertEqual(events, ["delivered 42", "finished 42"])
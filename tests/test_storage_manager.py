@@ -0,0 +1,102 @@
+"""Tests for the storage_manager module."""
+
+import os
+import shutil
+import unittest
+from pathlib import Path
+
+import saiblo_worker.path_manager as path_manager
+from saiblo_worker.storage_manager import StorageManager
+
+
+def _write_file(path: Path, size: int) -> Path:
+    """Writes a file of a size.
+
+    Args:
+        path: The path to the file
+        size: The size in bytes
+
+    Returns:
+        The path to the file
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+    return path
+
+
+class TestStorageManager(unittest.TestCase):
+    """Tests for the StorageManager class."""
+
+    def setUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def test_track_evict_least_recently_used(self):
+        """Test evicting the least recently used agent code over budget."""
+        # Arrange.
+        storage_manager = StorageManager(agent_code_budget=25)
+        first_path = _write_file(path_manager.get_agent_code_tarball_path("1"), 10)
+        second_path = _write_file(path_manager.get_agent_code_tarball_path("2"), 10)
+        third_path = _write_file(path_manager.get_agent_code_tarball_path("3"), 10)
+
+        # Act.
+        storage_manager.track("agent_code", first_path)
+        storage_manager.track("agent_code", second_path)
+        storage_manager.track("agent_code", first_path)
+        storage_manager.track("agent_code", third_path)
+
+        # Assert.
+        self.assertTrue(first_path.is_file())
+        self.assertFalse(second_path.is_file())
+        self.assertTrue(third_path.is_file())
+        self.assertEqual(storage_manager.get_usage("agent_code"), 20)
+
+    def test_track_pinned(self):
+        """Test evicting pinned match files only once they are unpinned."""
+        # Arrange.
+        storage_manager = StorageManager(match_replay_budget=15)
+        first_path = _write_file(path_manager.get_match_replay_path("1"), 10)
+        second_path = _write_file(path_manager.get_match_replay_path("2"), 10)
+
+        # Act.
+        storage_manager.track("match_replays", first_path, pinned=True)
+        storage_manager.track("match_replays", second_path, pinned=True)
+        evicted_while_pinned = not first_path.is_file()
+        storage_manager.unpin([first_path])
+
+        # Assert.
+        self.assertFalse(evicted_while_pinned)
+        self.assertFalse(first_path.is_file())
+        self.assertTrue(second_path.is_file())
+        self.assertEqual(storage_manager.get_usage("match_replays"), 10)
+
+    def test_scan(self):
+        """Test evicting the oldest entries found by a scan."""
+        # Arrange.
+        old_path = _write_file(path_manager.get_match_stderr_path("1", "game-host"), 10)
+        new_path = _write_file(path_manager.get_match_stderr_path("2", "game-host"), 10)
+        os.utime(old_path.parent, (0, 0))
+        storage_manager = StorageManager(match_stderr_budget=15)
+
+        # Act.
+        storage_manager.scan()
+
+        # Assert.
+        self.assertFalse(old_path.exists())
+        self.assertTrue(new_path.exists())
+        self.assertEqual(storage_manager.get_usage("match_stderr"), 10)
+
+    def test_has_free_space(self):
+        """Test property has_free_space with a floor above any disk size."""
+        # Arrange.
+        storage_manager = StorageManager(free_space_floor=2**62)
+
+        # Act.
+        result = storage_manager.has_free_space
+
+        # Assert.
+        self.assertFalse(result)
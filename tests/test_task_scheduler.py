@@ -1,9 +1,17 @@
 """Tests for task_scheduler module."""
 
 import asyncio
+import json
+import tempfile
 import unittest
+from pathlib import Path
 
+import saiblo_worker.metrics as metrics
+import saiblo_worker.tracing as tracing
 from saiblo_worker.base_task import BaseTask
+from saiblo_worker.build_result import BuildResult
+from saiblo_worker.cpu_allocator import CpuAllocator
+from saiblo_worker.storage_manager import StorageManager
 from saiblo_worker.task_scheduler import TaskScheduler
 
 
@@ -24,6 +32,10 @@ class _TestTaskThrow(BaseTask):
     def result(self) -> None:
         pass
 
+    @property
+    def trace_key(self) -> str:
+        return "match/42"
+
     def __str__(self) -> str:
         return "TestTaskThrow"
 
@@ -31,6 +43,18 @@ async def execute(self) -> None:
         raise RuntimeError()
 
 
+class _TestTaskFailedResult(BaseTask):
+    @property
+    def result(self) -> BuildResult:
+        return BuildResult(code_id="code", image=None, message="build failed")
+
+    def __str__(self) -> str:
+        return "TestTaskFailedResult"
+
+    async def execute(self) -> BuildResult:
+        return self.result
+
+
 class TestTaskScheduler(unittest.IsolatedAsyncioTestCase):
     """Tests for TaskScheduler class."""
 
@@ -57,6 +81,35 @@ async def test_idle_pending_tasks(self):
         # Assert.
         self.assertFalse(result)
 
+    async def test_idle_not_enough_cpus(self):
+        """Test property idle when another match cannot get its CPUs."""
+        # Arrange.
+        cpu_allocator = CpuAllocator(nodes=[[0, 1, 2]])
+        task_scheduler = TaskScheduler(cpu_allocator=cpu_allocator)
+        cpus = await cpu_allocator.allocate(2)
+
+        # Act.
+        result_allocated = task_scheduler.idle
+        await cpu_allocator.release(cpus)
+        result_released = task_scheduler.idle
+
+        # Assert.
+        self.assertFalse(result_allocated)
+        self.assertTrue(result_released)
+
+    async def test_idle_not_enough_free_space(self):
+        """Test property idle when the free disk space is below the floor."""
+        # Arrange.
+        task_scheduler = TaskScheduler(
+            storage_manager=StorageManager(free_space_floor=2**62)
+        )
+
+        # Act.
+        result = task_scheduler.idle
+
+        # Assert.
+        self.assertFalse(result)
+
     async def test_clean_pending_tasks(self):
         """Test clean() when there are pending tasks."""
         # Arrange.
@@ -137,3 +190,78 @@ async def test_start_task_failure(self):
 
         # Assert.
         self.assertTrue(task_scheduler.idle)
+
+    async def test_start_metrics(self):
+        """Test start() updates the metrics of tasks."""
+        # Arrange.
+        task_scheduler = TaskScheduler()
+        scheduled = metrics.TASKS_SCHEDULED.get(type="_TestTaskThrow")
+        failed = metrics.TASKS_FAILED.get(type="_TestTaskThrow")
+        await task_scheduler.schedule(_TestTaskThrow())
+        queue_depth = metrics.TASK_QUEUE_DEPTH.get()
+
+        # Act.
+        asyncio_task = asyncio.create_task(task_scheduler.start())
+        await asyncio.sleep(1)
+        asyncio_task.cancel()
+
+        # Assert.
+        self.assertEqual(queue_depth, 1)
+        self.assertEqual(metrics.TASK_QUEUE_DEPTH.get(), 0)
+        self.assertEqual(
+            metrics.TASKS_SCHEDULED.get(type="_TestTaskThrow"), scheduled + 1
+        )
+        self.assertEqual(metrics.TASKS_FAILED.get(type="_TestTaskThrow"), failed + 1)
+
+    async def test_start_metrics_failed_result(self):
+        """Test start() counts a task returning a failed result as failed."""
+        # Arrange.
+        task_scheduler = TaskScheduler()
+        completed = metrics.TASKS_COMPLETED.get(type="_TestTaskFailedResult")
+        failed = metrics.TASKS_FAILED.get(type="_TestTaskFailedResult")
+        await task_scheduler.schedule(_TestTaskFailedResult())
+
+        # Act.
+        asyncio_task = asyncio.create_task(task_scheduler.start())
+        await asyncio.wait_for(task_scheduler.pop_done_task(), timeout=1)
+        asyncio_task.cancel()
+
+        # Assert.
+        self.assertEqual(
+            metrics.TASKS_COMPLETED.get(type="_TestTaskFailedResult"), completed
+        )
+        self.assertEqual(
+            metrics.TASKS_FAILED.get(type="_TestTaskFailedResult"), failed + 1
+        )
+
+    async def test_start_trace(self):
+        """Test start() when spans are exported."""
+        # Arrange.
+        task_scheduler = TaskScheduler()
+        await task_scheduler.schedule(_TestTaskThrow())
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            trace_file_path = Path(temp_dir) / "spans.jsonl"
+            exporter = tracing.JsonlSpanExporter(trace_file_path)
+            tracing.set_exporter(exporter)
+
+            # Act.
+            try:
+                asyncio_task = asyncio.create_task(task_scheduler.start())
+                await asyncio.sleep(1)
+                asyncio_task.cancel()
+
+            finally:
+                tracing.set_exporter(None)
+                exporter.close()
+
+            with open(trace_file_path, encoding="utf-8") as f:
+                spans = {span["name"]: span for span in map(json.loads, f)}
+
+        # Assert.
+        self.assertEqual(spans.keys(), {"queue_wait", "task"})
+        self.assertEqual(
+            spans["queue_wait"]["trace_id"], tracing.get_trace_id("match/42")
+        )
+        self.assertEqual(spans["task"]["trace_id"], tracing.get_trace_id("match/42"))
+        self.assertEqual(spans["task"]["status"], "error")
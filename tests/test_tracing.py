@@ -0,0 +1,197 @@
+"""Tests for tracing module."""
+
+import asyncio
+import json
+import shutil
+import time
+import unittest
+from pathlib import Path
+from typing import Any, Dict, List
+
+import saiblo_worker.tracing as tracing
+
+
+class TestTracing(unittest.IsolatedAsyncioTestCase):
+    """Tests for the tracing functions."""
+
+    _exporter: tracing.JsonlSpanExporter
+    _trace_file_path = Path("data/traces/spans.jsonl")
+
+    def setUp(self) -> None:
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+        self._exporter = tracing.JsonlSpanExporter(self._trace_file_path)
+
+        tracing.set_exporter(self._exporter)
+
+    def tearDown(self) -> None:
+        tracing.set_exporter(None)
+
+        self._exporter.close()
+
+        shutil.rmtree(Path("data"), ignore_errors=True)
+
+    def test_get_trace_id(self):
+        """Test get_trace_id()."""
+        # Arrange.
+        trace_key = tracing.get_match_trace_key("42")
+
+        # Act.
+        result = tracing.get_trace_id(trace_key)
+
+        # Assert.
+        self.assertEqual(trace_key, "match/42")
+        self.assertEqual(len(result), 32)
+        self.assertEqual(result, tracing.get_trace_id("match/42"))
+        self.assertNotEqual(result, tracing.get_trace_id("match/43"))
+
+    def test_record_span(self):
+        """Test record_span()."""
+        # Arrange.
+        start_time_unix_nano = time.time_ns()
+
+        # Act.
+        tracing.record_span(
+            "queue_wait", start_time_unix_nano, trace_key="match/42", task="task"
+        )
+        spans = self._read_spans()
+
+        # Assert.
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0]["name"], "queue_wait")
+        self.assertEqual(spans[0]["trace_id"], tracing.get_trace_id("match/42"))
+        self.assertIsNone(spans[0]["parent_span_id"])
+        self.assertEqual(spans[0]["start_time_unix_nano"], start_time_unix_nano)
+        self.assertGreaterEqual(
+            spans[0]["end_time_unix_nano"], spans[0]["start_time_unix_nano"]
+        )
+        self.assertEqual(spans[0]["attributes"], {"task": "task"})
+
+    def test_set_exporter_none(self):
+        """Test set_exporter() with None."""
+        # Arrange.
+        tracing.set_exporter(None)
+
+        # Act.
+        with tracing.span("task"):
+            pass
+
+        tracing.record_span("queue_wait", time.time_ns())
+        spans = self._read_spans()
+
+        # Assert.
+        self.assertEqual(spans, [])
+
+    def test_span_error(self):
+        """Test span() when the block raises an exception."""
+        # Arrange.
+        error = RuntimeError("boom")
+
+        # Act.
+        with self.assertRaises(RuntimeError) as context:
+            with tracing.span("wait"):
+                raise error
+
+        spans = self._read_spans()
+
+        # Assert.
+        self.assertIs(context.exception, error)
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0]["status"], "error")
+        self.assertEqual(spans[0]["error_message"], "(RuntimeError) boom")
+
+    def test_span_nested(self):
+        """Test span() nested in another span."""
+        # Arrange.
+        trace_id = tracing.get_trace_id("match/42")
+
+        # Act.
+        with tracing.span("task", trace_key="match/42") as task_span:
+            with tracing.span("judge") as judge_span:
+                judge_span.attributes["resumed"] = False
+
+            # Spans with the key of the current trace are its children.
+            with tracing.span("cleanup", trace_key="match/42"):
+                pass
+
+            # Spans with the key of another trace are not.
+            with tracing.span("upload", trace_key="build/1"):
+                pass
+
+        spans = {span["name"]: span for span in self._read_spans()}
+
+        # Assert.
+        self.assertEqual(task_span.status, "ok")
+        self.assertEqual(spans["task"]["trace_id"], trace_id)
+        self.assertIsNone(spans["task"]["parent_span_id"])
+        self.assertEqual(spans["judge"]["trace_id"], trace_id)
+        self.assertEqual(spans["judge"]["parent_span_id"], task_span.span_id)
+        self.assertEqual(spans["judge"]["attributes"], {"resumed": False})
+        self.assertEqual(spans["cleanup"]["parent_span_id"], task_span.span_id)
+        self.assertEqual(spans["upload"]["trace_id"], tracing.get_trace_id("build/1"))
+        self.assertIsNone(spans["upload"]["parent_span_id"])
+
+    async def test_span_nested_in_task(self):
+        """Test span() in an asyncio task created in another span."""
+
+        # Arrange.
+        async def run_child_span() -> None:
+            await asyncio.sleep(0)
+
+            with tracing.span("network_create"):
+                pass
+
+        # Act.
+        with tracing.span("match_start", trace_key="match/42") as parent_span:
+            await asyncio.gather(run_child_span(), run_child_span())
+
+        spans = [
+            span for span in self._read_spans() if span["name"] == "network_create"
+        ]
+
+        # Assert.
+        self.assertEqual(len(spans), 2)
+
+        for span in spans:
+            self.assertEqual(span["trace_id"], parent_span.trace_id)
+            self.assertEqual(span["parent_span_id"], parent_span.span_id)
+
+    def test_span_no_trace_key(self):
+        """Test span() without a trace key or a current span."""
+        # Arrange.
+
+        # Act.
+        with tracing.span("task"):
+            pass
+
+        with tracing.span("task"):
+            pass
+
+        spans = self._read_spans()
+
+        # Assert.
+        self.assertEqual(len(spans), 2)
+        self.assertNotEqual(spans[0]["trace_id"], spans[1]["trace_id"])
+
+    def _read_spans(self) -> List[Dict[str, Any]]:
+        """Closes the exporter and reads the spans it wrote.
+
+        Returns:
+            The spans
+        """
+
+        tracing.set_exporter(None)
+        self._exporter.close()
+
+        # Exporting goes on with a new exporter appending to the same file.
+        self._exporter = tracing.JsonlSpanExporter(self._trace_file_path)
+
+        if not self._trace_file_path.is_file():
+            return []
+
+        with open(self._trace_file_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+
+if __name__ == "__main__":
+    unittest.main()